@@ -0,0 +1,47 @@
+"""
+Пакетная обработка записанного видео: лица по кадрам в JSONL/Parquet, при желании -
+аннотированное видео, в конце - кадров в секунду и время по этапам.
+
+Пример запуска:
+    python ai/batch.py recordings/*.mp4 --output faces.jsonl --annotate-dir annotated
+"""
+import argparse
+import glob
+from config import Config
+from core.batch_processor import BatchProcessor, create_detection_writer
+from core.embedding_store import create_embedding_store
+from core.face_database import FaceDatabase
+
+def main():
+    cfg = Config().BATCH
+    parser = argparse.ArgumentParser(description="Run face recognition over recorded video files as fast as possible")
+    parser.add_argument("inputs", nargs="+", help="Video files or glob patterns")
+    parser.add_argument("--output", help="Detections output file (.jsonl or .parquet)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Output format (default: by extension, then Config.BATCH)")
+    parser.add_argument("--annotate-dir", help="Write annotated videos to this directory")
+    parser.add_argument("--workers", type=int, default=cfg["workers"], help="Worker processes (default: CPU count)")
+    parser.add_argument("--segment-frames", type=int, default=cfg["segment_frames"],
+                        help="Split files into segments of N frames to spread long videos across workers")
+    args = parser.parse_args()
+
+    paths = []
+    for pattern in args.inputs:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+
+    output_format = args.format
+    if output_format is None and args.output:
+        output_format = "parquet" if args.output.endswith(".parquet") else "jsonl"
+    writer = create_detection_writer(args.output, output_format) if args.output else None
+
+    # Галерея загружается один раз и передаётся рабочим процессам
+    face_database = FaceDatabase(store=create_embedding_store())
+    processor = BatchProcessor(face_database, workers=args.workers, segment_frames=args.segment_frames)
+    try:
+        report = processor.run(paths, writer, args.annotate_dir)
+    finally:
+        if writer is not None:
+            writer.close()
+    report.print_summary()
+
+if __name__ == '__main__':
+    main()
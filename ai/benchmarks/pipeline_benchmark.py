@@ -0,0 +1,436 @@
+"""
+Бенчмарк конвейера распознавания без камер и сети: детекторы, сравнители, поиск по
+галерее, буфер кадров и кодирование ответа GetResults. Результат - JSON для сравнения
+прогонов между собой.
+
+Пример запуска:
+    python ai/benchmarks/pipeline_benchmark.py --output bench.json
+    python ai/benchmarks/pipeline_benchmark.py --video recordings/entrance.mp4 --suites detectors,comparers
+    python ai/benchmarks/pipeline_benchmark.py --suites gallery --gallery-sizes 200000 --dim 512 --nprobe 1,4,16,64
+    python ai/benchmarks/pipeline_benchmark.py --suites comparers --faces photos/faces
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+
+# Получаем абсолютный путь к папке ai и к сгенерированным модулям gRPC
+ai_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+grpc_path = os.path.normpath(os.path.join(ai_path, '..', 'grpc'))
+sys.path.append(ai_path)
+sys.path.append(grpc_path)
+
+from config import Config
+from core.face_database import FaceDatabase
+from core.face_index import BruteForceIndex, IVFIndex
+from core.frame_encoder import FULL, PREVIEW, FrameEncoder
+from core.shared_frames import FrameRing
+
+SUITES = ("detectors", "comparers", "gallery", "frame_ring", "get_results")
+
+def summarize(durations, items = 1):
+    """Сводка по замерам в секундах: среднее и квантили в мс, элементов в секунду."""
+    durations = np.asarray(durations, dtype=np.float64)
+    total = durations.sum()
+    return {
+        "iterations": int(len(durations)),
+        "mean_ms": 1000 * float(durations.mean()),
+        "p50_ms": 1000 * float(np.percentile(durations, 50)),
+        "p95_ms": 1000 * float(np.percentile(durations, 95)),
+        "p99_ms": 1000 * float(np.percentile(durations, 99)),
+        "per_second": float(len(durations) * items / total) if total else 0.0
+    }
+
+def timed(function, iterations, warmup = 0):
+    """Вызывает function() warmup + iterations раз и возвращает длительности замеренных вызовов."""
+    for _ in range(warmup):
+        function()
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def load_frames(video_path, count, resolution, rng):
+    """Кадры из записи (если указана) или синтетические: шум с эллипсами-«лицами»."""
+    width, height = resolution
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.resize(frame, (width, height)))
+        cap.release()
+        if not frames:
+            raise RuntimeError(f"Cannot read frames from {video_path}")
+        return frames
+
+    for _ in range(count):
+        frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        frame = cv2.GaussianBlur(frame, (9, 9), 0)
+        for _ in range(rng.integers(1, 4)):
+            center = (int(rng.integers(60, width - 60)), int(rng.integers(60, height - 60)))
+            axes = (int(rng.integers(30, 50)), int(rng.integers(40, 60)))
+            cv2.ellipse(frame, center, axes, 0, 0, 360, tuple(int(v) for v in rng.integers(120, 220, size=3)), -1)
+        frames.append(frame)
+    return frames
+
+def create_detectors():
+    """Все бэкенды FaceDetector с параметрами из Config; недоступные возвращаются как ошибка."""
+    from core import face_detector
+
+    cfg = Config().FACE_DETECTOR
+    factories = {
+        "haarcascade": lambda: face_detector.HaarCascadeDetector(
+            cfg["haarcascade"]["cascade_path"], cfg["haarcascade"]["scale_factor"], cfg["haarcascade"]["min_neighbors"]
+        ),
+        # Без пакетного сервиса: замеряется одиночный инференс
+        "ssd": lambda: face_detector.SSDDetector(
+            cfg["ssd"]["prototxt_path"], cfg["ssd"]["model_path"], cfg["ssd"]["confidence_threshold"]
+        ),
+        "face_recognition": lambda: face_detector.FaceRecognitionDetector(
+            cfg["face_recognition"]["model"], cfg["face_recognition"]["number_of_times_to_upsample"]
+        )
+    }
+    for name, factory in factories.items():
+        try:
+            yield name, factory(), None
+        except Exception as e:
+            yield name, None, f"{type(e).__name__}: {e}"
+
+def create_comparers():
+    from core import face_recognizer
+
+    for name, cls in (("face_recognition", face_recognizer.FaceRecognitionComparer),
+                      ("deepface", face_recognizer.DeepFaceComparer)):
+        try:
+            yield name, cls(), None
+        except Exception as e:
+            yield name, None, f"{type(e).__name__}: {e}"
+
+def bench_detectors(frames, args):
+    results = []
+    for name, detector, error in create_detectors():
+        if error is not None:
+            results.append({"suite": "detectors", "name": name, "error": error})
+            continue
+
+        position = [0]
+        faces = []
+
+        def detect():
+            frame = frames[position[0] % len(frames)]
+            position[0] += 1
+            faces.append(len(detector.detect_faces(frame)))
+
+        try:
+            durations = timed(detect, args.iterations, args.warmup)
+        except Exception as e:
+            results.append({"suite": "detectors", "name": name, "error": f"{type(e).__name__}: {e}"})
+            continue
+        result = {"suite": "detectors", "name": name, "faces_per_frame": float(np.mean(faces))}
+        result.update(summarize(durations))
+        results.append(result)
+    return results
+
+def load_face_crops(path):
+    """Фотографии лиц из папки или один файл - кропы для замера сравнителей."""
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path))
+    crops = [image for image in (cv2.imread(p) for p in paths) if image is not None]
+    if not crops:
+        raise RuntimeError(f"Cannot read face images from {path}")
+    return crops
+
+def bench_comparers(frames, args):
+    if args.faces:
+        crops = load_face_crops(args.faces)
+    else:
+        # Кропы лиц: центральная часть кадра в размере типичного бокса
+        crops = []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            top, left = height // 2 - 80, width // 2 - 80
+            crops.append(np.ascontiguousarray(frame[max(top, 0):top + 160, max(left, 0):left + 160]))
+
+    results = []
+    for name, comparer, error in create_comparers():
+        if error is not None:
+            results.append({"suite": "comparers", "name": name, "error": error})
+            continue
+
+        position = [0]
+        encoded = []
+
+        def encode():
+            crop = crops[position[0] % len(crops)]
+            position[0] += 1
+            encoded.append(len(comparer.get_face_encodings(crop)))
+
+        durations = timed(encode, args.iterations, args.warmup)
+        encodings_per_face = float(np.mean(encoded))
+        if encodings_per_face == 0:
+            # Сравнитель не нашёл лицо ни в одном кропе: замерен промах детекции, а не эмбеддинг
+            results.append({"suite": "comparers", "name": name, "error": (
+                "no face found in any crop, embedding time was not measured; "
+                "pass --faces with face photos or --video with faces in the frame centre"
+            )})
+            continue
+        result = {"suite": "comparers", "name": name, "encodings_per_face": encodings_per_face}
+        result.update(summarize(durations))
+        results.append(result)
+    return results
+
+def make_gallery(size, dim, rng):
+    """Синтетическая галерея: эмбеддинги сгруппированы вокруг центров, как у реальных лиц."""
+    centers = rng.normal(size=(max(size // 20, 1), dim)).astype(np.float32)
+    gallery = centers[rng.integers(0, len(centers), size=size)] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+    return gallery.astype(np.float32)
+
+def bench_gallery(args, rng):
+    """
+    Поиск по галерее через FaceDatabase: полный перебор и IVF при каждом nprobe.
+    Запросы - зашумлённые копии эмбеддингов галереи (тот же человек на другом кадре),
+    полнота recall@k считается относительно полного перебора.
+    """
+    results = []
+    for size in args.gallery_sizes:
+        gallery = make_gallery(size, args.dim, rng)
+        ids = [f"person_{i}" for i in range(size)]
+        rows = rng.choice(size, args.iterations * args.faces_per_frame)
+        queries = gallery[rows] + args.noise * rng.normal(size=(len(rows), args.dim)).astype(np.float32)
+        batches = queries.reshape(args.iterations, args.faces_per_frame, args.dim)
+
+        nlist = args.nlist or max(1, min(1024, size // 40))
+        runs = [("brute_force", BruteForceIndex(), [None])]
+        runs.append((f"ivf nlist={nlist}", IVFIndex(
+            metric=args.metric, nlist=nlist, min_train_size=nlist, seed=args.seed
+        ), args.nprobe))
+
+        exact = None
+        for name, index, nprobes in runs:
+            start = time.perf_counter()
+            index.load(ids, gallery)
+            build_time = time.perf_counter() - start
+            face_database = FaceDatabase(index=index)
+
+            for nprobe in nprobes:
+                if nprobe is not None:
+                    index.nprobe = nprobe
+                found = []
+                position = [0]
+
+                def search():
+                    matches = face_database.search(batches[position[0]], k=args.k, metric=args.metric)
+                    found.extend({face_id for face_id, _ in face_matches} for face_matches in matches)
+                    position[0] += 1
+
+                durations = timed(search, args.iterations)
+                if exact is None:
+                    exact = found
+                hits = sum(len(a & b) for a, b in zip(found, exact))
+                result = {
+                    "suite": "gallery",
+                    "name": name if nprobe is None else f"{name} nprobe={nprobe}",
+                    "size": size,
+                    "dim": args.dim,
+                    "metric": args.metric,
+                    "faces_per_search": args.faces_per_frame,
+                    "build_s": build_time,
+                    f"recall_at_{args.k}": hits / max(sum(len(b) for b in exact), 1)
+                }
+                result.update(summarize(durations, args.faces_per_frame))
+                results.append(result)
+    return results
+
+def bench_frame_ring(frames, args):
+    width, height = Config().CAMERA_RESOLUTION
+    results = []
+
+    # Только запись: копирование кадра в слот
+    frame_ring = FrameRing((height, width, 3), capacity=Config().MAX_FRAMES_IN_QUEUE)
+    position = [0]
+
+    def put():
+        frame_ring.put(frames[position[0] % len(frames)])
+        position[0] += 1
+
+    result = {"suite": "frame_ring", "name": "put", "capacity": frame_ring.capacity}
+    result.update(summarize(timed(put, args.iterations * 10)))
+    results.append(result)
+
+    # Запись с одновременным чтением новых кадров, как у GetResults
+    stop = threading.Event()
+    reads = [0]
+
+    def reader():
+        while not stop.is_set():
+            reads[0] += len(frame_ring.read_new())
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    durations = timed(put, args.iterations * 10)
+    stop.set()
+    thread.join()
+
+    stats = frame_ring.get_stats()
+    result = {
+        "suite": "frame_ring",
+        "name": "put_with_reader",
+        "capacity": frame_ring.capacity,
+        "frames_read": reads[0],
+        "overwritten": stats["overwritten"],
+        "dropped": stats["dropped"]
+    }
+    result.update(summarize(durations))
+    results.append(result)
+    frame_ring.close()
+    return results
+
+def bench_get_results(frames, args):
+    """Кодирование и сборка ответа GetResults для всех камер, как в FaceRecognitionServicer."""
+    try:
+        import face_recognition_pb2
+    except ImportError:
+        face_recognition_pb2 = None
+
+    cfg = Config().FRAME_ENCODER
+    width, height = Config().CAMERA_RESOLUTION
+    camera_frames = [cv2.resize(frames[i % len(frames)], (width, height)) for i in range(args.cameras)]
+
+    backends = [("cv2", False)]
+    encoder = FrameEncoder(workers=cfg["workers"], use_turbojpeg=True)
+    if encoder.turbojpeg is not None:
+        backends.append(("turbojpeg", True))
+    encoder.shutdown()
+
+    results = []
+    for backend, use_turbojpeg in backends:
+        for rendition in (FULL, PREVIEW):
+            for cached in (False, True):
+                encoder = FrameEncoder(workers=cfg["workers"], quality=cfg["quality"], preview_width=cfg["preview_width"],
+                                       preview_quality=cfg["preview_quality"], cache_size=cfg["cache_size"],
+                                       use_turbojpeg=use_turbojpeg)
+                sequence = [0]
+                sizes = []
+
+                def get_results():
+                    # Без кэша каждый вызов - новые кадры; с кэшем - те же, уже закодированные
+                    if not cached:
+                        sequence[0] += 1
+                    encodings = [encoder.submit(i, sequence[0], frame, rendition) for i, frame in enumerate(camera_frames)]
+                    encoded = [encoding.result() for encoding in encodings]
+                    sizes.append(sum(len(data) for data in encoded))
+                    if face_recognition_pb2 is not None:
+                        face_recognition_pb2.ResultResponse(camera_frames=[
+                            face_recognition_pb2.CameraFrames(camera_index=i, frames=[data])
+                            for i, data in enumerate(encoded)
+                        ]).SerializeToString()
+
+                durations = timed(get_results, args.iterations, args.warmup)
+                encoder.shutdown()
+
+                result = {
+                    "suite": "get_results",
+                    "name": f"{backend} {rendition}{' cached' if cached else ''}",
+                    "cameras": args.cameras,
+                    "resolution": [width, height],
+                    "serialized": face_recognition_pb2 is not None,
+                    "response_kb": float(np.mean(sizes)) / 1024
+                }
+                result.update(summarize(durations))
+                results.append(result)
+    return results
+
+def get_environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ai_path, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "args": vars(args)
+    }
+
+def print_results(results):
+    for result in results:
+        if "error" in result:
+            print(f"[WARNING] {result['suite']}/{result['name']}: skipped ({result['error']})", file=sys.stderr)
+            continue
+        print(f"[STATS] {result['suite'] + '/' + result['name']:<40} p50 {result['p50_ms']:9.3f} ms  "
+              f"p95 {result['p95_ms']:9.3f} ms  {result['per_second']:10.1f}/s", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible benchmark of the recognition pipeline (JSON output)")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma separated subset of: {', '.join(SUITES)}")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--video", help="Use frames from this recording instead of synthetic ones")
+    parser.add_argument("--frames", type=int, default=32, help="Distinct frames to cycle through")
+    parser.add_argument("--faces", help="Face photo or folder of face photos for the comparers suite "
+                                        "(default: frame centres, which synthetic frames do not contain faces in)")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--gallery-sizes", default="1000,10000,100000", help="Comma separated gallery sizes")
+    parser.add_argument("--dim", type=int, default=128, help="Embedding size (128 for face_recognition, 512 for Facenet512)")
+    parser.add_argument("--metric", default="euclidean", choices=["cosine", "euclidean", "euclidean_l2"])
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 - gallery size / 40, at most 1024)")
+    parser.add_argument("--nprobe", default="4,16,64", help="Comma separated IVF nprobe values")
+    parser.add_argument("--k", type=int, default=1, help="Nearest faces per query (recall@k)")
+    parser.add_argument("--noise", type=float, default=0.3, help="Query noise relative to gallery embeddings")
+    parser.add_argument("--faces-per-frame", type=int, default=4)
+    parser.add_argument("--cameras", type=int, default=Config().NUM_CAMERAS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.gallery_sizes = [int(value) for value in args.gallery_sizes.split(",")]
+    args.nprobe = [int(value) for value in args.nprobe.split(",")]
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    for suite in suites:
+        if suite not in SUITES:
+            parser.error(f"Unknown suite: {suite}")
+
+    rng = np.random.default_rng(args.seed)
+    frames = load_frames(args.video, args.frames, Config().CAMERA_RESOLUTION, rng)
+
+    results = []
+    for suite in suites:
+        print(f"[INFO] Running {suite}...", file=sys.stderr)
+        if suite == "detectors":
+            suite_results = bench_detectors(frames, args)
+        elif suite == "comparers":
+            suite_results = bench_comparers(frames, args)
+        elif suite == "gallery":
+            suite_results = bench_gallery(args, rng)
+        elif suite == "frame_ring":
+            suite_results = bench_frame_ring(frames, args)
+        else:
+            suite_results = bench_get_results(frames, args)
+        print_results(suite_results)
+        results.extend(suite_results)
+
+    report = json.dumps({"environment": get_environment(args), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f"[INFO] Results written to {args.output}", file=sys.stderr)
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import cv2
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import Config
+from core.face_database import FaceDatabase
+from core.image_processor import STAGES, ImageProcessor
+from core.shared_frames import SharedArray
+from core.video_source import FileSource
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Обработчик кадров рабочего процесса и подключённый снимок галереи
+_worker_processor = None
+_worker_gallery = None
+
+def _init_worker(ids, descriptor, layout):
+    global _worker_processor, _worker_gallery
+    # Ядра делятся между процессами, а не между потоками OpenCV внутри каждого
+    cv2.setNumThreads(1)
+    face_database = FaceDatabase()
+    if descriptor is not None:
+        _worker_gallery = SharedArray.attach(descriptor)
+        face_database.load(ids, _worker_gallery.array, layout)
+    _worker_processor = ImageProcessor(face_database)
+
+def _process_segment(segment, annotate_path = None, video_codec = "mp4v"):
+    """
+    Обрабатывает отрезок видеофайла в рабочем процессе без привязки к реальному времени.
+    :return: SegmentResult с лицами по кадрам и временем этапов.
+    """
+    result = SegmentResult(segment)
+    source = FileSource(segment.path, realtime=False, start_frame=segment.start_frame)
+    source.start()
+    writer = None
+    start = time.perf_counter()
+    try:
+        while segment.frame_count is None or result.frames < segment.frame_count:
+            read_start = time.perf_counter()
+            frame = source.read()
+            result.timings["decode"] = result.timings.get("decode", 0.0) + time.perf_counter() - read_start
+            if frame is None:
+                break
+
+            frame_number = segment.start_frame + result.frames
+            # Без аннотированного видео кадр не размечается
+            analyzed = _worker_processor.analyze_frame(frame, 0, result.timings, draw=annotate_path is not None)
+            for detection in analyzed.detections:
+                result.rows.append({
+                    "file": segment.path,
+                    "frame": frame_number,
+                    "timestamp": frame_number / source.file_fps,
+                    "box": list(detection.box),
+                    "label": detection.label,
+                    "distance": float(detection.distance) if detection.distance is not None else None,
+                    "track_id": detection.track_id
+                })
+
+            if annotate_path is not None:
+                write_start = time.perf_counter()
+                if writer is None:
+                    height, width = analyzed.frame.shape[:2]
+                    writer = cv2.VideoWriter(annotate_path, cv2.VideoWriter_fourcc(*video_codec), source.file_fps, (width, height))
+                writer.write(analyzed.frame)
+                result.timings["write"] = result.timings.get("write", 0.0) + time.perf_counter() - write_start
+
+            result.frames += 1
+    finally:
+        result.elapsed = time.perf_counter() - start
+        source.stop()
+        if writer is not None:
+            writer.release()
+        # Следующий отрезок - другое видео: треки и планировщик детекции начинаются заново
+        _worker_processor.release_camera(0)
+    return result
+
+class VideoSegment:
+    """Отрезок видеофайла: frame_count кадров с start_frame (None - до конца файла)."""
+
+    def __init__(self, path, start_frame = 0, frame_count = None):
+        self.path = path
+        self.start_frame = start_frame
+        self.frame_count = frame_count
+
+class SegmentResult:
+    """Результат обработки отрезка: строки лиц, число кадров, время обработки и этапов."""
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.rows = []
+        self.frames = 0
+        self.elapsed = 0.0
+        self.timings = {}
+
+class BatchReport:
+    """Итог пакетной обработки."""
+
+    def __init__(self):
+        self.files = 0
+        self.frames = 0
+        self.detections = 0
+        self.elapsed = 0.0
+        self.timings = {}
+        # Отрезки, обработка которых завершилась ошибкой: (path, start_frame, сообщение)
+        self.errors = []
+
+    @property
+    def fps(self):
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    def add(self, result):
+        self.frames += result.frames
+        self.detections += len(result.rows)
+        for stage, seconds in result.timings.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def add_error(self, segment, error):
+        self.errors.append((segment.path, segment.start_frame, error))
+
+    def print_summary(self):
+        print(f"[STATS] Processed {self.frames} frames from {self.files} files in {self.elapsed:.1f} s: "
+              f"{self.fps:.1f} frames/s, {self.detections} faces")
+        if self.errors:
+            print(f"[STATS] {len(self.errors)} segments failed")
+        total = sum(self.timings.values())
+        for stage in ("decode",) + STAGES + ("write",):
+            seconds = self.timings.get(stage)
+            if seconds is None:
+                continue
+            per_frame = 1000 * seconds / self.frames if self.frames else 0.0
+            share = 100 * seconds / total if total else 0.0
+            print(f"[STATS]   {stage:<10} {per_frame:8.2f} ms/frame  {share:5.1f}%")
+
+class JsonlWriter:
+    """Лица построчно в JSON Lines."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    """Лица в Parquet: каждая пачка строк - отдельная группа строк файла."""
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise RuntimeError("Parquet output requires pyarrow: pip install pyarrow")
+        self.schema = pyarrow.schema([
+            ("file", pyarrow.string()),
+            ("frame", pyarrow.int64()),
+            ("timestamp", pyarrow.float64()),
+            ("box", pyarrow.list_(pyarrow.int32())),
+            ("label", pyarrow.string()),
+            ("distance", pyarrow.float64()),
+            ("track_id", pyarrow.int64())
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        if rows:
+            self.writer.write_table(pyarrow.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+def create_detection_writer(path, output_format = None):
+    """Создаёт писатель лиц по формату (по умолчанию - Config.BATCH["output_format"])."""
+    output_format = output_format or Config().BATCH["output_format"]
+    if output_format == "jsonl":
+        return JsonlWriter(path)
+    elif output_format == "parquet":
+        return ParquetWriter(path)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+class BatchProcessor:
+    """
+    Прогоняет видеофайлы через этапы ImageProcessor с максимальной скоростью.
+    Отрезки файлов обрабатываются параллельно в пуле процессов (у каждого свои модели,
+    галерея передаётся один раз через разделяемую память), кадры читаются без
+    привязки к частоте файла. Кадры одного отрезка идут по порядку - трекер лиц
+    видит непрерывное видео.
+    """
+
+    def __init__(self, face_database, workers = None, segment_frames = None, video_codec = None):
+        cfg = Config().BATCH
+        self.face_database = face_database
+        self.workers = cfg["workers"] if workers is None else workers
+        if self.workers is None:
+            self.workers = os.cpu_count() or 1
+        self.segment_frames = cfg["segment_frames"] if segment_frames is None else segment_frames
+        self.video_codec = video_codec or cfg["video_codec"]
+
+    def _split(self, path):
+        """Делит файл на отрезки по segment_frames кадров."""
+        if not self.segment_frames:
+            return [VideoSegment(path)]
+
+        cap = cv2.VideoCapture(path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        cap.release()
+        if frame_count <= self.segment_frames:
+            return [VideoSegment(path)]
+
+        segments = []
+        for start_frame in range(0, frame_count, self.segment_frames):
+            last = start_frame + self.segment_frames >= frame_count
+            # Последний отрезок - до конца файла: счётчик кадров контейнера бывает неточным
+            segments.append(VideoSegment(path, start_frame, None if last else self.segment_frames))
+        return segments
+
+    def _annotate_path(self, segment, annotate_dir, segmented):
+        name = os.path.splitext(os.path.basename(segment.path))[0]
+        if segmented:
+            name += f"_{segment.start_frame:08d}"
+        return os.path.join(annotate_dir, f"{name}_annotated.mp4")
+
+    def run(self, paths, writer = None, annotate_dir = None):
+        """
+        :param paths: Пути к видеофайлам.
+        :param writer: Писатель лиц (create_detection_writer) или None.
+        :param annotate_dir: Папка для аннотированных видео или None.
+        :return: BatchReport.
+        """
+        report = BatchReport()
+        report.files = len(paths)
+        if annotate_dir is not None:
+            os.makedirs(annotate_dir, exist_ok=True)
+
+        ids, vectors, layout = self.face_database.index.export()
+        gallery = None
+        if ids:
+            gallery = SharedArray(vectors.shape, np.float32)
+            np.copyto(gallery.array, vectors)
+
+        start = time.perf_counter()
+        try:
+            # spawn: рабочие процессы не наследуют состояние OpenCV и моделей родителя
+            with ProcessPoolExecutor(
+                max_workers = self.workers,
+                mp_context = multiprocessing.get_context("spawn"),
+                initializer = _init_worker,
+                initargs = (ids, gallery.descriptor if gallery is not None else None, layout)
+            ) as executor:
+                pending = {}
+                for path in paths:
+                    segments = self._split(path)
+                    for segment in segments:
+                        annotate_path = self._annotate_path(segment, annotate_dir, len(segments) > 1) if annotate_dir else None
+                        pending[executor.submit(_process_segment, segment, annotate_path, self.video_codec)] = segment
+
+                for future in as_completed(pending):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Испорченный файл или упавший отрезок не прерывает пакет: остальные отрезки продолжаются
+                        segment = pending[future]
+                        error = f"{type(e).__name__}: {e}"
+                        print(f"[ERROR] {segment.path} [{segment.start_frame}]: {error}")
+                        report.add_error(segment, error)
+                        continue
+                    report.add(result)
+                    if writer is not None:
+                        writer.write(result.rows)
+                    print(f"[INFO] {result.segment.path} [{result.segment.start_frame}+{result.frames}]: "
+                          f"{result.frames / result.elapsed if result.elapsed else 0.0:.1f} frames/s, {len(result.rows)} faces")
+        finally:
+            report.elapsed = time.perf_counter() - start
+            if gallery is not None:
+                gallery.close()
+        return report
@@ -1,92 +1,221 @@
-import cv2
-import os
+import time
+from collections import deque
 from threading import Lock
 from concurrent.futures import ThreadPoolExecutor
-from core.frame_queue import FrameQueue
+from core.result_broker import ResultEvent
+from core.shared_frames import FrameRing
+from core.metrics import get_metrics
+from core.video_source import create_video_sources
 from config import Config
 
 class CameraManager:
-    def __init__(self, image_processor):
+    def __init__(self, image_processor, result_broker = None):
         self.cameras = []
         self.lock = Lock()
         self.is_running = False
         self.camera_threads = {}
-        self.frame_queues = {}
+        self.frame_rings = {}
+        self.latest_results = {}
         self.image_processor = image_processor
-
-        max_workers = min(Config().NUM_CAMERAS, os.cpu_count() or 1)
-        self.thread_pool = ThreadPoolExecutor(max_workers = max_workers)
-
-    def get_available_cameras(self):
-        """Находит доступные камеры."""
-        available_cameras = []
-        for i in range(Config().NUM_CAMERAS):
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                available_cameras.append(i)
-                cap.release()
-        return available_cameras
-
-    def start_capture(self):
-        """Запускает захват кадров с камер в отдельных потоках."""
+        self.result_broker = result_broker
+        self.thread_pool = None
+
+        self.metrics = get_metrics()
+        if self.metrics.enabled:
+            self.metrics.add_collector(self._collect_metrics)
+
+    def start_capture(self, sources = None):
+        """
+        Запускает захват кадров в отдельных потоках.
+        Каждый источник открывается один раз, в своём потоке захвата; камера или файл,
+        которые не открылись, пропускаются, сетевой поток переподключается сам.
+        Индекс камеры - позиция источника в списке, поэтому в self.cameras возможны пропуски.
+        :param sources: Список VideoSource; по умолчанию - из Config.VIDEO_SOURCES.
+        """
         if self.is_running:
             return
 
         self.is_running = True
-        self.cameras = self.get_available_cameras()
-
-        for camera_index in self.cameras:
-            cap = cv2.VideoCapture(camera_index)
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, Config().CAMERA_RESOLUTION[0])
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, Config().CAMERA_RESOLUTION[1])
-            cap.set(cv2.CAP_PROP_FPS, Config().CAMERA_FPS)
-
-            if not cap.isOpened():
-                print(f"Не удалось открыть камеру с индексом {camera_index}")
-                continue
-
-            frame_queue = FrameQueue(max_size = Config().MAX_FRAMES_IN_QUEUE)
-            self.thread_pool.submit(self._capture_loop, camera_index, cap, frame_queue)
-
-            self.camera_threads[camera_index] = cap
-            self.frame_queues[camera_index] = frame_queue
-
-    def _capture_loop(self, camera_index, cap, frame_queue):
-        while self.is_running:
-            ret, frame = cap.read()
-            if not ret:
-                print(f"Не удалось получить изображение с камеры {camera_index}")
-                break
-
-            processed_frame = self.image_processor.process_frame(frame)     # Обрабатываем кадр
-            frame_queue.put(processed_frame)                                # Сохраняем обработанный кадр
-
+        sources = create_video_sources() if sources is None else sources
+
+        # Источники открываются параллельно, каждый в своём потоке
+        for source in sources:
+            source.start()
+        started = []
+        for camera_index, source in enumerate(sources):
+            if source.wait_started():
+                started.append((camera_index, source))
+            else:
+                source.stop()
+        self.cameras = [camera_index for camera_index, _ in started]
+
+        # Цикл захвата занимает поток целиком, поэтому потоков столько же, сколько источников
+        self.thread_pool = ThreadPoolExecutor(max_workers = max(len(started), 1))
+        for camera_index, source in started:
+            self.camera_threads[camera_index] = source
+            self.thread_pool.submit(self._capture_loop, camera_index, source)
+
+    def _get_frame_ring(self, camera_index, frame):
+        """
+        Буфер кадров камеры под размер её обработанных кадров.
+        Буфер создаётся по первому кадру источника, поэтому кадры URL и файлов хранятся в своём
+        разрешении без пересчёта, а боксы Detection остаются в координатах кадра. Если размер
+        изменился (например, после переподключения), буфер пересоздаётся с новым ring_id.
+        """
+        shape = frame.shape if frame.ndim == 3 else frame.shape + (3,)
+        frame_ring = self.frame_rings.get(camera_index)
+        if frame_ring is not None and frame_ring.shape == shape:
+            return frame_ring
+
+        new_ring = FrameRing(shape, capacity = Config().MAX_FRAMES_IN_QUEUE)
         with self.lock:
-            if camera_index in self.camera_threads:
-                self.camera_threads.pop(camera_index)
-            if camera_index in self.frame_queues:
-                self.frame_queues.pop(camera_index)
-
-        cap.release()
+            if frame_ring is not None:
+                self.frame_rings.pop(camera_index).close()
+            self.frame_rings[camera_index] = new_ring
+        return new_ring
+
+    def _capture_loop(self, camera_index, source):
+        # Кадры в обработке; при пуле процессов следующий кадр захватывается, пока идёт обработка текущего
+        pending = deque()
+        metrics = self.metrics
+        camera_labels = (("camera", str(camera_index)),)
+        try:
+            while self.is_running:
+                start = time.perf_counter() if metrics.enabled else None
+                frame = source.read()
+                if frame is None:
+                    if self.is_running:
+                        print(f"Не удалось получить изображение с камеры {camera_index}")
+                    break
+
+                timestamp = time.time()
+                if start is not None:
+                    metrics.observe_stage("capture", camera_index, time.perf_counter() - start)
+                pending.append((self.image_processor.submit(frame, camera_index), timestamp))    # Обрабатываем кадр
+                if metrics.enabled:
+                    metrics.set("pipeline_pending", len(pending), camera_labels)
+                if len(pending) >= self.image_processor.pipeline_depth:
+                    self._publish(camera_index, *pending.popleft())                 # Сохраняем обработанный кадр
+
+            while pending:
+                self._publish(camera_index, *pending.popleft())
+        except Exception as e:
+            print(f"[ERROR] Camera {camera_index}: capture stopped: {type(e).__name__}: {e}")
+        finally:
+            with self.lock:
+                if camera_index in self.camera_threads:
+                    self.camera_threads.pop(camera_index)
+                if camera_index in self.frame_rings:
+                    self.frame_rings.pop(camera_index).close()
+                self.latest_results.pop(camera_index, None)
+
+            source.stop()
+
+    def _publish(self, camera_index, future, timestamp):
+        """Кладёт обработанный кадр в буфер камеры и раздаёт его подписчикам."""
+        start = time.perf_counter() if self.metrics.enabled else None
+        try:
+            result = future.result()
+        except Exception as e:
+            # Ошибка обработки одного кадра не останавливает камеру: кадр пропускается
+            print(f"[ERROR] Camera {camera_index}: frame skipped: {type(e).__name__}: {e}")
+            return
+        if start is not None:
+            # Ожидание результата: время обработки, не перекрытое захватом следующих кадров
+            now = time.perf_counter()
+            self.metrics.observe_stage("inference_wait", camera_index, now - start)
+            self.metrics.observe_stage("latency", camera_index, time.time() - timestamp)
+            start = now
+
+        frame_ring = self._get_frame_ring(camera_index, result.frame)
+        sequence = frame_ring.put(result.frame, timestamp)
+        event = ResultEvent(camera_index, sequence, timestamp, result.frame, result.detections, frame_ring.ring_id)
+        self.latest_results[camera_index] = event
+        if self.result_broker is not None and self.result_broker.has_subscribers:
+            self.result_broker.publish(event)
+
+        if start is not None:
+            self.metrics.observe_stage("publish", camera_index, time.perf_counter() - start)
 
     def get_frames(self):
-        """Возвращает все кадры из очереди."""
-        frames = {}
-        for camera_index, frame_queue in self.frame_queues.items():
-            frames[camera_index] = frame_queue.get_all()
-        return frames
+        """Возвращает непрочитанные кадры из буферов камер."""
+        return {
+            camera_index: [record.frame for record in records]
+            for camera_index, records in self.get_frame_records().items()
+        }
+
+    def get_frame_records(self):
+        """
+        Возвращает непрочитанные кадры из буферов камер вместе с номерами и временем.
+        :return: Словарь {camera_index: [RingFrame, ...]}.
+        """
+        records = {}
+        with self.lock:
+            for camera_index, frame_ring in self.frame_rings.items():
+                records[camera_index] = frame_ring.read_new()
+        return records
+
+    def get_latest_results(self):
+        """
+        Возвращает результат последнего обработанного кадра каждой камеры.
+        :return: Словарь {camera_index: ResultEvent}.
+        """
+        return dict(self.latest_results)
+
+    def get_source_stats(self):
+        """
+        Возвращает счётчики источников видео по камерам.
+        :return: Словарь {camera_index: {"grabbed", "decoded", "reconnects"}}.
+        """
+        with self.lock:
+            return {camera_index: source.get_stats() for camera_index, source in self.camera_threads.items()}
+
+    def _collect_metrics(self):
+        values = []
+        for camera_index, stats in self.get_buffer_stats().items():
+            labels = (("camera", str(camera_index)),)
+            values.append(("ring_frames_written_total", "counter", labels, stats["written"]))
+            values.append(("ring_frames_overwritten_total", "counter", labels, stats["overwritten"]))
+            values.append(("ring_frames_dropped_total", "counter", labels, stats["dropped"]))
+        for camera_index, stats in self.get_source_stats().items():
+            labels = (("camera", str(camera_index)),)
+            values.append(("source_frames_grabbed_total", "counter", labels, stats["grabbed"]))
+            values.append(("source_frames_decoded_total", "counter", labels, stats["decoded"]))
+            # Захваченные, но не отданные на обработку кадры
+            values.append(("source_frames_skipped_total", "counter", labels, stats["grabbed"] - stats["decoded"]))
+            values.append(("source_reconnects_total", "counter", labels, stats["reconnects"]))
+        return values
+
+    def get_buffer_stats(self):
+        """
+        Возвращает счётчики буферов кадров по камерам.
+        :return: Словарь {camera_index: {"capacity", "written", "overwritten", "dropped"}}.
+        """
+        with self.lock:
+            return {camera_index: frame_ring.get_stats() for camera_index, frame_ring in self.frame_rings.items()}
 
     def stop_capture(self):
         """Останавливает захват кадров и освобождает ресурсы."""
         self.is_running = False
 
-        # Создаем копию ключей для итерации
-        self.thread_pool.shutdown(wait=True)  # Ожидаем завершения всех потоков
+        # Останавливаем источники, чтобы циклы захвата не ждали следующего кадра
+        with self.lock:
+            sources = list(self.camera_threads.values())
+        for source in sources:
+            source.stop()
+
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=True)  # Ожидаем завершения всех потоков
+            self.thread_pool = None
 
         # Очищаем словари, так как все потоки завершены
         self.cameras = []
         self.camera_threads = {}
-        self.frame_queues = {}
+        self.latest_results = {}
+        with self.lock:
+            for frame_ring in self.frame_rings.values():
+                frame_ring.close()
+            self.frame_rings = {}
 
     def __del__(self):
         self.stop_capture()
\ No newline at end of file
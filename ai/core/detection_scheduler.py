@@ -0,0 +1,312 @@
+import time
+import cv2
+import numpy as np
+from config import Config
+from core.frame_formats import BGR, GRAY, FramePreprocessor
+from core.motion_gate import create_motion_gate, create_region_of_interest
+
+def _to_gray(frame):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if len(frame.shape) == 3 else frame
+
+def _clip_box(box, width, height):
+    left, top, right, bottom = (int(v) for v in box)
+    return max(left, 0), max(top, 0), min(right, width), min(bottom, height)
+
+class BoxPropagator:
+    """Переносит боксы лиц с кадра полной детекции на следующие кадры."""
+
+    # Представление кадра исходного размера, которое получают reset() и propagate()
+    input_color = BGR
+
+    def reset(self, frame, boxes):
+        raise NotImplementedError()
+
+    def propagate(self, frame):
+        """
+        :return: (boxes, dropped) - боксы на новом кадре и число потерянных боксов.
+        """
+        raise NotImplementedError()
+
+class OpticalFlowPropagator(BoxPropagator):
+    """Сдвиг и масштаб боксов по медиане разреженного оптического потока (Lucas-Kanade)."""
+
+    input_color = GRAY
+
+    def __init__(self, max_corners = 30, min_points = 4):
+        self.max_corners = max_corners
+        self.min_points = min_points
+        self.prev_gray = None
+        self.boxes = []
+
+    def reset(self, frame, boxes):
+        self.prev_gray = _to_gray(frame)
+        self.boxes = [tuple(int(v) for v in box) for box in boxes]
+
+    def propagate(self, frame):
+        gray = _to_gray(frame)
+        height, width = gray.shape[:2]
+
+        # Точки всех боксов отслеживаются одним вызовом calcOpticalFlowPyrLK
+        all_points = []
+        owners = []
+        for box_index, box in enumerate(self.boxes):
+            left, top, right, bottom = _clip_box(box, width, height)
+            if right - left < 8 or bottom - top < 8:
+                continue
+            points = cv2.goodFeaturesToTrack(
+                self.prev_gray[top:bottom, left:right], self.max_corners, 0.01, 3
+            )
+            if points is None or len(points) < self.min_points:
+                continue
+            all_points.append(points.reshape(-1, 2) + (left, top))
+            owners.append(np.full(len(points), box_index))
+
+        new_boxes = []
+        if all_points:
+            points = np.concatenate(all_points).astype(np.float32)
+            owners = np.concatenate(owners)
+            next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+                self.prev_gray, gray, points.reshape(-1, 1, 2), None, winSize=(15, 15), maxLevel=2
+            )
+            next_points = next_points.reshape(-1, 2)
+            tracked = status.ravel() == 1
+
+            for box_index in np.unique(owners):
+                selected = tracked & (owners == box_index)
+                if selected.sum() < self.min_points:
+                    continue
+                old, new = points[selected], next_points[selected]
+                shift = np.median(new - old, axis=0)
+                old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1).mean()
+                new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1).mean()
+                scale = np.clip(new_spread / old_spread, 0.8, 1.25) if old_spread > 1e-3 else 1.0
+
+                left, top, right, bottom = self.boxes[box_index]
+                cx, cy = (left + right) / 2 + shift[0], (top + bottom) / 2 + shift[1]
+                w, h = (right - left) * scale / 2, (bottom - top) * scale / 2
+                new_boxes.append((int(cx - w), int(cy - h), int(cx + w), int(cy + h)))
+
+        dropped = len(self.boxes) - len(new_boxes)
+        self.prev_gray = gray
+        self.boxes = new_boxes
+        return new_boxes, dropped
+
+class OpenCVTrackerPropagator(BoxPropagator):
+    """Трекеры OpenCV (KCF, MOSSE) - по одному на бокс."""
+
+    FACTORIES = {
+        "kcf": ("TrackerKCF_create", "legacy.TrackerKCF_create"),
+        "mosse": ("legacy.TrackerMOSSE_create", "TrackerMOSSE_create")
+    }
+
+    def __init__(self, tracker_type):
+        self.factory = self._find_factory(tracker_type)
+        if self.factory is None:
+            raise ValueError(f"OpenCV tracker '{tracker_type}' is not available in this cv2 build")
+        self.trackers = []
+
+    @classmethod
+    def _find_factory(cls, tracker_type):
+        for name in cls.FACTORIES.get(tracker_type, ()):
+            target = cv2
+            for part in name.split("."):
+                target = getattr(target, part, None)
+                if target is None:
+                    break
+            if target is not None:
+                return target
+        return None
+
+    def reset(self, frame, boxes):
+        self.trackers = []
+        for left, top, right, bottom in boxes:
+            tracker = self.factory()
+            tracker.init(frame, (int(left), int(top), int(right - left), int(bottom - top)))
+            self.trackers.append(tracker)
+
+    def propagate(self, frame):
+        boxes = []
+        alive = []
+        for tracker in self.trackers:
+            ok, (x, y, w, h) = tracker.update(frame)
+            if ok:
+                boxes.append((int(x), int(y), int(x + w), int(y + h)))
+                alive.append(tracker)
+        dropped = len(self.trackers) - len(alive)
+        self.trackers = alive
+        return boxes, dropped
+
+def create_box_propagator(propagator_type):
+    if propagator_type == "optical_flow":
+        return OpticalFlowPropagator()
+    elif propagator_type in OpenCVTrackerPropagator.FACTORIES:
+        try:
+            return OpenCVTrackerPropagator(propagator_type)
+        except ValueError as e:
+            print(f"[WARNING] {e}, falling back to optical flow.")
+            return OpticalFlowPropagator()
+    else:
+        raise ValueError(f"Unsupported box propagator: {propagator_type}")
+
+class DetectionScheduler:
+    """
+    Запускает полную детекцию раз в detect_every кадров, при движении вне известных
+    лиц (новый человек в кадре) или когда трекер потерял бокс, а между ними переносит
+    боксы дешёвым трекером.
+    Перед всем этим стоит датчик движения: пока в области интереса камеры ничего
+    не происходит, кадр не обрабатывается. Детекция идёт только внутри области интереса.
+    """
+
+    MOTION_SIZE = (80, 60)
+    MOTION_PIXEL_THRESHOLD = 25
+
+    def __init__(self, face_detector, camera_index = 0, detect_every = 5, motion_trigger = True,
+                 motion_threshold = 0.02, propagator = "optical_flow", report_interval = 10,
+                 motion_gate = None, roi = None):
+        self.face_detector = face_detector
+        self.camera_index = camera_index
+        self.detect_every = max(1, detect_every)
+        self.motion_trigger = motion_trigger
+        self.motion_threshold = motion_threshold
+        self.propagator = create_box_propagator(propagator) if self.detect_every > 1 else None
+        self.report_interval = report_interval
+        self.motion_gate = motion_gate
+        self.roi = roi
+        # Представления кропа области интереса для детектора
+        self.roi_frames = None
+
+        self.boxes = None
+        self.frames_since_detection = 0
+        self.prev_small = None
+
+        self.frames = 0
+        self.detections = 0
+        self.dropped = 0
+        self.gated = 0
+        self._last_report = time.time()
+
+    def _changed_pixels(self, frames):
+        """Маска изменившихся пикселей уменьшенного кадра или None, если сравнивать не с чем."""
+        if self.motion_gate is not None:
+            # Разность уже посчитана датчиком движения
+            return self.motion_gate.changed
+
+        # Уменьшенный серый кадр строится из уменьшенного цветного, без прохода по полному кадру
+        small = frames.get(GRAY, self.MOTION_SIZE)
+        prev_small, self.prev_small = self.prev_small, small
+        if prev_small is None:
+            return None
+        changed = cv2.absdiff(small, prev_small) > self.MOTION_PIXEL_THRESHOLD
+        if self.roi is not None:
+            changed &= self.roi.get_mask(self.MOTION_SIZE)
+        return changed
+
+    def _motion_outside_boxes(self, changed, frame_shape):
+        """Доля изменившихся пикселей уменьшенного кадра вне текущих боксов."""
+        if changed is None:
+            return False
+
+        changed = changed.copy()
+        scale_x = changed.shape[1] / frame_shape[1]
+        scale_y = changed.shape[0] / frame_shape[0]
+        for left, top, right, bottom in self.boxes or ():
+            changed[max(int(top * scale_y), 0):int(bottom * scale_y) + 1,
+                    max(int(left * scale_x), 0):int(right * scale_x) + 1] = False
+        return changed.mean() > self.motion_threshold
+
+    def detect_faces(self, frames):
+        """
+        :param frames: FramePreprocessor текущего кадра.
+        :return: Боксы лиц в координатах исходного кадра.
+        """
+        self.frames += 1
+
+        if self.motion_gate is not None and not self.motion_gate.update(frames):
+            # Движения нет: сцена не изменилась, поэтому последние боксы остаются верными и
+            # неподвижное лицо не пропадает; после паузы - с полной детекции
+            self.frames_since_detection = self.detect_every
+            self.prev_small = None
+            self.gated += 1
+            self._report()
+            return list(self.boxes or ())
+
+        if self.propagator is None:
+            boxes = self._detect(frames)
+            self.detections += 1
+        else:
+            changed = self._changed_pixels(frames) if self.motion_trigger else None
+            need_detection = (
+                self.boxes is None
+                or self.frames_since_detection + 1 >= self.detect_every
+                or self._motion_outside_boxes(changed, frames.shape)
+            )
+
+            if not need_detection:
+                boxes, dropped = self.propagator.propagate(frames.get(self.propagator.input_color))
+                self.frames_since_detection += 1
+                self.dropped += dropped
+                # Трекер потерял бокс, а лицо могло остаться в кадре: кадр детектируется полностью
+                need_detection = dropped > 0
+
+            if need_detection:
+                boxes = self._detect(frames)
+                self.propagator.reset(frames.get(self.propagator.input_color), boxes)
+                self.frames_since_detection = 0
+                self.detections += 1
+
+        self.boxes = boxes
+        self._report()
+        return boxes
+
+    def _detect(self, frames):
+        """Полная детекция; с областью интереса - на её кропе, лица с центром вне области отбрасываются."""
+        if self.roi is None:
+            return self.face_detector.detect(frames)
+
+        size = frames.size
+        left, top, right, bottom = self.roi.get_box(size)
+        if self.roi_frames is None:
+            self.roi_frames = FramePreprocessor(frames.detection_blur)
+        self.roi_frames.reset(frames.frame[top:bottom, left:right])
+
+        boxes = []
+        for x1, y1, x2, y2 in self.face_detector.detect(self.roi_frames):
+            box = (x1 + left, y1 + top, x2 + left, y2 + top)
+            if self.roi.contains(box, size):
+                boxes.append(box)
+        return boxes
+
+    def get_stats(self):
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "detection_rate": self.detections / self.frames if self.frames else 0.0,
+            "dropped": self.dropped,
+            "gated": self.gated
+        }
+
+    def _report(self):
+        current_time = time.time()
+        if not self.report_interval or current_time - self._last_report < self.report_interval:
+            return
+        stats = self.get_stats()
+        print(f"[STATS] Camera {self.camera_index}: detection rate {100 * stats['detection_rate']:.1f}% "
+              f"({stats['detections']}/{stats['frames']} frames), {stats['gated']} frames without motion, "
+              f"{stats['dropped']} boxes dropped")
+        self._last_report = current_time
+
+def create_detection_scheduler(face_detector, camera_index):
+    """Создаёт планировщик детекции камеры по Config.FACE_DETECTOR["cadence"]."""
+    cfg = Config().FACE_DETECTOR["cadence"]
+    roi = create_region_of_interest(camera_index)
+    return DetectionScheduler(
+        face_detector,
+        camera_index = camera_index,
+        detect_every = cfg["detect_every"],
+        motion_trigger = cfg["motion_trigger"],
+        motion_threshold = cfg["motion_threshold"],
+        propagator = cfg["propagator"],
+        report_interval = cfg["report_interval"],
+        motion_gate = create_motion_gate(camera_index, roi),
+        roi = roi
+    )
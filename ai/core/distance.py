@@ -0,0 +1,85 @@
+import numpy as np
+
+# Метрики с той же семантикой, что и distance_metric в DeepFace.verify
+SUPPORTED_METRICS = ("cosine", "euclidean", "euclidean_l2")
+
+_EPS = np.finfo(np.float32).eps
+
+def squared_norms(vectors):
+    """Квадраты норм строк матрицы."""
+    return np.einsum("ij,ij->i", vectors, vectors)
+
+def pairwise_distances(queries, gallery, metric, query_sq_norms = None, gallery_sq_norms = None):
+    """
+    Матрица расстояний (N x M) между запросами и галереей одним матричным умножением.
+    :param queries: Матрица запросов float32 (N x D).
+    :param gallery: Матрица галереи float32 (M x D).
+    :param metric: "cosine", "euclidean" или "euclidean_l2".
+    :param query_sq_norms: Заранее посчитанные квадраты норм запросов (необязательно).
+    :param gallery_sq_norms: Заранее посчитанные квадраты норм галереи (необязательно).
+    """
+    if metric not in SUPPORTED_METRICS:
+        raise ValueError(f"Unsupported distance metric: {metric}")
+
+    if query_sq_norms is None:
+        query_sq_norms = squared_norms(queries)
+    if gallery_sq_norms is None:
+        gallery_sq_norms = squared_norms(gallery)
+
+    dots = queries @ gallery.T
+    if metric == "euclidean":
+        return np.sqrt(np.maximum(query_sq_norms[:, np.newaxis] + gallery_sq_norms[np.newaxis, :] - 2.0 * dots, 0.0))
+
+    norms = np.sqrt(query_sq_norms)[:, np.newaxis] * np.sqrt(gallery_sq_norms)[np.newaxis, :]
+    similarity = dots / np.maximum(norms, _EPS)
+    if metric == "cosine":
+        return 1.0 - similarity
+
+    # Евклидово расстояние между L2-нормированными векторами: sqrt(2 - 2 * cos)
+    return np.sqrt(np.maximum(2.0 - 2.0 * similarity, 0.0))
+
+def select_top_k(distances, ids, k):
+    """
+    Выбирает k ближайших по каждой строке матрицы расстояний.
+    :return: (ids, distances) формы (N x min(k, M)), отсортированные по возрастанию расстояния.
+    """
+    size = distances.shape[1]
+    k = min(k, size)
+    if k < size:
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(size), distances.shape)
+    candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+    order = np.argsort(candidate_distances, axis=1)
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    return ids[candidates], np.take_along_axis(candidate_distances, order, axis=1)
+
+def merge_top_k(ids, distances, k):
+    """
+    Объединяет результаты select_top_k по нескольким частям галереи.
+    :param ids: Список матриц id (N x k_i).
+    :param distances: Список матриц расстояний (N x k_i).
+    :return: (ids, distances) формы (N x min(k, sum k_i)) по возрастанию расстояния.
+    """
+    if len(ids) == 1:
+        return ids[0], distances[0]
+    ids = np.concatenate(ids, axis=1)
+    distances = np.concatenate(distances, axis=1)
+    order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(distances, order, axis=1)
+
+def rank_matches(ids, distances, threshold = None):
+    """
+    Превращает результат select_top_k в ранжированные списки совпадений.
+    :param threshold: Максимальное расстояние совпадения (None - без фильтрации).
+    :return: Список длины N из списков пар (id, distance); позиции с id None пропускаются.
+    """
+    results = []
+    for row_ids, row_distances in zip(ids, distances):
+        matches = []
+        for face_id, distance in zip(row_ids, row_distances):
+            if face_id is None or (threshold is not None and distance > threshold):
+                break
+            matches.append((face_id, float(distance)))
+        results.append(matches)
+    return results
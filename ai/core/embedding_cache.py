@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from config import Config
+
+def get_encoder_signature():
+    """Модель и настройки сравнителя, от которых зависит эмбеддинг изображения."""
+    cfg = Config().FACE_COMPARISON
+    method = cfg["method"]
+    return f"{method}:{json.dumps(cfg[method], sort_keys=True)}"
+
+class EmbeddingCache:
+    """
+    Кэш эмбеддингов по хэшу содержимого изображения.
+    Ключ - blake2b(байты изображения + сигнатура модели и настроек), поэтому смена модели
+    автоматически делает старые записи недостижимыми. В памяти - LRU на max_entries
+    записей, на диске (необязательно) - .npy файлы без ограничения размера.
+    Изображения без лица кэшируются пустым массивом, чтобы не кодировать их повторно.
+    """
+
+    def __init__(self, signature, max_entries = 50000, disk_path = None):
+        self.signature = signature.encode("utf-8")
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+
+    def key(self, image_bytes):
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(self.signature)
+        hasher.update(image_bytes)
+        return hasher.hexdigest()
+
+    def _disk_file(self, key):
+        return os.path.join(self.disk_path, key[:2], f"{key}.npy")
+
+    def _remember(self, key, encoding):
+        self._entries[key] = encoding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        :return: Эмбеддинг, пустой массив (в изображении нет лица) или None при промахе.
+        """
+        with self.lock:
+            encoding = self._entries.get(key)
+            if encoding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoding
+
+        if self.disk_path:
+            try:
+                encoding = np.load(self._disk_file(key))
+            except (OSError, ValueError):
+                encoding = None
+            if encoding is not None:
+                with self.lock:
+                    self._remember(key, encoding)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return encoding
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, encoding):
+        """Сохраняет эмбеддинг; encoding = None означает, что лицо не найдено."""
+        if encoding is None:
+            encoding = np.empty(0, dtype=np.float32)
+        encoding = np.asarray(encoding, dtype=np.float32)
+
+        with self.lock:
+            self._remember(key, encoding)
+
+        if self.disk_path:
+            path = self._disk_file(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, encoding)
+            os.replace(tmp_path, path)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+def create_embedding_cache():
+    """Создаёт кэш по Config.EMBEDDING_CACHE или возвращает None, если он выключен."""
+    cfg = Config().EMBEDDING_CACHE
+    if not cfg["enabled"]:
+        return None
+    return EmbeddingCache(
+        signature = get_encoder_signature(),
+        max_entries = cfg["max_entries"],
+        disk_path = cfg["disk_path"]
+    )
@@ -0,0 +1,264 @@
+import os
+import json
+import struct
+import threading
+import numpy as np
+from config import Config
+from core.face_database import get_model_signature
+
+class EmbeddingStore:
+    """
+    Хранилище галереи на диске.
+
+    gallery.<поколение>.bin - снимок: заголовок (модель, размерность, число лиц), матрица
+    float32 и таблица id в JSON. Матрица загружается через numpy.memmap, поэтому холодный
+    старт не читает файл целиком, а несколько процессов на хосте делят одни страницы.
+    gallery.current - имя действующего снимка. Свёртка пишет снимок следующего поколения
+    и переключает указатель, не трогая отображённый в память файл (в Windows его нельзя
+    заменить или удалить); старые поколения удаляются, когда их больше никто не держит.
+    gallery.log - журнал изменений после снимка (upsert/delete), дописывается в конец
+    и периодически сворачивается в новый снимок.
+    """
+
+    SNAPSHOT_MAGIC = b"RVAGSNAP"
+    LOG_MAGIC = b"RVAGLOG1"
+    VERSION = 1
+    # magic, version, dim, count, ids_offset, ids_size, model
+    SNAPSHOT_HEADER = struct.Struct("<8sIIQQQ64s")
+    # magic, version, model
+    LOG_HEADER = struct.Struct("<8sI64s")
+    # op, id_size, dim
+    LOG_RECORD = struct.Struct("<BII")
+    DATA_OFFSET = 128
+
+    OP_UPSERT = 1
+    OP_DELETE = 2
+
+    def __init__(self, path, model_signature, compact_after = 1000):
+        self.path = path
+        self.model_signature = model_signature
+        self.compact_after = compact_after
+        self.current_path = os.path.join(path, "gallery.current")
+        self.log_path = os.path.join(path, "gallery.log")
+
+        self.lock = threading.Lock()
+        self.dim = 0
+        self.generation = 0
+        self.log_records = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _encode_model(self):
+        return self.model_signature.encode("utf-8")[:64]
+
+    def _snapshot_path(self, generation):
+        return os.path.join(self.path, f"gallery.{generation:06d}.bin")
+
+    @property
+    def snapshot_path(self):
+        """Путь к действующему снимку."""
+        return self._snapshot_path(self.generation)
+
+    def _read_current(self):
+        """:return: Поколение действующего снимка; 0 - снимка ещё нет."""
+        try:
+            with open(self.current_path, "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return 0
+
+        try:
+            return int(name.split(".")[1])
+        except (IndexError, ValueError):
+            print(f"[WARNING] Embedding store pointer is corrupted: {self.current_path}")
+            return 0
+
+    def _remove_stale_snapshots(self):
+        """Удаляет снимки прошлых поколений; занятые (отображённые в память) остаются до следующего раза."""
+        current = os.path.basename(self.snapshot_path)
+        for name in os.listdir(self.path):
+            if name.startswith("gallery.") and name.endswith((".bin", ".bin.tmp")) and name != current:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def _read_snapshot(self):
+        """
+        :return: (ids, vectors) из снимка; vectors - memmap только для чтения.
+        """
+        self.generation = self._read_current()
+        if self.generation == 0 or not os.path.exists(self.snapshot_path):
+            return [], None
+
+        with open(self.snapshot_path, "rb") as f:
+            header = f.read(self.SNAPSHOT_HEADER.size)
+            if len(header) < self.SNAPSHOT_HEADER.size:
+                print(f"[WARNING] Embedding store snapshot is truncated: {self.snapshot_path}")
+                return [], None
+
+            magic, version, dim, count, ids_offset, ids_size, model = self.SNAPSHOT_HEADER.unpack(header)
+            if magic != self.SNAPSHOT_MAGIC or version != self.VERSION:
+                print(f"[WARNING] Unknown embedding store format: {self.snapshot_path}")
+                return [], None
+            stored_model = model.rstrip(b"\0")
+            if stored_model != self._encode_model():
+                print(f"[WARNING] Embedding store was built for model '{stored_model.decode('utf-8')}', ignoring it.")
+                return [], None
+
+            f.seek(ids_offset)
+            ids = json.loads(f.read(ids_size).decode("utf-8"))
+
+        self.dim = dim
+        if count == 0:
+            return ids, None
+
+        vectors = np.memmap(self.snapshot_path, dtype=np.float32, mode="r", offset=self.DATA_OFFSET, shape=(count, dim))
+        return ids, vectors
+
+    def _read_log(self):
+        """
+        :return: Список операций журнала [(op, face_id, vector или None), ...].
+        Недописанная последняя запись (обрыв при записи) отбрасывается.
+        """
+        if not os.path.exists(self.log_path):
+            return []
+
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+
+        if len(data) < self.LOG_HEADER.size:
+            return []
+        magic, version, model = self.LOG_HEADER.unpack_from(data)
+        if magic != self.LOG_MAGIC or version != self.VERSION or model.rstrip(b"\0") != self._encode_model():
+            print("[WARNING] Embedding store log does not match the current model, ignoring it.")
+            return []
+
+        records = []
+        offset = self.LOG_HEADER.size
+        while offset + self.LOG_RECORD.size <= len(data):
+            op, id_size, dim = self.LOG_RECORD.unpack_from(data, offset)
+            end = offset + self.LOG_RECORD.size + id_size
+            vector_size = dim * 4
+            if end + vector_size > len(data):
+                break
+
+            face_id = json.loads(data[offset + self.LOG_RECORD.size:end].decode("utf-8"))
+            vector = None
+            if op == self.OP_UPSERT:
+                vector = np.frombuffer(data, dtype=np.float32, count=dim, offset=end).copy()
+            records.append((op, face_id, vector))
+            offset = end + vector_size
+        return records
+
+    def load(self):
+        """
+        Загружает галерею: снимок через memmap плюс изменения из журнала.
+        Если журнал не пуст, он сразу сворачивается в новый снимок.
+        :return: (ids, vectors); vectors - матрица (N x D) или None для пустой галереи.
+        """
+        with self.lock:
+            ids, vectors = self._read_snapshot()
+            self._remove_stale_snapshots()
+            records = self._read_log()
+            if not records:
+                # Пустой или несовместимый журнал начинаем заново
+                if os.path.exists(self.log_path):
+                    os.remove(self.log_path)
+                self.log_records = 0
+                return ids, vectors
+
+            faces = dict(zip(ids, vectors)) if vectors is not None else {}
+            for op, face_id, vector in records:
+                if op == self.OP_UPSERT:
+                    faces[face_id] = vector
+                else:
+                    faces.pop(face_id, None)
+
+            self._write_snapshot(list(faces.keys()), list(faces.values()))
+            return self._read_snapshot()
+
+    def _write_snapshot(self, ids, vectors):
+        """Записывает снимок следующего поколения, атомарно переключает на него указатель и обнуляет журнал."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        count = len(ids)
+        dim = vectors.shape[1] if count else self.dim
+        ids_data = json.dumps(list(ids), ensure_ascii=False).encode("utf-8")
+        ids_offset = self.DATA_OFFSET + count * dim * 4
+
+        generation = self.generation + 1
+        snapshot_path = self._snapshot_path(generation)
+        tmp_path = snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.SNAPSHOT_HEADER.pack(
+                self.SNAPSHOT_MAGIC, self.VERSION, dim, count, ids_offset, len(ids_data), self._encode_model()
+            ))
+            f.write(b"\0" * (self.DATA_OFFSET - self.SNAPSHOT_HEADER.size))
+            if count:
+                f.write(np.ascontiguousarray(vectors).tobytes())
+            f.write(ids_data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, snapshot_path)
+
+        # Заменяется только маленький файл-указатель; старый снимок остаётся на месте,
+        # и процессы, уже отобразившие его, продолжают читать его до перезагрузки
+        current_tmp_path = self.current_path + ".tmp"
+        with open(current_tmp_path, "w", encoding="utf-8") as f:
+            f.write(os.path.basename(snapshot_path))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp_path, self.current_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+        self.generation = generation
+        self.dim = dim
+        self.log_records = 0
+        self._remove_stale_snapshots()
+
+    def append(self, upserts = None, deletes = None):
+        """
+        Дописывает изменения в журнал.
+        :param upserts: Словарь {face_id: face_encoding}.
+        :param deletes: Итерируемое face_id.
+        :return: True, если журнал вырос до порога свёртки (compact_after записей).
+        """
+        upserts = upserts or {}
+        with self.lock:
+            chunks = []
+            if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0:
+                chunks.append(self.LOG_HEADER.pack(self.LOG_MAGIC, self.VERSION, self._encode_model()))
+
+            for face_id in deletes or ():
+                id_data = json.dumps(face_id, ensure_ascii=False).encode("utf-8")
+                chunks.append(self.LOG_RECORD.pack(self.OP_DELETE, len(id_data), 0) + id_data)
+                self.log_records += 1
+            for face_id, face_encoding in upserts.items():
+                id_data = json.dumps(face_id, ensure_ascii=False).encode("utf-8")
+                vector = np.asarray(face_encoding, dtype=np.float32).ravel()
+                chunks.append(self.LOG_RECORD.pack(self.OP_UPSERT, len(id_data), len(vector)) + id_data + vector.tobytes())
+                self.log_records += 1
+
+            with open(self.log_path, "ab") as f:
+                f.write(b"".join(chunks))
+                f.flush()
+                os.fsync(f.fileno())
+
+            return self.log_records >= self.compact_after
+
+    def compact(self, ids, vectors):
+        """Сворачивает журнал: записывает текущую галерею новым снимком."""
+        with self.lock:
+            self._write_snapshot(ids, vectors)
+
+def create_embedding_store():
+    """Создаёт хранилище по Config.FACE_STORE или возвращает None, если оно выключено."""
+    cfg = Config().FACE_STORE
+    if not cfg["enabled"]:
+        return None
+    return EmbeddingStore(
+        path = cfg["path"],
+        model_signature = get_model_signature(),
+        compact_after = cfg["compact_after"]
+    )
@@ -0,0 +1,232 @@
+import os
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+from core.face_recognizer import FaceRecognizer
+from core.frame_formats import decode_image
+
+NO_FACE_ERROR = "No faces found in image"
+
+# Распознаватель рабочего процесса пула: создаётся один раз при старте процесса
+_worker_recognizer = None
+
+def _init_worker():
+    global _worker_recognizer
+    _worker_recognizer = FaceRecognizer()
+
+def _encode_image(face_recognizer, image_bytes):
+    """
+    Декодирует изображение и вычисляет эмбеддинг первого найденного лица.
+    :return: (encoding, error) - ровно одно из значений не None.
+    """
+    # Изображение декодируется сразу в формат сравнителя, без отдельного преобразования цвета
+    image = decode_image(image_bytes, face_recognizer.input_color)
+    if image is None:
+        return None, "Cannot decode image"
+
+    face_encodings = face_recognizer.encode(image)
+    if not face_encodings:
+        return None, NO_FACE_ERROR
+    return np.asarray(face_encodings[0], dtype=np.float32), None
+
+def _encode_chunk(chunk, face_recognizer = None):
+    """Кодирует пачку [(index, label, image_bytes), ...] в рабочем процессе."""
+    face_recognizer = face_recognizer or _worker_recognizer
+    results = []
+    for index, label, image_bytes in chunk:
+        try:
+            encoding, error = _encode_image(face_recognizer, image_bytes)
+        except Exception as e:
+            encoding, error = None, str(e)
+        results.append(EnrollmentResult(index, label, encoding, error))
+    return results
+
+class EnrollmentResult:
+    """Результат кодирования одного изображения."""
+
+    def __init__(self, index, label, encoding = None, error = None, cached = False):
+        self.index = index
+        self.label = label
+        self.encoding = encoding
+        self.error = error
+        # Результат взят из EmbeddingCache без кодирования
+        self.cached = cached
+
+    @property
+    def success(self):
+        return self.encoding is not None
+
+class EnrollmentReport:
+    """Итог пакетного кодирования: эмбеддинги по лейблам и ошибки по отдельным изображениям."""
+
+    def __init__(self, total):
+        self.total = total
+        self.results = []
+        # Заполняются при публикации в FaceDatabase
+        self.added = 0
+        self.updated = 0
+
+    def extend(self, results):
+        self.results.extend(results)
+
+    @property
+    def processed(self):
+        return len(self.results)
+
+    @property
+    def cache_hits(self):
+        return sum(1 for r in self.results if r.cached)
+
+    @property
+    def succeeded(self):
+        return sum(1 for r in self.results if r.success)
+
+    @property
+    def failures(self):
+        return sorted((r for r in self.results if not r.success), key=lambda r: r.index)
+
+    @property
+    def faces(self):
+        """Словарь {label: encoding}; при повторе лейбла побеждает последнее изображение."""
+        return {r.label: r.encoding for r in sorted(self.results, key=lambda r: r.index) if r.success}
+
+class EnrollmentPipeline:
+    """
+    Пакетное кодирование изображений для базы лиц в пуле процессов.
+    Каждый процесс держит свой FaceRecognizer, поэтому декодирование и кодирование
+    идут параллельно и не упираются в GIL и блокировку распознавателя камер.
+    """
+
+    def __init__(self, workers = None, chunk_size = None, face_recognizer = None, cache = None):
+        cfg = Config().ENROLLMENT
+        self.workers = cfg["workers"] if workers is None else workers
+        if self.workers is None:
+            self.workers = os.cpu_count() or 1
+        self.chunk_size = max(1, cfg["chunk_size"] if chunk_size is None else chunk_size)
+
+        self._executor = None
+        # Распознаватель для режима без пула (workers = 0)
+        self._local_recognizer = face_recognizer
+        # Кэш эмбеддингов по содержимому: неизменённые изображения не кодируются повторно
+        self.cache = cache
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: рабочие процессы не наследуют потоки камер и gRPC
+            self._executor = ProcessPoolExecutor(
+                max_workers = self.workers,
+                mp_context = multiprocessing.get_context("spawn"),
+                initializer = _init_worker
+            )
+        return self._executor
+
+    def _reset_executor(self, executor):
+        """Убирает сломанный пул; следующая пачка создаст новый."""
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False)
+
+    def _submit(self, chunk):
+        """:return: (executor, future) пачки."""
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(_encode_chunk, chunk)
+        except BrokenProcessPool:
+            # Пул сломался на прошлых пачках - пересоздаём его один раз
+            self._reset_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(_encode_chunk, chunk)
+
+    def _chunks(self, items):
+        for start in range(0, len(items), self.chunk_size):
+            yield items[start:start + self.chunk_size]
+
+    def _split_cached(self, images, labels):
+        """
+        Отделяет изображения, эмбеддинги которых уже есть в кэше.
+        :return: (cached_results, pending_items, keys) - keys: {index: ключ кэша}.
+        """
+        cached_results = []
+        pending_items = []
+        keys = {}
+        for index, (image_bytes, label) in enumerate(zip(images, labels)):
+            image_bytes = bytes(image_bytes)
+            if self.cache is not None:
+                key = self.cache.key(image_bytes)
+                encoding = self.cache.get(key)
+                if encoding is not None:
+                    if encoding.size:
+                        cached_results.append(EnrollmentResult(index, label, encoding, cached=True))
+                    else:
+                        cached_results.append(EnrollmentResult(index, label, error=NO_FACE_ERROR, cached=True))
+                    continue
+                keys[index] = key
+            pending_items.append((index, label, image_bytes))
+        return cached_results, pending_items, keys
+
+    def _remember(self, results, keys):
+        if self.cache is None:
+            return
+        for r in results:
+            # Ошибки декодирования и сбои модели не кэшируем: они могут быть случайными
+            if r.success or r.error == NO_FACE_ERROR:
+                self.cache.put(keys[r.index], r.encoding)
+
+    def iter_results(self, images, labels):
+        """
+        Кодирует изображения и отдаёт результаты пачками по мере готовности.
+        Первой пачкой (если есть) идут результаты из кэша.
+        :return: Генератор списков EnrollmentResult (порядок пачек - порядок завершения).
+        """
+        cached_results, pending_items, keys = self._split_cached(images, labels)
+        if cached_results:
+            yield cached_results
+
+        if self.workers == 0:
+            # Без пула: кодируем в текущем процессе
+            if self._local_recognizer is None:
+                self._local_recognizer = FaceRecognizer()
+            for chunk in self._chunks(pending_items):
+                results = _encode_chunk(chunk, self._local_recognizer)
+                self._remember(results, keys)
+                yield results
+            return
+
+        if not pending_items:
+            return
+        futures = {}
+        for chunk in self._chunks(pending_items):
+            executor, future = self._submit(chunk)
+            futures[future] = (chunk, executor)
+        for future in as_completed(futures):
+            chunk, executor = futures[future]
+            try:
+                results = future.result()
+            except BrokenProcessPool as e:
+                # Процесс пула упал: изображения пачки помечаются ошибкой, остальные пачки продолжаются
+                self._reset_executor(executor)
+                error = f"Enrollment worker failed: {e}"
+                yield [EnrollmentResult(index, label, error=error) for index, label, _ in chunk]
+                continue
+            self._remember(results, keys)
+            yield results
+
+    def run(self, images, labels, progress_callback = None):
+        """
+        Кодирует все изображения.
+        :param progress_callback: Вызывается после каждой пачки: callback(report, chunk_results).
+        :return: EnrollmentReport.
+        """
+        report = EnrollmentReport(min(len(images), len(labels)))
+        for results in self.iter_results(images, labels):
+            report.extend(results)
+            if progress_callback is not None:
+                progress_callback(report, results)
+        return report
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -1,27 +1,149 @@
 import threading
+import numpy as np
+from config import Config
+from core.distance import SUPPORTED_METRICS, rank_matches
+from core.face_index import create_face_index
+
+def get_model_signature():
+    """Строка, однозначно описывающая модель эмбеддингов текущего сравнителя."""
+    cfg = Config().FACE_COMPARISON
+    method = cfg["method"]
+    return f"{method}:{cfg[method]['model']}"
 
 class FaceDatabase:
-    def __init__(self):
-        self.known_faces = {}
+    """
+    Галерея известных лиц с публикацией изменений через copy-on-write.
+    Читатели (search, get_*) берут текущий снимок индекса без блокировок; писатели
+    собирают новый индекс в стороне и атомарно подменяют ссылку на него.
+    Если задано хранилище (EmbeddingStore), галерея загружается из него при старте,
+    а каждое изменение записывается в него до публикации.
+    """
+
+    def __init__(self, index = None, store = None):
+        # Блокировка только для писателей: сериализует построение новых снимков
         self.lock = threading.RLock()
+        # Индекс галереи: точный перебор или IVF, по Config.FACE_COMPARISON["index"]
+        self.index = index if index is not None else self._create_index()
+        self.generation = 0
+        self.store = store
 
-    def add_face(self, face_id, face_encoding):
+        if self.store is not None:
+            ids, vectors = self.store.load()
+            if ids:
+                self.index.load(ids, vectors)
+                print(f"[INFO] Loaded {len(ids)} faces from {self.store.path}")
+
+    def _get_metric(self):
+        """Метрика, в которой индекс разбивает галерею, - та же, что у сравнителя."""
+        cfg = Config().FACE_COMPARISON
+        if cfg["method"] == "deepface":
+            return cfg["deepface"]["metric"]
+        return "euclidean"
+
+    def _create_index(self):
+        return create_face_index(self._get_metric())
+
+    def _publish(self, index):
+        """Атомарно подменяет текущий снимок галереи."""
+        self.index = index
+        self.generation += 1
+
+    def __len__(self):
+        return len(self.index)
+
+    def update(self, upserts = None, deletes = None):
+        """
+        Применяет пакет изменений одним новым снимком.
+        :param upserts: Словарь {face_id: face_encoding} - добавить или заменить.
+        :param deletes: Итерируемое face_id для удаления.
+        :return: (added, updated, removed) - количество добавленных, заменённых и удалённых лиц.
+        """
+        added = updated = removed = 0
         with self.lock:
-            self.known_faces[face_id] = face_encoding
+            index = self.index.copy()
+            for face_id in deletes or ():
+                if face_id in index:
+                    index.remove(face_id)
+                    removed += 1
+            for face_id, face_encoding in (upserts or {}).items():
+                if face_id in index:
+                    updated += 1
+                else:
+                    added += 1
+                index.add(face_id, np.asarray(face_encoding, dtype=np.float32).ravel())
 
-    def remove_face(self, face_id):
+            if self.store is not None and self.store.append(upserts, deletes):
+                self.store.compact(index.get_face_ids(), index.get_face_encodings())
+            self._publish(index)
+        return added, updated, removed
+
+    def replace(self, faces):
+        """
+        Заменяет всю галерею, собирая новый индекс с нуля в стороне от читателей.
+        :param faces: Словарь {face_id: face_encoding}.
+        """
+        index = self._create_index()
+        for face_id, face_encoding in faces.items():
+            index.add(face_id, np.asarray(face_encoding, dtype=np.float32).ravel())
         with self.lock:
-            if face_id in self.known_faces:
-                del self.known_faces[face_id]
+            if self.store is not None:
+                self.store.compact(index.get_face_ids(), index.get_face_encodings())
+            self._publish(index)
 
-    def get_face_encodings(self):
+    def load(self, ids, vectors, layout = None):
+        """
+        Заменяет галерею готовой матрицей без копирования (например, из разделяемой памяти).
+        Хранилище при этом не изменяется.
+        :param ids: Список face_id.
+        :param vectors: Матрица эмбеддингов (N x D) или None для пустой галереи.
+        :param layout: Служебные данные индекса из index.export() (центроиды IVF и т. п.).
+        """
+        index = self._create_index()
+        if ids:
+            index.load(ids, vectors, layout)
         with self.lock:
-            return list(self.known_faces.values())
+            self._publish(index)
+
+    def add_face(self, face_id, face_encoding):
+        self.update(upserts={face_id: face_encoding})
+
+    def remove_face(self, face_id):
+        self.update(deletes=[face_id])
+
+    def get_face_encodings(self):
+        return self.index.get_face_encodings()
 
     def get_face_ids(self):
-        with self.lock:
-            return list(self.known_faces.keys())
+        return self.index.get_face_ids()
+
+    def search(self, query_embeddings, k = 1, threshold = None, metric = "euclidean"):
+        """
+        Ищет ближайшие лица для пакета эмбеддингов одной матричной операцией.
+        :param query_embeddings: Эмбеддинг или список/матрица эмбеддингов (N x D).
+        :param k: Количество ближайших совпадений для каждого запроса.
+        :param threshold: Максимальное расстояние совпадения (None - без фильтрации).
+        :param metric: Метрика расстояния: "cosine", "euclidean" или "euclidean_l2".
+        :return: Список длины N, каждый элемент - список пар (id, distance) по возрастанию расстояния.
+        """
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported distance metric: {metric}")
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        if queries.size == 0:
+            return []
+
+        # Снимок индекса неизменяем, поэтому поиск идёт без блокировки
+        index = self.index
+        if len(index) == 0:
+            return [[] for _ in range(queries.shape[0])]
+        ids, distances = index.search(queries, k, metric)
+
+        return rank_matches(ids, distances, threshold)
 
     def clear(self):
         with self.lock:
-            self.known_faces.clear()
\ No newline at end of file
+            if self.store is not None:
+                self.store.compact([], [])
+            self._publish(self._create_index())
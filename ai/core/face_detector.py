@@ -1,24 +1,39 @@
 import cv2
+import time
+import queue
+import threading
 import numpy as np
 import face_recognition
 from config import Config
+from core.frame_formats import BGR, GRAY, RGB, FramePreprocessor
 
 class FaceDetectorBase:
+    # Вход детектора: цвет и размер (None - исходный); представление строит FramePreprocessor
+    input_color = BGR
+    input_size = None
+
     def detect_faces(self, frame):
+        """Детекция на отдельном кадре BGR или в оттенках серого."""
+        return self.detect(FramePreprocessor.of(frame))
+
+    def detect(self, frames):
+        """
+        Детекция на кадре конвейера.
+        :param frames: FramePreprocessor текущего кадра.
+        :return: Боксы (left, top, right, bottom) в координатах исходного кадра.
+        """
         raise NotImplementedError()
 
 class HaarCascadeDetector(FaceDetectorBase):
+    input_color = GRAY
+
     def __init__(self, cascade_path, scale_factor = 1.1, min_neighbors = 5):
         self.face_cascade = cv2.CascadeClassifier(cascade_path)
         self.scale_factor = scale_factor
         self.min_neighbors = min_neighbors
 
-    def detect_faces(self, frame):
-        if len(frame.shape) == 3:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = frame
-
+    def detect(self, frames):
+        gray = frames.get_detection_input(GRAY)
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor = self.scale_factor,
@@ -26,20 +41,115 @@ class HaarCascadeDetector(FaceDetectorBase):
         )
         return [(x, y, x+w, y+h) for (x, y, w, h) in faces]
 
-class SSDDetector(FaceDetectorBase):
-    def __init__(self, prototxt_path, model_path, confidence_threshold = 0.7):
+class _SSDRequest:
+    def __init__(self, blob_image, size):
+        self.blob_image = blob_image
+        self.size = size
+        self.event = threading.Event()
+        self.faces = None
+        self.error = None
+
+class SSDBatchService:
+    """
+    Пакетный инференс SSD для всех камер: собирает кадры, пришедшие в течение max_wait_ms
+    (но не больше max_batch_size), строит один blob через cv2.dnn.blobFromImages,
+    делает один net.forward и раздаёт боксы обратно вызывающим потокам.
+    Сеть используется только потоком сервиса, поэтому вызовы из разных камер безопасны.
+    """
+
+    _services = {}
+    _services_lock = threading.Lock()
+
+    def __init__(self, prototxt_path, model_path, confidence_threshold = 0.7, max_batch_size = 4, max_wait_ms = 5):
         self.net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
         self.confidence_threshold = confidence_threshold
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
 
-    def detect_faces(self, frame):
-        (h, w) = frame.shape[:2]
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def shared(cls, prototxt_path, model_path, confidence_threshold, max_batch_size, max_wait_ms):
+        """Один сервис (и одна сеть) на модель для всех детекторов процесса."""
+        key = (prototxt_path, model_path, confidence_threshold, max_batch_size, max_wait_ms)
+        with cls._services_lock:
+            if key not in cls._services:
+                cls._services[key] = cls(prototxt_path, model_path, confidence_threshold, max_batch_size, max_wait_ms)
+            return cls._services[key]
+
+    def detect_faces(self, blob_image, size):
+        """
+        :param blob_image: Кадр BGR, уже приведённый к 300x300; не изменяется до возврата.
+        :param size: (w, h) исходного кадра для пересчёта координат.
+        """
+        request = _SSDRequest(blob_image, size)
+        self.requests.put(request)
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return request.faces
+
+    def _collect_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
 
-        if len(frame.shape) == 2:
-            bgr_frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                blob = cv2.dnn.blobFromImages([r.blob_image for r in batch], 1.0,
+                                              (300, 300), (104.0, 177.0, 123.0))
+                self.net.setInput(blob)
+                detections = self.net.forward()
+
+                # Колонка 0 - номер изображения в пакете
+                for request in batch:
+                    request.faces = []
+                for detection in detections[0, 0]:
+                    image_id = int(detection[0])
+                    if detection[2] > self.confidence_threshold and 0 <= image_id < len(batch):
+                        request = batch[image_id]
+                        w, h = request.size
+                        box = detection[3:7] * np.array([w, h, w, h])
+                        request.faces.append(tuple(box.astype("int")))
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            for request in batch:
+                request.event.set()
+
+class SSDDetector(FaceDetectorBase):
+    # Сеть принимает BGR 300x300: кадр уменьшается до преобразований, без прохода по полному кадру
+    input_size = (300, 300)
+
+    def __init__(self, prototxt_path, model_path, confidence_threshold = 0.7, batch = None):
+        self.confidence_threshold = confidence_threshold
+        self.batch_service = None
+        if batch and batch["enabled"]:
+            self.batch_service = SSDBatchService.shared(
+                prototxt_path, model_path, confidence_threshold, batch["max_batch_size"], batch["max_wait_ms"]
+            )
         else:
-            bgr_frame = frame
+            self.net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+
+    def detect(self, frames):
+        (w, h) = frames.size
+        resized = frames.get_detection_input(BGR, self.input_size)
+        if self.batch_service is not None:
+            return self.batch_service.detect_faces(resized, (w, h))
 
-        blob = cv2.dnn.blobFromImage(cv2.resize(bgr_frame, (300, 300)), 1.0, 
+        blob = cv2.dnn.blobFromImage(resized, 1.0,
                                    (300, 300), (104.0, 177.0, 123.0))
         self.net.setInput(blob)
         detections = self.net.forward()
@@ -54,17 +164,22 @@ class SSDDetector(FaceDetectorBase):
         return faces
 
 class FaceRecognitionDetector(FaceDetectorBase):
+    input_color = RGB
+    # Детекторы dlib в face_recognition - объекты модуля, общие для всех потоков процесса
+    _model_lock = threading.Lock()
+
     def __init__(self, model = "hog", number_of_times_to_upsample = 1):
         self.model = model
         self.number_of_times_to_upsample = number_of_times_to_upsample
 
-    def detect_faces(self, frame):
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(
-            rgb_image,
-            model = self.model,
-            number_of_times_to_upsample = self.number_of_times_to_upsample
-        )
+    def detect(self, frames):
+        rgb_image = frames.get_detection_input(RGB)
+        with self._model_lock:
+            face_locations = face_recognition.face_locations(
+                rgb_image,
+                model = self.model,
+                number_of_times_to_upsample = self.number_of_times_to_upsample
+            )
         return [(left, top, right, bottom) for (top, right, bottom, left) in face_locations]
 
 class FaceDetector:
@@ -84,7 +199,8 @@ class FaceDetector:
             self.detector = SSDDetector(
                 prototxt_path = params["prototxt_path"],
                 model_path = params["model_path"],
-                confidence_threshold = params["confidence_threshold"]
+                confidence_threshold = params["confidence_threshold"],
+                batch = params["batch"]
             )
         elif self.detector_type == "face_recognition":
             params = cfg["face_recognition"]
@@ -95,5 +211,12 @@ class FaceDetector:
         else:
             raise ValueError(f"Unsupported detector type: {self.detector_type}")
 
+    @property
+    def input_color(self):
+        return self.detector.input_color
+
     def detect_faces(self, frame):
-        return self.detector.detect_faces(frame)
\ No newline at end of file
+        return self.detector.detect_faces(frame)
+
+    def detect(self, frames):
+        return self.detector.detect(frames)
\ No newline at end of file
@@ -0,0 +1,567 @@
+import copy
+import numpy as np
+from config import Config
+from core.distance import SUPPORTED_METRICS, merge_top_k, pairwise_distances, select_top_k, squared_norms
+
+class _Tail:
+    """
+    Буфер дописываемых строк, общий для копий блока.
+    Копия пишет только за пределами строк, видимых другим снимкам (length),
+    поэтому уже опубликованные снимки читают свою часть буфера без блокировок.
+    """
+
+    def __init__(self, capacity, dim):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.sq_norms = np.zeros(capacity, dtype=np.float32)
+        self.ids = np.empty(capacity, dtype=object)
+        self.length = 0
+
+    @property
+    def capacity(self):
+        return self.vectors.shape[0]
+
+class _Segment:
+    """
+    Неизменяемая часть блока: основа, общая для всех снимков, или срез хвоста.
+    Квадраты норм основы считаются при первом поиске, а не при загрузке: для memmap
+    это означает, что файл не читается целиком на холодном старте.
+    """
+
+    def __init__(self, ids, vectors, sq_norms = None):
+        self.vectors = vectors
+        self.ids = ids
+        self._sq_norms = sq_norms
+
+    @classmethod
+    def adopt(cls, ids, vectors):
+        object_ids = np.empty(len(ids), dtype=object)
+        object_ids[:] = ids
+        return cls(object_ids, vectors)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def sq_norms(self):
+        sq_norms = self._sq_norms
+        if sq_norms is None:
+            # Гонка читателей безопасна: все посчитают одно и то же
+            sq_norms = self._sq_norms = squared_norms(self.vectors)
+        return sq_norms
+
+class _VectorBlock:
+    """
+    Матрица эмбеддингов с copy-on-write на уровне структуры.
+
+    Строки лежат в неизменяемой основе (принятой через adopt, например memmap хранилища)
+    и в дописываемом хвосте (_Tail). Добавление дописывает строку в хвост, удаление и
+    замена помечают старую строку надгробием. copy() копирует только словарь строк и
+    множество надгробий, а основа и хвост остаются общими для всех снимков.
+    Когда надгробий становится больше четверти живых строк, блок уплотняется в новую память.
+    """
+
+    COMPACT_MIN_DEAD = 64
+
+    def __init__(self, initial_capacity = 64):
+        self.initial_capacity = initial_capacity
+        self._base = None
+        self._tail = None
+        self._tail_size = 0
+        self._rows = {}
+        self._dead = set()
+        self._dead_rows = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, face_id):
+        return face_id in self._rows
+
+    @property
+    def _base_size(self):
+        return 0 if self._base is None else len(self._base)
+
+    @property
+    def dim(self):
+        if self._base is not None:
+            return self._base.vectors.shape[1]
+        if self._tail is not None:
+            return self._tail.vectors.shape[1]
+        return None
+
+    def _segments(self):
+        """Части блока: [(_Segment, первая строка)]."""
+        segments = []
+        if self._base_size:
+            segments.append((self._base, 0))
+        if self._tail_size:
+            tail = self._tail
+            size = self._tail_size
+            segments.append((_Segment(tail.ids[:size], tail.vectors[:size], tail.sq_norms[:size]), self._base_size))
+        return segments
+
+    def _live_mask(self, start, size):
+        mask = np.ones(size, dtype=bool)
+        dead = self._get_dead_rows() - start
+        mask[dead[(dead >= 0) & (dead < size)]] = False
+        return mask
+
+    def _get_dead_rows(self):
+        # Снимок неизменяем, поэтому массив надгробий строится один раз
+        dead_rows = self._dead_rows
+        if dead_rows is None:
+            dead_rows = self._dead_rows = np.fromiter(self._dead, dtype=np.int64, count=len(self._dead))
+        return dead_rows
+
+    @property
+    def ids(self):
+        """Живые id по порядку строк."""
+        parts = [segment.ids[self._live_mask(start, len(segment))] for segment, start in self._segments()]
+        if not parts:
+            return np.empty(0, dtype=object)
+        return np.concatenate(parts)
+
+    @property
+    def vectors(self):
+        """Копия живых эмбеддингов по порядку строк (N x D)."""
+        parts = [segment.vectors[self._live_mask(start, len(segment))] for segment, start in self._segments()]
+        if not parts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.concatenate(parts)
+
+    def copy(self):
+        block = _VectorBlock.__new__(_VectorBlock)
+        block.__dict__.update(self.__dict__)
+        block._rows = dict(self._rows)
+        block._dead = set(self._dead)
+        return block
+
+    def adopt(self, ids, vectors):
+        """
+        Принимает готовую матрицу без копирования (в том числе memmap только для чтения)
+        как неизменяемую основу блока.
+        """
+        self.__init__(self.initial_capacity)
+        self._base = _Segment.adopt(ids, vectors)
+        self._rows = {face_id: row for row, face_id in enumerate(ids)}
+
+    def _reserve_tail(self, dim):
+        """Готовит хвост к записи строки; чужой или заполненный хвост переносится в новую память."""
+        tail = self._tail
+        if tail is not None and tail.length == self._tail_size and self._tail_size < tail.capacity:
+            return tail
+
+        capacity = self.initial_capacity if tail is None else max(tail.capacity * 2, self.initial_capacity)
+        new_tail = _Tail(capacity, dim)
+        if tail is not None:
+            size = self._tail_size
+            new_tail.vectors[:size] = tail.vectors[:size]
+            new_tail.sq_norms[:size] = tail.sq_norms[:size]
+            new_tail.ids[:size] = tail.ids[:size]
+            new_tail.length = size
+        self._tail = new_tail
+        return new_tail
+
+    def add(self, face_id, vector):
+        dim = self.dim
+        if dim is not None and dim != vector.shape[0]:
+            raise ValueError(f"Embedding size mismatch: expected {dim}, got {vector.shape[0]}")
+
+        if face_id in self._rows:
+            self.remove(face_id)
+
+        tail = self._reserve_tail(vector.shape[0])
+        row = self._tail_size
+        tail.vectors[row] = vector
+        tail.sq_norms[row] = np.dot(vector, vector)
+        tail.ids[row] = face_id
+        self._tail_size = tail.length = row + 1
+        self._rows[face_id] = self._base_size + row
+
+    def remove(self, face_id):
+        row = self._rows.pop(face_id, None)
+        if row is None:
+            return False
+
+        self._dead.add(row)
+        self._dead_rows = None
+        if len(self._dead) > max(self.COMPACT_MIN_DEAD, len(self._rows) // 4):
+            self._compact()
+        return True
+
+    def _compact(self):
+        """Переносит живые строки в новую плотную память, отбрасывая надгробия."""
+        ids, vectors = self.ids, self.vectors
+        self.__init__(self.initial_capacity)
+        if len(ids):
+            tail = self._tail = _Tail(max(len(ids), self.initial_capacity), vectors.shape[1])
+            tail.vectors[:len(ids)] = vectors
+            tail.sq_norms[:len(ids)] = squared_norms(vectors)
+            tail.ids[:len(ids)] = ids
+            self._tail_size = tail.length = len(ids)
+            self._rows = {face_id: row for row, face_id in enumerate(ids)}
+
+    def search(self, queries, query_sq_norms, k, metric):
+        result_ids = []
+        result_distances = []
+        dead_rows = self._get_dead_rows()
+        for segment, start in self._segments():
+            distances = pairwise_distances(queries, segment.vectors, metric, query_sq_norms, segment.sq_norms)
+            if len(dead_rows):
+                dead = dead_rows - start
+                distances[:, dead[(dead >= 0) & (dead < len(segment))]] = np.inf
+            top_ids, top_distances = select_top_k(distances, segment.ids, k)
+            result_ids.append(top_ids)
+            result_distances.append(top_distances)
+
+        if not result_ids:
+            return np.empty((len(queries), 0), dtype=object), np.empty((len(queries), 0), dtype=np.float32)
+        ids, distances = merge_top_k(result_ids, result_distances, k)
+        if len(dead_rows):
+            # Надгробия остаются в конце выдачи с бесконечным расстоянием - как недостающие позиции
+            ids = np.where(np.isinf(distances), None, ids)
+        return ids, distances
+
+class FaceIndexBase:
+    def __len__(self):
+        raise NotImplementedError()
+
+    def __contains__(self, face_id):
+        raise NotImplementedError()
+
+    def add(self, face_id, embedding):
+        raise NotImplementedError()
+
+    def remove(self, face_id):
+        raise NotImplementedError()
+
+    def search(self, queries, k, metric):
+        """
+        :param queries: Матрица запросов float32 (N x D).
+        :return: (ids, distances) формы (N x k); недостающие позиции - None и inf.
+        """
+        raise NotImplementedError()
+
+    def get_face_ids(self):
+        raise NotImplementedError()
+
+    def get_face_encodings(self):
+        raise NotImplementedError()
+
+    def clear(self):
+        raise NotImplementedError()
+
+    def load(self, ids, vectors, layout = None):
+        """
+        Заполняет пустой индекс готовыми массивами (например, из EmbeddingStore).
+        :param layout: Служебные данные из export() индекса того же типа (например, центроиды IVF);
+                       с ними индекс принимается как есть, без переобучения.
+        """
+        for face_id, vector in zip(ids, vectors):
+            self.add(face_id, np.asarray(vector, dtype=np.float32))
+
+    def export(self):
+        """
+        Галерея одной матрицей для передачи в другие процессы (вместе с load()).
+        :return: (ids, vectors, layout); vectors - матрица (N x D) или None для пустой галереи.
+        """
+        ids = self.get_face_ids()
+        vectors = np.asarray(self.get_face_encodings(), dtype=np.float32) if ids else None
+        return ids, vectors, None
+
+    def copy(self):
+        """
+        Независимая копия индекса: изменения копии не видны читателям оригинала.
+        Реализации делят с оригиналом память эмбеддингов и копируют только служебные структуры.
+        """
+        return copy.deepcopy(self)
+
+class BruteForceIndex(FaceIndexBase):
+    """Точный поиск полным перебором по всей матрице галереи."""
+
+    def __init__(self):
+        self._block = _VectorBlock()
+
+    def __len__(self):
+        return len(self._block)
+
+    def __contains__(self, face_id):
+        return face_id in self._block
+
+    def add(self, face_id, embedding):
+        self._block.add(face_id, embedding)
+
+    def remove(self, face_id):
+        self._block.remove(face_id)
+
+    def search(self, queries, k, metric):
+        query_sq_norms = squared_norms(queries)
+        return self._block.search(queries, query_sq_norms, k, metric)
+
+    def load(self, ids, vectors, layout = None):
+        self._block.adopt(ids, vectors)
+
+    def export(self):
+        ids = self._block.ids.tolist()
+        return ids, self._block.vectors if ids else None, None
+
+    def copy(self):
+        index = BruteForceIndex()
+        index._block = self._block.copy()
+        return index
+
+    def get_face_ids(self):
+        return self._block.ids.tolist()
+
+    def get_face_encodings(self):
+        return list(self._block.vectors)
+
+    def clear(self):
+        self._block = _VectorBlock()
+
+class IVFIndex(FaceIndexBase):
+    """
+    Приближённый поиск по инвертированным спискам (IVF).
+    Галерея разбивается k-means на nlist кластеров, запрос просматривает nprobe ближайших.
+    До накопления min_train_size лиц работает как полный перебор.
+    """
+
+    TRAIN_CHUNK_SIZE = 16384
+
+    def __init__(self, metric = "euclidean", nlist = 256, nprobe = 8, min_train_size = 10000,
+                 max_train_size = 100000, kmeans_iterations = 20, seed = 0):
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported distance metric: {metric}")
+
+        self.metric = metric
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = max(min_train_size, nlist)
+        self.max_train_size = max_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.clear()
+
+    def __len__(self):
+        return len(self._list_of_id)
+
+    def __contains__(self, face_id):
+        return face_id in self._list_of_id
+
+    @property
+    def is_trained(self):
+        return self._centroids is not None
+
+    def _partition_space(self, vectors):
+        """Приводит векторы к пространству, в котором обучены центроиды."""
+        if self.metric in ("cosine", "euclidean_l2"):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            return vectors / np.maximum(norms, np.finfo(np.float32).eps)
+        return vectors
+
+    def _centroid_distances(self, vectors):
+        vectors = self._partition_space(vectors)
+        return pairwise_distances(vectors, self._centroids, "euclidean", gallery_sq_norms = self._centroid_sq_norms)
+
+    def _assign(self, vectors):
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], self.TRAIN_CHUNK_SIZE):
+            chunk = vectors[start:start + self.TRAIN_CHUNK_SIZE]
+            assignments[start:start + len(chunk)] = np.argmin(self._centroid_distances(chunk), axis=1)
+        return assignments
+
+    def _set_centroids(self, centroids):
+        self._centroids = centroids.astype(np.float32)
+        self._centroid_sq_norms = squared_norms(self._centroids)
+
+    def train(self):
+        """Обучает (или переобучает) центроиды k-means и заново раскладывает галерею по спискам."""
+        ids = np.array(self.get_face_ids(), dtype=object)
+        if len(ids) < self.nlist:
+            return
+
+        vectors = np.array(self.get_face_encodings(), dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        sample = vectors
+        if len(vectors) > self.max_train_size:
+            sample = vectors[rng.choice(len(vectors), self.max_train_size, replace=False)]
+        sample = self._partition_space(sample)
+
+        self._set_centroids(sample[rng.choice(len(sample), self.nlist, replace=False)])
+        for _ in range(self.kmeans_iterations):
+            assignments = self._assign(sample)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=self.nlist)
+            non_empty = np.nonzero(counts)[0]
+            starts = np.concatenate(([0], np.cumsum(counts[non_empty])[:-1]))
+
+            centroids = self._centroids.copy()
+            centroids[non_empty] = np.add.reduceat(sample[order], starts, axis=0) / counts[non_empty, np.newaxis]
+
+            # Пустые кластеры переинициализируем случайными точками выборки
+            empty = np.nonzero(counts == 0)[0]
+            if len(empty):
+                centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+            self._set_centroids(centroids)
+
+        self._lists = [_VectorBlock(initial_capacity=8) for _ in range(self.nlist)]
+        self._pending = _VectorBlock()
+        self._list_of_id = {}
+        for face_id, vector, list_no in zip(ids, vectors, self._assign(vectors)):
+            self._lists[list_no].add(face_id, vector)
+            self._list_of_id[face_id] = int(list_no)
+
+    def add(self, face_id, embedding):
+        if face_id in self._list_of_id:
+            self.remove(face_id)
+
+        if not self.is_trained:
+            self._pending.add(face_id, embedding)
+            self._list_of_id[face_id] = -1
+            if len(self._pending) >= self.min_train_size:
+                self.train()
+            return
+
+        list_no = int(self._assign(embedding[np.newaxis, :])[0])
+        self._lists[list_no].add(face_id, embedding)
+        self._list_of_id[face_id] = list_no
+
+    def load(self, ids, vectors, layout = None):
+        """
+        Принимает матрицу без копирования. Без layout лица попадают в общий список
+        и при необходимости индекс обучается; с layout из export() обученного индекса
+        центроиды и списки принимаются как есть - списки становятся срезами матрицы.
+        """
+        ids = list(ids)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if layout is None:
+            self._pending.adopt(ids, vectors)
+            self._list_of_id = {face_id: -1 for face_id in ids}
+            if len(self._pending) >= self.min_train_size:
+                self.train()
+            return
+
+        list_sizes = layout["list_sizes"]
+        if len(list_sizes) != self.nlist + 1:
+            raise ValueError(f"IVF layout has {len(list_sizes) - 1} lists, expected {self.nlist}")
+
+        self._set_centroids(layout["centroids"])
+        offsets = np.concatenate(([0], np.cumsum(list_sizes)))
+        blocks = []
+        self._list_of_id = {}
+        # Блок 0 - общий список необученных лиц, далее списки по номерам
+        for block_no in range(len(list_sizes)):
+            start, end = int(offsets[block_no]), int(offsets[block_no + 1])
+            block = _VectorBlock() if block_no == 0 else _VectorBlock(initial_capacity=8)
+            if end > start:
+                block.adopt(ids[start:end], vectors[start:end])
+                self._list_of_id.update(dict.fromkeys(ids[start:end], block_no - 1))
+            blocks.append(block)
+        self._pending = blocks[0]
+        self._lists = blocks[1:]
+
+    def export(self):
+        """Матрица упорядочена по спискам, а layout хранит центроиды и размеры списков."""
+        if not self.is_trained:
+            ids = self._pending.ids.tolist()
+            return ids, self._pending.vectors if ids else None, None
+
+        ids = []
+        parts = []
+        list_sizes = []
+        for block in self._blocks():
+            block_ids = block.ids.tolist()
+            ids.extend(block_ids)
+            list_sizes.append(len(block_ids))
+            if block_ids:
+                parts.append(block.vectors)
+        vectors = np.concatenate(parts) if parts else None
+        return ids, vectors, {"centroids": self._centroids, "list_sizes": np.array(list_sizes, dtype=np.int64)}
+
+    def remove(self, face_id):
+        list_no = self._list_of_id.pop(face_id, None)
+        if list_no is None:
+            return
+        if list_no < 0:
+            self._pending.remove(face_id)
+        else:
+            self._lists[list_no].remove(face_id)
+
+    def search(self, queries, k, metric):
+        query_sq_norms = squared_norms(queries)
+        if not self.is_trained:
+            return self._pending.search(queries, query_sq_norms, k, metric)
+
+        nprobe = min(self.nprobe, self.nlist)
+        centroid_distances = self._centroid_distances(queries)
+        probes = np.argpartition(centroid_distances, nprobe - 1, axis=1)[:, :nprobe]
+
+        candidate_ids = [[] for _ in range(len(queries))]
+        candidate_distances = [[] for _ in range(len(queries))]
+        for list_no in np.unique(probes):
+            block = self._lists[list_no]
+            if len(block) == 0:
+                continue
+
+            # Все запросы, просматривающие этот список, считаются одной матричной операцией
+            query_rows = np.nonzero((probes == list_no).any(axis=1))[0]
+            ids, distances = block.search(queries[query_rows], query_sq_norms[query_rows], k, metric)
+            for row, query_row in enumerate(query_rows):
+                candidate_ids[query_row].append(ids[row])
+                candidate_distances[query_row].append(distances[row])
+
+        result_ids = np.full((len(queries), k), None, dtype=object)
+        result_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for query_row in range(len(queries)):
+            if not candidate_ids[query_row]:
+                continue
+            ids = np.concatenate(candidate_ids[query_row])
+            distances = np.concatenate(candidate_distances[query_row])
+            top_ids, top_distances = select_top_k(distances[np.newaxis, :], ids, k)
+            result_ids[query_row, :top_ids.shape[1]] = top_ids[0]
+            result_distances[query_row, :top_distances.shape[1]] = top_distances[0]
+        return result_ids, result_distances
+
+    def _blocks(self):
+        return [self._pending] + self._lists
+
+    def copy(self):
+        index = copy.copy(self)
+        # Центроиды после обучения не меняются (train создаёт новые), поэтому остаются общими
+        index._lists = [block.copy() for block in self._lists]
+        index._pending = self._pending.copy()
+        index._list_of_id = dict(self._list_of_id)
+        return index
+
+    def get_face_ids(self):
+        return [face_id for block in self._blocks() for face_id in block.ids.tolist()]
+
+    def get_face_encodings(self):
+        return [vector for block in self._blocks() for vector in block.vectors]
+
+    def clear(self):
+        self._centroids = None
+        self._centroid_sq_norms = None
+        self._lists = []
+        self._pending = _VectorBlock()
+        self._list_of_id = {}
+
+def create_face_index(metric = "euclidean"):
+    """Создаёт индекс галереи по Config.FACE_COMPARISON["index"]."""
+    cfg = Config().FACE_COMPARISON["index"]
+    index_type = cfg["type"]
+
+    if index_type == "brute_force":
+        return BruteForceIndex()
+    elif index_type == "ivf":
+        params = cfg["ivf"]
+        return IVFIndex(
+            metric = metric,
+            nlist = params["nlist"],
+            nprobe = params["nprobe"],
+            min_train_size = params["min_train_size"],
+            max_train_size = params["max_train_size"],
+            kmeans_iterations = params["kmeans_iterations"]
+        )
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
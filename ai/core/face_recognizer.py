@@ -1,86 +1,106 @@
 import threading
 import numpy as np
 from config import Config
+from core.distance import SUPPORTED_METRICS
+from core.frame_formats import BGR, RGB, color_of, convert_color
 from deepface import DeepFace
 import face_recognition
 
 class FaceComparer:
+    # Метрика и порог, с которыми эмбеддинги этого сравнителя ищутся в FaceDatabase
+    metric = "euclidean"
+    # Формат изображения, который принимает модель
+    input_color = BGR
+
     def get_face_encodings(self, image):
+        """Эмбеддинги лиц на изображении BGR (или в оттенках серого)."""
+        return self.encode(convert_color(image, color_of(image), self.input_color))
+
+    def encode(self, image):
+        """Эмбеддинги лиц на изображении, уже приведённом к input_color."""
         raise NotImplementedError()
-    
-    def compare_faces(self, face_encodings, known_face_encodings):
+
+    def get_threshold(self):
         raise NotImplementedError()
 
+    def rank_faces(self, face_encodings, face_database, k = 1, threshold = None):
+        """
+        Ранжирует известные лица для каждой кодировки одним пакетным поиском.
+        :param threshold: Максимальное расстояние совпадения (None - порог сравнителя).
+        :return: Список той же длины, что и face_encodings: списки (id, distance) по возрастанию расстояния.
+        """
+        if not face_encodings:
+            return []
+
+        return face_database.search(
+            face_encodings,
+            k = k,
+            threshold = self.get_threshold() if threshold is None else threshold,
+            metric = self.metric
+        )
+
+    def match_faces(self, face_encodings, face_database):
+        """
+        Находит ближайшее известное лицо для каждой кодировки.
+        :return: Список той же длины, что и face_encodings: (id, distance) или None.
+        """
+        return [matches[0] if matches else None for matches in self.rank_faces(face_encodings, face_database)]
+
 class FaceRecognitionComparer(FaceComparer):
+    input_color = RGB
+    # face_recognition держит кодировщик dlib в модуле, один на процесс, а dlib не отпускает GIL:
+    # одновременные вызовы из потоков камер не ускоряются и не безопасны
+    _model_lock = threading.Lock()
+
     def __init__(self):
         cfg = Config().FACE_COMPARISON["face_recognition"]
         self.model = cfg["model"]
         self.num_jitters = cfg["num_jitters"]
         self.tolerance = cfg["tolerance"]
 
-    def get_face_encodings(self, image):
+    def encode(self, image):
         try:
-            rgb_image = np.array(image[:, :, ::-1])  # BGR to RGB
-            return face_recognition.face_encodings(
-                rgb_image,
-                num_jitters = self.num_jitters,
-                model = self.model
-            )
+            with self._model_lock:
+                return face_recognition.face_encodings(
+                    image,
+                    num_jitters = self.num_jitters,
+                    model = self.model
+                )
         except Exception as e:
             print(f"FaceRecognition error: {str(e)}")
             return []
 
-    def compare_faces(self, face_encodings, known_face_encodings):
-        if not face_encodings or not known_face_encodings:
-            return []
-            
-        return face_recognition.compare_faces(
-            known_face_encodings,
-            face_encodings[0],
-            tolerance = self.tolerance
-        )
+    def get_threshold(self):
+        return self.tolerance
 
 class DeepFaceComparer(FaceComparer):
+    # DeepFace кэширует модели глобально, поэтому все экземпляры в процессе делят одну модель
+    _model_lock = threading.Lock()
+
     def __init__(self):
         cfg = Config().FACE_COMPARISON["deepface"]
         self.model_name = cfg["model"]
         self.metric = cfg["metric"]
         self.detector_backend = cfg["detector_backend"]
 
-    def get_face_encodings(self, image):
+        if self.metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported distance metric: {self.metric}")
+
+    def encode(self, image):
         try:
-            result = DeepFace.represent(
-                img_path = image,
-                model_name = self.model_name,
-                detector_backend = self.detector_backend,
-                enforce_detection = False
-            )
+            with self._model_lock:
+                result = DeepFace.represent(
+                    img_path = image,
+                    model_name = self.model_name,
+                    detector_backend = self.detector_backend,
+                    enforce_detection = False
+                )
             return [np.array(r["embedding"]) for r in result] if result else []
         except Exception as e:
             print(f"DeepFace error: {str(e)}")
             return []
 
-    def compare_faces(self, face_encodings, known_face_encodings):
-        if not face_encodings or not known_face_encodings:
-            return []
-
-        distances = []
-        for known_enc in known_face_encodings:
-            result = DeepFace.verify(
-                img1_path = None,
-                img2_path = None,
-                model_name = self.model_name,
-                distance_metric = self.metric,
-                detector_backend = self.detector_backend,
-                embeddings = [face_encodings[0], known_enc]
-            )
-            distances.append(result["distance"])
-
-        # Нормализация расстояний в булевы значения
-        threshold = self._get_threshold()
-        return [d <= threshold for d in distances]
-
-    def _get_threshold(self):
+    def get_threshold(self):
         # Пороговые значения для разных моделей
         thresholds = {
             "VGG-Face": 0.55,
@@ -94,7 +114,6 @@ class DeepFaceComparer(FaceComparer):
 class FaceRecognizer:
     def __init__(self):
         method = Config().FACE_COMPARISON["method"]
-        self.lock = threading.Lock()  # Добавляем блокировку
 
         if method == "face_recognition":
             self.comparer = FaceRecognitionComparer()
@@ -103,10 +122,21 @@ class FaceRecognizer:
         else:
             raise ValueError(f"Unknown comparison method: {method}")
 
+    @property
+    def input_color(self):
+        return self.comparer.input_color
+
     def get_face_encodings(self, image):
-        with self.lock:
-            return self.comparer.get_face_encodings(image)
+        return self.comparer.get_face_encodings(image)
+
+    def encode(self, image):
+        return self.comparer.encode(image)
+
+    def get_threshold(self):
+        return self.comparer.get_threshold()
+
+    def rank_faces(self, face_encodings, face_database, k = 1, threshold = None):
+        return self.comparer.rank_faces(face_encodings, face_database, k, threshold)
 
-    def compare_faces(self, face_encodings, known_face_encodings):
-        with self.lock:
-            return self.comparer.compare_faces(face_encodings, known_face_encodings)
\ No newline at end of file
+    def match_faces(self, face_encodings, face_database):
+        return self.comparer.match_faces(face_encodings, face_database)
\ No newline at end of file
@@ -0,0 +1,198 @@
+import itertools
+import numpy as np
+from config import Config
+
+def box_iou(boxes_a, boxes_b):
+    """Матрица IoU (N x M) для боксов (left, top, right, bottom)."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    left = np.maximum(a[:, np.newaxis, 0], b[np.newaxis, :, 0])
+    top = np.maximum(a[:, np.newaxis, 1], b[np.newaxis, :, 1])
+    right = np.minimum(a[:, np.newaxis, 2], b[np.newaxis, :, 2])
+    bottom = np.minimum(a[:, np.newaxis, 3], b[np.newaxis, :, 3])
+    intersection = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, np.newaxis] + area_b[np.newaxis, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+class _BoxKalman:
+    """Фильтр Калмана с постоянной скоростью для бокса в виде (cx, cy, w, h)."""
+
+    def __init__(self, box, process_noise = 1e-2, measurement_noise = 1e-1):
+        self.state = np.zeros(8, dtype=np.float64)
+        self.state[:4] = self._to_measurement(box)
+        self.covariance = np.eye(8) * 10.0
+        self.covariance[4:, 4:] *= 100.0
+
+        self.transition = np.eye(8)
+        self.transition[:4, 4:] = np.eye(4)
+        self.observation = np.eye(4, 8)
+        self.process_noise = np.eye(8) * process_noise
+        self.measurement_noise = np.eye(4) * measurement_noise
+
+    @staticmethod
+    def _to_measurement(box):
+        left, top, right, bottom = box
+        return np.array([(left + right) / 2, (top + bottom) / 2, right - left, bottom - top], dtype=np.float64)
+
+    @property
+    def box(self):
+        cx, cy, w, h = self.state[:4]
+        return (int(cx - w / 2), int(cy - h / 2), int(cx + w / 2), int(cy + h / 2))
+
+    def predict(self):
+        self.state = self.transition @ self.state
+        self.covariance = self.transition @ self.covariance @ self.transition.T + self.process_noise
+        return self.box
+
+    def update(self, box):
+        # Шумы измерения масштабируются размером бокса, чтобы фильтр вёл себя одинаково на любых лицах
+        scale = max(self.state[2], self.state[3], 1.0)
+        innovation = self._to_measurement(box) - self.observation @ self.state
+        innovation_covariance = self.observation @ self.covariance @ self.observation.T + self.measurement_noise * scale
+        gain = self.covariance @ self.observation.T @ np.linalg.inv(innovation_covariance)
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(8) - gain @ self.observation) @ self.covariance
+        return self.box
+
+class Track:
+    """Лицо, сопровождаемое между кадрами, и результат его последнего распознавания."""
+
+    def __init__(self, track_id, box, use_kalman):
+        self.track_id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.kalman = _BoxKalman(box) if use_kalman else None
+
+        self.label = None
+        self.distance = None
+        self.recognized = False
+        self.frames_since_recognition = 0
+        self.missed_frames = 0
+
+    def predict(self):
+        if self.kalman is not None:
+            self.box = self.kalman.predict()
+        return self.box
+
+    def update(self, box):
+        self.box = self.kalman.update(box) if self.kalman is not None else tuple(int(v) for v in box)
+        self.missed_frames = 0
+
+    def set_identity(self, match):
+        """Сохраняет результат распознавания: (id, distance) или None (лицо неизвестно)."""
+        self.label, self.distance = match if match is not None else (None, None)
+        self.recognized = True
+        self.frames_since_recognition = 0
+
+class FaceTracker:
+    """
+    Сопоставляет детекции кадра с треками предыдущих кадров (IoU, затем расстояние
+    между центрами) и решает, каким трекам нужно повторное кодирование и сравнение:
+    новым, раз в recognize_every кадров, и (раз в low_confidence_every кадров) тем,
+    чьё совпадение было близко к порогу.
+    """
+
+    _track_ids = itertools.count(1)
+
+    def __init__(self, iou_threshold = 0.3, max_centroid_distance = 0.5, max_missed_frames = 10,
+                 recognize_every = 15, low_confidence_ratio = 0.8, low_confidence_every = 3, use_kalman = True):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_missed_frames = max_missed_frames
+        self.recognize_every = recognize_every
+        self.low_confidence_ratio = low_confidence_ratio
+        self.low_confidence_every = low_confidence_every
+        self.use_kalman = use_kalman
+        self.tracks = []
+
+        # Счётчики для оценки экономии: сколько лиц увидено и сколько из них распознавалось
+        self.detections = 0
+        self.recognitions = 0
+
+    def _associate(self, boxes):
+        """Жадное сопоставление: сначала по IoU, оставшиеся - по расстоянию между центрами."""
+        matches = {}
+        if not self.tracks or not boxes:
+            return matches
+
+        track_boxes = np.array([track.box for track in self.tracks], dtype=np.float32)
+        detection_boxes = np.array(boxes, dtype=np.float32)
+        iou = box_iou(track_boxes, detection_boxes)
+        for track_row, box_row in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+            if iou[track_row, box_row] < self.iou_threshold:
+                break
+            if track_row in matches or box_row in matches.values():
+                continue
+            matches[track_row] = box_row
+
+        track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        detection_centers = (detection_boxes[:, :2] + detection_boxes[:, 2:]) / 2
+        diagonals = np.linalg.norm(track_boxes[:, 2:] - track_boxes[:, :2], axis=1)
+        distances = np.linalg.norm(track_centers[:, np.newaxis] - detection_centers[np.newaxis, :], axis=2)
+        distances /= np.maximum(diagonals[:, np.newaxis], 1.0)
+        for track_row, box_row in zip(*np.unravel_index(np.argsort(distances, axis=None), distances.shape)):
+            if distances[track_row, box_row] > self.max_centroid_distance:
+                break
+            if track_row in matches or box_row in matches.values():
+                continue
+            matches[track_row] = box_row
+        return matches
+
+    def update(self, boxes):
+        """
+        Обновляет треки детекциями очередного кадра.
+        :param boxes: Список боксов (left, top, right, bottom).
+        :return: Список треков той же длины, что и boxes.
+        """
+        for track in self.tracks:
+            track.predict()
+
+        matches = self._associate(boxes)
+        box_to_track = {box_row: self.tracks[track_row] for track_row, box_row in matches.items()}
+
+        result = []
+        for box_row, box in enumerate(boxes):
+            track = box_to_track.get(box_row)
+            if track is None:
+                track = Track(next(self._track_ids), box, self.use_kalman)
+                self.tracks.append(track)
+            else:
+                track.update(box)
+            track.frames_since_recognition += 1
+            result.append(track)
+
+        for track in self.tracks:
+            if track not in result:
+                track.missed_frames += 1
+        self.tracks = [track for track in self.tracks if track.missed_frames <= self.max_missed_frames]
+
+        self.detections += len(boxes)
+        return result
+
+    def needs_recognition(self, track, threshold):
+        """Нужно ли заново кодировать и сравнивать лицо трека на этом кадре."""
+        if not track.recognized or track.frames_since_recognition >= self.recognize_every:
+            needed = True
+        else:
+            low_confidence = track.distance is not None and track.distance > threshold * self.low_confidence_ratio
+            needed = low_confidence and track.frames_since_recognition >= self.low_confidence_every
+
+        if needed:
+            self.recognitions += 1
+        return needed
+
+def create_face_tracker():
+    """Создаёт трекер по Config.TRACKING или возвращает None, если он выключен."""
+    cfg = Config().TRACKING
+    if not cfg["enabled"]:
+        return None
+    return FaceTracker(
+        iou_threshold = cfg["iou_threshold"],
+        max_centroid_distance = cfg["max_centroid_distance"],
+        max_missed_frames = cfg["max_missed_frames"],
+        recognize_every = cfg["recognize_every"],
+        low_confidence_ratio = cfg["low_confidence_ratio"],
+        low_confidence_every = cfg["low_confidence_every"],
+        use_kalman = cfg["kalman"]
+    )
@@ -0,0 +1,142 @@
+import cv2
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from core.metrics import get_metrics
+
+try:
+    from turbojpeg import TurboJPEG
+except ImportError:
+    TurboJPEG = None
+
+FULL = "full"
+PREVIEW = "preview"
+
+class FrameEncoder:
+    """
+    Кодирует кадры в JPEG один раз на кадр для всех клиентов.
+    Ключ кэша - (камера, id кадра, вариант, качество); значение - Future с байтами,
+    поэтому одновременные запросы одного кадра (GetResults, StreamResults) ждут одно
+    и то же кодирование. Кодирование идёт в отдельном пуле потоков: cv2.imencode и
+    TurboJPEG отпускают GIL. Вариант "preview" - уменьшенная до preview_width копия.
+    Любая ошибка кодирования приходит из Future как ValueError.
+    """
+
+    def __init__(self, workers = 4, quality = 80, preview_width = 320, preview_quality = 60,
+                 cache_size = 64, use_turbojpeg = True):
+        self.quality = quality
+        self.preview_width = preview_width
+        self.preview_quality = preview_quality
+        self.cache_size = cache_size
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="frame-encoder")
+
+        self.turbojpeg = None
+        if use_turbojpeg and TurboJPEG is not None:
+            try:
+                self.turbojpeg = TurboJPEG()
+            except OSError as e:
+                print(f"[WARNING] libturbojpeg is not available ({e}), falling back to cv2.imencode.")
+
+        self.lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.metrics = get_metrics()
+        if self.metrics.enabled:
+            self.metrics.add_collector(self._collect_metrics)
+
+    def _collect_metrics(self):
+        stats = self.get_stats()
+        return [
+            ("jpeg_cache_entries", "gauge", (), stats["entries"]),
+            ("jpeg_cache_hits_total", "counter", (), stats["hits"]),
+            ("jpeg_cache_misses_total", "counter", (), stats["misses"])
+        ]
+
+    def _encode(self, frame, rendition, quality):
+        if not self.metrics.enabled:
+            return self._encode_checked(frame, rendition, quality)
+        start = time.perf_counter()
+        data = self._encode_checked(frame, rendition, quality)
+        self.metrics.observe("jpeg_encode_seconds", time.perf_counter() - start, (("rendition", rendition),))
+        return data
+
+    def _encode_checked(self, frame, rendition, quality):
+        """Кодирует кадр; ошибки TurboJPEG и OpenCV приводятся к ValueError."""
+        try:
+            return self._encode_frame(frame, rendition, quality)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"JPEG encoding failed: {type(e).__name__}: {e}") from e
+
+    def _encode_frame(self, frame, rendition, quality):
+        if rendition == PREVIEW and frame.shape[1] > self.preview_width:
+            height = max(1, round(frame.shape[0] * self.preview_width / frame.shape[1]))
+            frame = cv2.resize(frame, (self.preview_width, height), interpolation=cv2.INTER_AREA)
+
+        if self.turbojpeg is not None:
+            return self.turbojpeg.encode(frame, quality=quality)
+
+        success, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not success:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    def _forget_failed(self, key, future):
+        if future.exception() is not None:
+            with self.lock:
+                if self._cache.get(key) is future:
+                    del self._cache[key]
+
+    def submit(self, camera_index, frame_id, frame, rendition = FULL, quality = 0):
+        """
+        :param frame_id: Id кадра, уникальный для камеры за всё время работы, -
+                         (ring_id, sequence) из RingFrame или ResultEvent.
+        :param quality: Качество JPEG 1-100; 0 - по умолчанию для варианта.
+        :return: Future с байтами JPEG.
+        """
+        if not quality:
+            quality = self.preview_quality if rendition == PREVIEW else self.quality
+        key = (camera_index, frame_id, rendition, quality)
+
+        with self.lock:
+            future = self._cache.get(key)
+            if future is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return future
+
+            self.misses += 1
+            future = self.executor.submit(self._encode, frame, rendition, quality)
+            self._cache[key] = future
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        future.add_done_callback(lambda f: self._forget_failed(key, f))
+        return future
+
+    def encode(self, camera_index, frame_id, frame, rendition = FULL, quality = 0):
+        return self.submit(camera_index, frame_id, frame, rendition, quality).result()
+
+    def get_stats(self):
+        with self.lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def create_frame_encoder():
+    """Создаёт кодировщик кадров по Config.FRAME_ENCODER."""
+    cfg = Config().FRAME_ENCODER
+    return FrameEncoder(
+        workers = cfg["workers"],
+        quality = cfg["quality"],
+        preview_width = cfg["preview_width"],
+        preview_quality = cfg["preview_quality"],
+        cache_size = cfg["cache_size"],
+        use_turbojpeg = cfg["turbojpeg"]
+    )
@@ -0,0 +1,151 @@
+import cv2
+import numpy as np
+
+# Цветовые форматы представлений кадра
+BGR = "bgr"
+RGB = "rgb"
+GRAY = "gray"
+
+_CONVERSIONS = {
+    (BGR, RGB): cv2.COLOR_BGR2RGB,
+    (BGR, GRAY): cv2.COLOR_BGR2GRAY,
+    (RGB, BGR): cv2.COLOR_RGB2BGR,
+    (RGB, GRAY): cv2.COLOR_RGB2GRAY,
+    (GRAY, BGR): cv2.COLOR_GRAY2BGR,
+    (GRAY, RGB): cv2.COLOR_GRAY2RGB
+}
+
+def color_of(image):
+    """Формат изображения по числу каналов: GRAY или BGR (цветные кадры OpenCV)."""
+    return GRAY if image.ndim == 2 else BGR
+
+def convert_color(image, source, target, dst = None):
+    """Преобразует цвет; при совпадении форматов возвращает само изображение без копии."""
+    if source == target:
+        return image
+    return cv2.cvtColor(image, _CONVERSIONS[(source, target)], dst=dst)
+
+def decode_image(image_bytes, color = BGR):
+    """Декодирует изображение сразу в нужный формат, без отдельного преобразования цвета."""
+    data = np.frombuffer(image_bytes, np.uint8)
+    if color == GRAY:
+        return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    if color == RGB and hasattr(cv2, "IMREAD_COLOR_RGB"):
+        return cv2.imdecode(data, cv2.IMREAD_COLOR_RGB)
+
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if image is not None and color == RGB:
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    return image
+
+class FramePreprocessor:
+    """
+    Представления одного кадра для этапов конвейера.
+    Детекторы, переносчики боксов и сравнители сами объявляют нужный им цвет и размер,
+    а здесь каждое представление строится не больше одного раза на кадр: сначала
+    уменьшение, затем преобразование цвета и размытие - каждая операция идёт на
+    наименьшем нужном разрешении, без лишних проходов по полному кадру.
+    Буферы переиспользуются через кадр (два комплекта по очереди), поэтому
+    представления предыдущего кадра остаются целыми до следующего reset() - этим
+    пользуется оптический поток. Экземпляр принадлежит одной камере (одному потоку).
+    """
+
+    BLUR_KERNEL = (5, 5)
+
+    def __init__(self, detection_blur = False):
+        # Размытие входа детектора (IMAGE_PROCESSORS "blur")
+        self.detection_blur = detection_blur
+        self.frame = None
+        self.frame_color = BGR
+        self._views = {}
+        self._buffers = ({}, {})
+        self._parity = 0
+
+    @classmethod
+    def of(cls, frame, detection_blur = False):
+        """Препроцессор для одного отдельного изображения."""
+        frames = cls(detection_blur)
+        frames.reset(frame)
+        return frames
+
+    def reset(self, frame):
+        """Начинает новый кадр (BGR или в оттенках серого)."""
+        self.frame = frame
+        self.frame_color = color_of(frame)
+        self._views = {(self.frame_color, None, False): frame}
+        self._parity ^= 1
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    @property
+    def size(self):
+        """(ширина, высота) исходного кадра."""
+        return self.frame.shape[1], self.frame.shape[0]
+
+    def _buffer(self, key, shape):
+        buffers = self._buffers[self._parity]
+        buffer = buffers.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[key] = np.empty(shape, np.uint8)
+        return buffer
+
+    def get(self, color = BGR, size = None, blur = False):
+        """
+        :param color: BGR, RGB или GRAY.
+        :param size: (ширина, высота) или None - исходный размер.
+        :param blur: Размытие по Гауссу.
+        :return: Представление кадра; действительно до следующего кадра после reset().
+        """
+        if size is not None and tuple(size) == self.size:
+            size = None
+        key = (color, tuple(size) if size is not None else None, blur)
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = self._build(*key)
+        return view
+
+    def get_detection_input(self, color, size = None):
+        """Вход детектора: с размытием, если оно включено."""
+        return self.get(color, size, self.detection_blur)
+
+    def _build(self, color, size, blur):
+        channels = () if color == GRAY else (3,)
+        if blur:
+            source = self.get(color, size)
+            return cv2.GaussianBlur(source, self.BLUR_KERNEL, 0, dst=self._buffer((color, size, True), source.shape))
+
+        if size is None:
+            return convert_color(self.frame, self.frame_color, color,
+                                 dst=self._buffer((color, None, False), self.frame.shape[:2] + channels))
+
+        # Уменьшаем то, что уже есть в нужном цвете, иначе - исходный кадр с последующим преобразованием
+        width, height = size
+        full = self._views.get((color, None, False))
+        if full is not None:
+            return cv2.resize(full, size, dst=self._buffer((color, size, False), (height, width) + channels),
+                              interpolation=cv2.INTER_AREA)
+
+        resized = self.get(self.frame_color, size)
+        return convert_color(resized, self.frame_color, color,
+                             dst=self._buffer((color, size, False), (height, width) + channels))
+
+    def crop(self, color, box):
+        """
+        Кроп исходного разрешения в нужном формате (непрерывный массив, можно хранить).
+        Если полный кадр в этом формате уже построен, кроп берётся из него, иначе
+        преобразуется только сам кроп.
+        """
+        width, height = self.size
+        left, top, right, bottom = (int(v) for v in box)
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, width), min(bottom, height)
+
+        full = self._views.get((color, None, False))
+        if full is not None:
+            return np.array(full[top:bottom, left:right])
+        face = self.frame[top:bottom, left:right]
+        if color == self.frame_color or face.size == 0:
+            return np.array(face)
+        return convert_color(face, self.frame_color, color)
@@ -0,0 +1,188 @@
+import os
+import threading
+import numpy as np
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+from core.face_detector import FaceDetector
+from core.face_recognizer import FaceRecognizer
+from core.frame_formats import FramePreprocessor, decode_image
+
+# Детектор и распознаватель рабочего процесса пула: создаются один раз при старте процесса
+_worker_models = None
+
+def _init_worker():
+    global _worker_models
+    _worker_models = (FaceDetector(), FaceRecognizer())
+
+def _detect_and_encode(face_detector, face_recognizer, image_bytes):
+    """
+    Находит все лица на изображении и вычисляет их эмбеддинги.
+    :return: (faces, error) - faces: список (box, encoding).
+    """
+    image = decode_image(image_bytes)
+    if image is None:
+        return [], "Cannot decode image"
+
+    # Детектор и сравнитель берут нужные им представления одного изображения
+    frames = FramePreprocessor.of(image)
+    faces = []
+    for left, top, right, bottom in face_detector.detect(frames):
+        left, top = max(int(left), 0), max(int(top), 0)
+        right, bottom = min(int(right), image.shape[1]), min(int(bottom), image.shape[0])
+        if right <= left or bottom <= top:
+            continue
+
+        encodings = face_recognizer.encode(frames.crop(face_recognizer.input_color, (left, top, right, bottom)))
+        if encodings:
+            faces.append(((left, top, right, bottom), np.asarray(encodings[0], dtype=np.float32)))
+    return faces, None
+
+def _identify_chunk(chunk, models = None):
+    """Детектирует и кодирует лица пачки [(index, image_bytes), ...] в рабочем процессе."""
+    face_detector, face_recognizer = models or _worker_models
+    results = []
+    for index, image_bytes in chunk:
+        try:
+            faces, error = _detect_and_encode(face_detector, face_recognizer, image_bytes)
+        except Exception as e:
+            faces, error = [], str(e)
+        results.append((index, faces, error))
+    return results
+
+class IdentifiedFace:
+    """Лицо на изображении клиента: бокс и ближайшие лица галереи [(label, distance), ...]."""
+
+    def __init__(self, box, matches):
+        self.box = box
+        self.matches = matches
+
+class IdentifyResult:
+    """Результат распознавания одного изображения."""
+
+    def __init__(self, index, faces = None, error = None):
+        self.index = index
+        self.faces = faces or []
+        self.error = error
+
+class IdentificationService:
+    """
+    Распознавание лиц на изображениях, присланных клиентом.
+    Декодирование, детекция и кодирование идут пачками в пуле процессов (у каждого
+    свои FaceDetector и FaceRecognizer), а сравнение с галереей - одним пакетным
+    поиском по FaceDatabase в текущем процессе, поэтому галерея не копируется в пул.
+    Запрос из одного изображения обрабатывается в текущем потоке: запуск пула и
+    передача изображения в процесс стоят дороже самого распознавания.
+    Если процесс пула падает (нехватка памяти, сбой модели), изображения его пачек
+    получают ошибку, а пул пересоздаётся при следующем запросе.
+    """
+
+    def __init__(self, face_database, face_recognizer, workers = None, chunk_size = None, top_k = None):
+        cfg = Config().IDENTIFICATION
+        self.face_database = face_database
+        # Распознаватель задаёт метрику и порог поиска
+        self.face_recognizer = face_recognizer
+        self.workers = cfg["workers"] if workers is None else workers
+        if self.workers is None:
+            self.workers = os.cpu_count() or 1
+        self.chunk_size = max(1, cfg["chunk_size"] if chunk_size is None else chunk_size)
+        self.top_k = cfg["top_k"] if top_k is None else top_k
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Модели для режима без пула (workers = 0), по одной паре на поток gRPC
+        self._local = threading.local()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: рабочие процессы не наследуют потоки камер и gRPC
+                self._executor = ProcessPoolExecutor(
+                    max_workers = self.workers,
+                    mp_context = multiprocessing.get_context("spawn"),
+                    initializer = _init_worker
+                )
+            return self._executor
+
+    def _reset_executor(self, executor):
+        """Убирает сломанный пул; следующий запрос создаст новый."""
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _submit(self, chunk, inline = False):
+        """:return: (executor, future); executor - None, если пачка обработана в текущем потоке."""
+        if self.workers == 0 or inline:
+            # Без пула: в текущем потоке
+            if not hasattr(self._local, "models"):
+                self._local.models = (FaceDetector(), FaceRecognizer())
+            future = Future()
+            future.set_result(_identify_chunk(chunk, self._local.models))
+            return None, future
+
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(_identify_chunk, chunk)
+        except BrokenProcessPool:
+            # Пул сломался на прошлых пачках - пересоздаём его один раз
+            self._reset_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(_identify_chunk, chunk)
+
+    def _collect(self, chunk, executor, future):
+        """Результаты пачки; при падении процесса пула - ошибка для каждого её изображения."""
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            self._reset_executor(executor)
+            error = f"Identification worker failed: {e}"
+            return [(index, [], error) for index, _ in chunk]
+
+    def identify_stream(self, images, top_k = None, threshold = None):
+        """
+        Распознаёт лица на потоке изображений: пачка уходит в пул, как только набрана,
+        поэтому кодирование идёт, пока клиент ещё передаёт следующие изображения.
+        :param images: Итерируемое изображений в формате bytes.
+        :param top_k: Ближайших лиц галереи на каждое найденное лицо.
+        :param threshold: Максимальное расстояние совпадения (None - порог распознавателя).
+        :return: Список IdentifyResult в порядке изображений.
+        """
+        pending = []
+        chunk = []
+        for index, image_bytes in enumerate(images):
+            chunk.append((index, bytes(image_bytes)))
+            if len(chunk) >= self.chunk_size:
+                pending.append((chunk,) + self._submit(chunk))
+                chunk = []
+        if chunk:
+            # Единственное изображение запроса - без пула
+            pending.append((chunk,) + self._submit(chunk, inline = not pending and len(chunk) == 1))
+
+        encoded = [item for chunk, executor, future in pending for item in self._collect(chunk, executor, future)]
+        return self._match(encoded, top_k or self.top_k, threshold)
+
+    def identify(self, images, top_k = None, threshold = None):
+        return self.identify_stream(images, top_k, threshold)
+
+    def _match(self, encoded, top_k, threshold):
+        """Сравнивает все лица всех изображений с галереей одним пакетным поиском."""
+        encodings = [encoding for _, faces, _ in encoded for _, encoding in faces]
+        matches = self.face_recognizer.rank_faces(encodings, self.face_database, top_k, threshold) if encodings else []
+
+        results = []
+        position = 0
+        for index, faces, error in encoded:
+            identified = []
+            for box, _ in faces:
+                identified.append(IdentifiedFace(box, matches[position]))
+                position += 1
+            results.append(IdentifyResult(index, identified, error))
+        return results
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
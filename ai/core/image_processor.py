@@ -1,104 +1,247 @@
 import cv2
-import numpy as np
+import time
 import threading
-from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import Future
 from config import Config
+from core.detection_scheduler import create_detection_scheduler
 from core.face_detector import FaceDetector
 from core.face_recognizer import FaceRecognizer
+from core.face_tracker import create_face_tracker
+from core.frame_formats import FramePreprocessor
+from core.label_renderer import create_label_renderer
+from core.metrics import get_metrics
+
+class Detection:
+    """
+    Лицо на кадре: бокс (left, top, right, bottom), лейбл и расстояние совпадения
+    (None - лицо не распознано) и id трека (None - трекинг выключен).
+    """
+
+    __slots__ = ("box", "label", "distance", "track_id")
+
+    def __init__(self, box, label = None, distance = None, track_id = None):
+        self.box = tuple(int(v) for v in box)
+        self.label = label
+        self.distance = distance
+        self.track_id = track_id
+
+class FrameResult:
+    """Результат обработки кадра: аннотированный кадр и найденные на нём лица."""
+
+    __slots__ = ("frame", "detections")
+
+    def __init__(self, frame, detections = None):
+        self.frame = frame
+        self.detections = detections or []
+
+    @property
+    def labels(self):
+        """Лейблы распознанных лиц без повторов."""
+        return list(dict.fromkeys(d.label for d in self.detections if d.label))
+
+# Этапы обработки кадра для замеров времени analyze_frame(timings=...)
+STAGES = ("preprocess", "detect", "track", "encode", "match", "draw")
+
+def _add_timing(timings, stage, start):
+    """Добавляет к этапу время с момента start; без замеров (timings = None) ничего не делает."""
+    if timings is None:
+        return None
+    now = time.perf_counter()
+    timings[stage] = timings.get(stage, 0.0) + now - start
+    return now
 
 class ImageProcessor:
+    # Кадры обрабатываются в потоке камеры по одному
+    pipeline_depth = 1
+
     def __init__(self, face_database):
         self.face_database = face_database
-        self.face_detector = FaceDetector()
-        self.face_recognizer = FaceRecognizer()
-        self.last_face_encodings = {}
-
-        self.pause_face_recognition = False
-        self.lock = threading.Lock()
+        # Обёртки детектора и распознавателя у каждого потока камеры свои, а общей блокировки
+        # на кадр нет. Сети OpenCV (Haar, SSD) создаются в каждой обёртке и отпускают GIL, поэтому
+        # детекция камер идёт параллельно. Модели face_recognition (dlib) и DeepFace - одни на
+        # процесс: их вызовы сериализуются блокировкой модели, и для параллельного кодирования
+        # лиц нужен бэкенд "process" (Config.INFERENCE)
+        self._worker = threading.local()
+        # Трекеры лиц, планировщики детекции и препроцессоры кадров по индексам камер
+        self.trackers = {}
+        self.detection_schedulers = {}
+        self.preprocessors = {}
+
+        # Разметка кадра (боксы и подписи); без неё клиентам нужны только лица
+        self.draw = Config().LABELS["draw"]
+        self.label_renderer = create_label_renderer() if self.draw else None
+
+        # Пауза - флаг, который поток камеры только читает
+        self._paused = threading.Event()
+
+        self.metrics = get_metrics()
+        if self.metrics.enabled:
+            self.metrics.add_collector(self._collect_metrics)
 
     def pause_recognition(self):
         """Приостанавливает распознавание лиц."""
-        with self.lock:
-            self.pause_face_recognition = True
+        self._paused.set()
 
     def resume_recognition(self):
         """Возобновляет распознавание лиц."""
-        with self.lock:
-            self.pause_face_recognition = False
-
-    def convert_to_grayscale(self, frame):
-        """Преобразует кадр в оттенки серого."""
-        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    def gaussian_blur(self, frame, kernel_size = (5, 5), sigmaX=0):
-        """Применяет размытие по Гауссу к кадру."""
-        return cv2.GaussianBlur(frame, kernel_size, sigmaX)
-   
-    def process_frame(self, frame):
-        """Выполняет предварительную обработку и распознавание лиц."""
-        with self.lock:
-            if self.pause_face_recognition:
-                return frame
-
-            processed_frame = frame
-            if 'grayscale' in Config().IMAGE_PROCESSORS:
-                processed_frame = self.convert_to_grayscale(processed_frame)
-            if 'blur' in Config().IMAGE_PROCESSORS:
-                processed_frame = self.gaussian_blur(processed_frame)
-
-            if 'face_detect' in Config().IMAGE_PROCESSORS:
-                faces = self.face_detector.detect_faces(processed_frame)
-                texts_to_draw = []
-
-                for (left, top, right, bottom) in faces:
-                    x, y, w, h = left, top, right-left, bottom-top
-
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-                    face_image = frame[y:y+h, x:x+w]
-
-                    display_unknown_label = True
-                    face_encodings = self.face_recognizer.get_face_encodings(face_image)
-
-                    if face_encodings:
-                        known_face_encodings = self.face_database.get_face_encodings()
-
-                        # Получаем список булевых значений вместо одного
-                        matches = self.face_recognizer.compare_faces(
-                            face_encodings, 
-                            known_face_encodings
-                        )
-
-                        # Находим все совпадения
-                        matched_indices = [i for i, match in enumerate(matches) if match]
-                        if matched_indices:
-                            matched_id = self.face_database.get_face_ids()[matched_indices[0]]
-
-                            if matched_id:
-                                display_unknown_label = False
-                                texts_to_draw.append((matched_id, (x, y - 20)))
-
-                    if display_unknown_label:
-                        cv2.putText(frame, 'Uncknown', (x, y - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 255, 255), 2)
-
-                if texts_to_draw:
-                    # Конвертация кадра в PIL Image
-                    pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                    draw = ImageDraw.Draw(pil_image)
-
-                    try:
-                        # Укажите путь к .ttf файлу с поддержкой кириллицы
-                        font = ImageFont.truetype("./fonts/arial.ttf", size=20)
-                    except IOError:
-                        font = ImageFont.load_default()
-
-                    for text, (x, y_pos) in texts_to_draw:
-                        # Корректировка позиции для выравнивания текста
-                        text_bbox = font.getbbox(text)
-                        text_height = text_bbox[3] - text_bbox[1]
-                        adjusted_y = y_pos - text_height
-                        draw.text((x, adjusted_y), text, font=font, fill=(255, 255, 255))
-
-                    # Обратная конвертация в BGR
-                    frame = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-
-            return frame
+        self._paused.clear()
+
+    def _get_worker(self):
+        """Возвращает обёртки (FaceDetector, FaceRecognizer) текущего потока, создавая их при первом вызове."""
+        if not hasattr(self._worker, "face_detector"):
+            self._worker.face_detector = FaceDetector()
+            self._worker.face_recognizer = FaceRecognizer()
+        return self._worker.face_detector, self._worker.face_recognizer
+
+    def _get_tracker(self, camera_index):
+        if camera_index not in self.trackers:
+            self.trackers[camera_index] = create_face_tracker()
+        return self.trackers[camera_index]
+
+    def _get_preprocessor(self, camera_index):
+        if camera_index not in self.preprocessors:
+            self.preprocessors[camera_index] = FramePreprocessor(detection_blur='blur' in Config().IMAGE_PROCESSORS)
+        return self.preprocessors[camera_index]
+
+    def _get_detection_scheduler(self, camera_index, face_detector):
+        if camera_index not in self.detection_schedulers:
+            self.detection_schedulers[camera_index] = create_detection_scheduler(face_detector, camera_index)
+        return self.detection_schedulers[camera_index]
+
+    def get_detection_stats(self):
+        """
+        Возвращает статистику детекции по камерам.
+        :return: Словарь {camera_index: {"frames", "detections", "detection_rate", "dropped", "gated"}}.
+        """
+        return {camera_index: scheduler.get_stats() for camera_index, scheduler in self.detection_schedulers.items()}
+
+    def _collect_metrics(self):
+        values = []
+        for camera_index, stats in self.get_detection_stats().items():
+            labels = (("camera", str(camera_index)),)
+            values.append(("frames_analyzed_total", "counter", labels, stats["frames"]))
+            values.append(("detections_total", "counter", labels, stats["detections"]))
+            values.append(("tracked_boxes_dropped_total", "counter", labels, stats["dropped"]))
+            values.append(("frames_without_motion_total", "counter", labels, stats["gated"]))
+        if self.label_renderer is not None:
+            values.append(("cached_labels", "gauge", (), self.label_renderer.get_stats()["cached_labels"]))
+        return values
+
+    def release_camera(self, camera_index):
+        """Сбрасывает трекер и планировщик детекции камеры (например, перед следующим видеофайлом)."""
+        self.trackers.pop(camera_index, None)
+        self.detection_schedulers.pop(camera_index, None)
+        self.preprocessors.pop(camera_index, None)
+
+    def shutdown(self):
+        """Фоновых ресурсов нет; метод для общего интерфейса с InferencePool."""
+        pass
+
+    def submit(self, frame, camera_index = 0):
+        """
+        Обрабатывает кадр в текущем потоке; интерфейс общий с InferencePool.
+        :return: Выполненный Future с FrameResult.
+        """
+        future = Future()
+        try:
+            future.set_result(self.analyze_frame(frame, camera_index))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def process_frame(self, frame, camera_index = 0):
+        """
+        Выполняет предварительную обработку и распознавание лиц.
+        :return: Аннотированный кадр.
+        """
+        return self.analyze_frame(frame, camera_index).frame
+
+    def analyze_frame(self, frame, camera_index = 0, timings = None, draw = None):
+        """
+        Выполняет предварительную обработку и распознавание лиц.
+        :param camera_index: Индекс камеры - у каждой камеры свой трекер лиц.
+        Кадры одной камеры должны приходить из одного потока: состояние трекера и
+        планировщика детекции камеры не защищено блокировкой.
+        :param timings: Словарь {этап: секунды}, к которому добавляется время этапов STAGES.
+                        Без него время этапов пишется в метрики, если они включены.
+        :param draw: Рисовать боксы и подписи на кадре; None - по Config.LABELS["draw"].
+        :return: FrameResult с аннотированным кадром и найденными лицами.
+        """
+        if self._paused.is_set():
+            return FrameResult(frame)
+
+        record_metrics = timings is None and self.metrics.enabled
+        if record_metrics:
+            timings = {}
+
+        if draw is None:
+            draw = self.draw
+        elif draw and self.label_renderer is None:
+            self.label_renderer = create_label_renderer()
+        detections = []
+
+        face_detector, face_recognizer = self._get_worker()
+        start = time.perf_counter() if timings is not None else None
+
+        # Представления кадра (серый, уменьшенный, RGB...) строятся по запросу детектора,
+        # переносчика боксов и сравнителя - каждое один раз на кадр
+        frames = self._get_preprocessor(camera_index)
+        frames.reset(frame)
+        start = _add_timing(timings, "preprocess", start)
+
+        if 'face_detect' in Config().IMAGE_PROCESSORS:
+            faces = self._get_detection_scheduler(camera_index, face_detector).detect_faces(frames)
+            start = _add_timing(timings, "detect", start)
+            tracker = self._get_tracker(camera_index)
+            tracks = tracker.update(faces) if tracker is not None else [None] * len(faces)
+            start = _add_timing(timings, "track", start)
+            labels = [track.label if track is not None else None for track in tracks]
+            distances = [track.distance if track is not None else None for track in tracks]
+            threshold = face_recognizer.get_threshold()
+
+            # Кодируем только лица, которым нужно (повторное) распознавание
+            face_encodings = []
+            encoded_faces = []
+            for i, ((left, top, right, bottom), track) in enumerate(zip(faces, tracks)):
+                if track is not None and not tracker.needs_recognition(track, threshold):
+                    continue
+
+                face_image = frames.crop(face_recognizer.input_color, (left, top, right, bottom))
+                encodings = face_recognizer.encode(face_image)
+                if encodings:
+                    face_encodings.append(encodings[0])
+                    encoded_faces.append(i)
+                else:
+                    labels[i] = distances[i] = None
+                    if track is not None:
+                        track.set_identity(None)
+            start = _add_timing(timings, "encode", start)
+
+            # Сопоставляем все лица кадра с базой одним пакетным поиском
+            matches = face_recognizer.match_faces(face_encodings, self.face_database)
+            for i, match in zip(encoded_faces, matches):
+                labels[i], distances[i] = match if match is not None else (None, None)
+                if tracks[i] is not None:
+                    tracks[i].set_identity(match)
+            start = _add_timing(timings, "match", start)
+
+            for face, track, label, distance in zip(faces, tracks, labels, distances):
+                # Для сопровождаемых лиц рисуем сглаженный бокс трека
+                left, top, right, bottom = track.box if track is not None else face
+                detections.append(Detection(
+                    (left, top, right, bottom), label, distance, track.track_id if track is not None else None
+                ))
+                if not draw:
+                    continue
+
+                cv2.rectangle(frame, (left, top), (right, bottom), (255, 0, 0), 2)
+                if label:
+                    # Подписи с кириллицей - из кэша растеризованных строк, без перевода кадра в PIL
+                    self.label_renderer.draw(frame, label, (left, top - 20))
+                else:
+                    cv2.putText(frame, 'Uncknown', (left, top - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 255, 255), 2)
+            _add_timing(timings, "draw", start)
+
+        if record_metrics:
+            self.metrics.observe_stages(camera_index, timings)
+        return FrameResult(frame, detections)
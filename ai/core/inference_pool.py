@@ -0,0 +1,300 @@
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future
+from config import Config
+from core.face_database import FaceDatabase
+from core.image_processor import FrameResult, ImageProcessor
+from core.metrics import get_metrics
+from core.shared_frames import SharedArray
+
+_GALLERY = "gallery"
+_FRAME = "frame"
+
+def _worker_main(tasks, results, paused):
+    """
+    Цикл рабочего процесса: собственные FaceDetector, FaceRecognizer и трекеры камер.
+    Кадр читается из слота разделяемой памяти и результат записывается в тот же слот.
+    """
+    face_database = FaceDatabase()
+    image_processor = ImageProcessor(face_database)
+    # Время этапов возвращается вместе с результатом и попадает в метрики главного процесса
+    collect_timings = get_metrics().enabled
+    frames = {}         # camera_index -> SharedArray слотов камеры
+    gallery = None
+
+    while True:
+        message = tasks.get()
+        if message is None:
+            break
+
+        if message[0] == _GALLERY:
+            _, ids, descriptor, layout = message
+            try:
+                new_gallery = SharedArray.attach(descriptor) if descriptor is not None else None
+            except FileNotFoundError:
+                # Снимок уже заменён следующим, он придёт в очереди за этим сообщением
+                continue
+            # Обученный индекс (центроиды IVF) принимается как есть, без переобучения в каждом процессе
+            face_database.load(ids, new_gallery.array if new_gallery is not None else None, layout)
+            if gallery is not None:
+                gallery.close()
+            gallery = new_gallery
+            continue
+
+        _, task_id, camera_index, descriptor, slot = message
+        try:
+            camera_frames = frames.get(camera_index)
+            if camera_frames is None or camera_frames.name != descriptor[0]:
+                if camera_frames is not None:
+                    camera_frames.close()
+                camera_frames = frames[camera_index] = SharedArray.attach(descriptor)
+
+            frame = camera_frames.array[slot]
+            detections = []
+            timings = {} if collect_timings else None
+            if not paused.is_set():
+                result = image_processor.analyze_frame(frame, camera_index, timings)
+                if result.frame is not frame:
+                    np.copyto(frame, result.frame)
+                detections = result.detections
+            results.put((task_id, None, detections, timings))
+        except Exception as e:
+            results.put((task_id, f"{type(e).__name__}: {e}", None, None))
+
+    for camera_frames in frames.values():
+        camera_frames.close()
+    if gallery is not None:
+        gallery.close()
+
+class _CameraSlots:
+    """Слоты разделяемой памяти под кадры одной камеры, находящиеся в обработке."""
+
+    def __init__(self, shape, dtype, depth):
+        self.frames = SharedArray((depth,) + tuple(shape), dtype)
+        self.free = queue.Queue()
+        for slot in range(depth):
+            self.free.put(slot)
+
+    def matches(self, frame):
+        return self.frames.shape[1:] == frame.shape and self.frames.dtype == frame.dtype
+
+class InferencePool:
+    """
+    Обработка кадров в пуле процессов в обход GIL.
+    Захват остаётся в потоках камер; кадр копируется в слот разделяемой памяти камеры,
+    а процессу передаётся только номер слота. Камера закреплена за одним процессом
+    (camera_index % workers), поэтому её трекер живёт в одном месте, а результаты
+    приходят в порядке подачи кадров; если процесс завершился, кадры камеры уходят
+    следующему живому. Галерея рассылается процессам через разделяемую память при
+    каждом изменении FaceDatabase.generation вместе с разметкой индекса (index.export()).
+    Интерфейс совпадает с ImageProcessor: submit(), process_frame(), pause/resume.
+    """
+
+    # Период проверки процессов, сек: кадры завершившегося процесса получают ошибку,
+    # даже если остальные процессы непрерывно присылают результаты
+    WORKER_CHECK_INTERVAL = 1.0
+
+    def __init__(self, face_database, workers = None, pipeline_depth = 2):
+        self.face_database = face_database
+        self.workers = workers or os.cpu_count() or 1
+        self.pipeline_depth = max(1, pipeline_depth)
+
+        context = multiprocessing.get_context("spawn")
+        self._paused = context.Event()
+        self._results = context.Queue()
+        self._tasks = [context.Queue() for _ in range(self.workers)]
+        self._processes = [
+            context.Process(target=_worker_main, args=(tasks, self._results, self._paused), daemon=True)
+            for tasks in self._tasks
+        ]
+        for process in self._processes:
+            process.start()
+
+        self.lock = threading.Lock()
+        self._gallery_lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._pending = {}      # task_id -> (future, camera_slots, slot, worker, camera_index)
+        self._cameras = {}
+        self._gallery = None
+        self._gallery_generation = None
+        self._running = True
+
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+        self.metrics = get_metrics()
+        if self.metrics.enabled:
+            self.metrics.add_collector(self._collect_metrics)
+
+    def _collect_metrics(self):
+        return [("inference_pending", "gauge", (), len(self._pending))]
+
+    def pause_recognition(self):
+        """Приостанавливает распознавание лиц во всех процессах."""
+        self._paused.set()
+
+    def resume_recognition(self):
+        """Возобновляет распознавание лиц."""
+        self._paused.clear()
+
+    def _sync_gallery(self):
+        """Рассылает процессам текущий снимок галереи, если он изменился."""
+        generation = self.face_database.generation
+        if generation == self._gallery_generation:
+            return
+
+        with self._gallery_lock:
+            if generation == self._gallery_generation:
+                return
+
+            ids, vectors, layout = self.face_database.index.export()
+            gallery = None
+            if ids:
+                gallery = SharedArray(vectors.shape, np.float32)
+                np.copyto(gallery.array, vectors)
+
+            descriptor = gallery.descriptor if gallery is not None else None
+            for worker, tasks in enumerate(self._tasks):
+                if self._processes[worker].is_alive():
+                    tasks.put((_GALLERY, ids, descriptor, layout))
+
+            # Процессы, ещё не подключившиеся к старому снимку, пропустят его
+            if self._gallery is not None:
+                self._gallery.close()
+            self._gallery = gallery
+            self._gallery_generation = generation
+
+    def _get_camera_slots(self, camera_index, frame):
+        camera_slots = self._cameras.get(camera_index)
+        if camera_slots is not None and camera_slots.matches(frame):
+            return camera_slots
+
+        if camera_slots is not None:
+            # Размер кадра изменился: дожидаемся кадров в обработке и пересоздаём слоты
+            for _ in range(self.pipeline_depth):
+                camera_slots.free.get()
+            camera_slots.frames.close()
+
+        camera_slots = self._cameras[camera_index] = _CameraSlots(frame.shape, frame.dtype, self.pipeline_depth)
+        return camera_slots
+
+    def submit(self, frame, camera_index = 0):
+        """
+        Отправляет кадр на обработку. Блокируется, если у камеры уже pipeline_depth кадров в работе.
+        Кадры одной камеры должны подаваться из одного потока.
+        :return: Future с FrameResult.
+        """
+        if not self._running:
+            raise RuntimeError("Inference pool is shut down")
+
+        self._sync_gallery()
+        camera_slots = self._get_camera_slots(camera_index, frame)
+        slot = camera_slots.free.get()
+        np.copyto(camera_slots.frames.array[slot], frame)
+
+        future = Future()
+        worker = self._get_worker(camera_index)
+        with self.lock:
+            task_id = next(self._task_ids)
+            self._pending[task_id] = (future, camera_slots, slot, worker, camera_index)
+        self._tasks[worker].put((_FRAME, task_id, camera_index, camera_slots.frames.descriptor, slot))
+        return future
+
+    def _get_worker(self, camera_index):
+        """Процесс камеры: camera_index % workers, а если он завершился - следующий живой."""
+        for offset in range(self.workers):
+            worker = (camera_index + offset) % self.workers
+            if self._processes[worker].is_alive():
+                return worker
+        raise RuntimeError("All inference workers have exited")
+
+    def process_frame(self, frame, camera_index = 0):
+        return self.submit(frame, camera_index).result().frame
+
+    def _read_results(self):
+        next_check = time.monotonic() + self.WORKER_CHECK_INTERVAL
+        while self._running:
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + self.WORKER_CHECK_INTERVAL
+            try:
+                message = self._results.get(timeout=self.WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            if message is None:
+                break
+
+            task_id, error, detections, timings = message
+            with self.lock:
+                task = self._pending.pop(task_id, None)
+            if task is None:
+                # Кадр уже завершён с ошибкой: процесс успел отправить результат перед выходом
+                continue
+            future, camera_slots, slot, _, camera_index = task
+            if timings:
+                self.metrics.observe_stages(camera_index, timings)
+            if error is None:
+                future.set_result(FrameResult(camera_slots.frames.array[slot].copy(), detections))
+            else:
+                future.set_exception(RuntimeError(error))
+            camera_slots.free.put(slot)
+
+    def _check_workers(self):
+        """Завершает с ошибкой кадры процессов, которые неожиданно завершились."""
+        dead = {worker for worker, process in enumerate(self._processes) if not process.is_alive()}
+        if not dead:
+            return
+
+        with self.lock:
+            failed = [(task_id, task) for task_id, task in self._pending.items() if task[3] in dead]
+            for task_id, _ in failed:
+                del self._pending[task_id]
+        for _, (future, camera_slots, slot, worker, _) in failed:
+            future.set_exception(RuntimeError(f"Inference worker {worker} exited with code {self._processes[worker].exitcode}"))
+            camera_slots.free.put(slot)
+
+    def shutdown(self):
+        """Останавливает процессы и освобождает разделяемую память."""
+        if not self._running:
+            return
+        self._running = False
+        self.metrics.remove_collector(self._collect_metrics)
+
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self._results.put(None)
+        self._reader.join()
+        with self.lock:
+            for future, camera_slots, slot, _, _ in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+
+        for camera_slots in self._cameras.values():
+            camera_slots.frames.close()
+        self._cameras = {}
+        if self._gallery is not None:
+            self._gallery.close()
+            self._gallery = None
+
+def create_frame_processor(face_database):
+    """
+    Создаёт обработчик кадров по Config.INFERENCE: ImageProcessor (потоки камер)
+    или InferencePool (пул процессов).
+    """
+    cfg = Config().INFERENCE
+    if cfg["backend"] == "thread":
+        return ImageProcessor(face_database)
+    elif cfg["backend"] == "process":
+        return InferencePool(face_database, workers=cfg["workers"], pipeline_depth=cfg["pipeline_depth"])
+    else:
+        raise ValueError(f"Unsupported inference backend: {cfg['backend']}")
@@ -0,0 +1,89 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+from config import Config
+
+class _Label:
+    """Растеризованная подпись: альфа-маска и её смещение от точки привязки текста."""
+
+    __slots__ = ("alpha", "inverse", "offset_x", "offset_y")
+
+    def __init__(self, mask, offset_x, offset_y):
+        self.alpha = mask.astype(np.uint16)[..., None]
+        self.inverse = 255 - self.alpha
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+class LabelRenderer:
+    """
+    Подписи лиц на кадре без перевода кадра в PIL.
+    Шрифт загружается один раз; каждая подпись (в том числе кириллическая)
+    растеризуется PIL в альфа-маску при первом появлении и хранится в LRU-кэше,
+    после чего на кадр накладывается только маленькая область подписи.
+    """
+
+    def __init__(self, font_path, font_size = 20, color = (255, 255, 255), cache_size = 1024):
+        try:
+            self.font = ImageFont.truetype(font_path, size=font_size)
+        except IOError:
+            print(f"[WARNING] Cannot load font {font_path}, labels use the default font.")
+            self.font = ImageFont.load_default()
+        # Цвет в порядке каналов кадра (BGR)
+        self.color = np.array(color, dtype=np.uint16)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _rasterize(self, text):
+        left, top, right, bottom = self.font.getbbox(text)
+        mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, font=self.font, fill=255)
+        # Положение как при прежней отрисовке через PIL: текст поднят на свою высоту над точкой привязки
+        return _Label(np.asarray(mask), left, top - (bottom - top))
+
+    def _get_label(self, text):
+        with self._lock:
+            label = self._cache.get(text)
+            if label is not None:
+                self._cache.move_to_end(text)
+                return label
+
+        label = self._rasterize(text)
+        with self._lock:
+            self._cache[text] = label
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return label
+
+    def draw(self, frame, text, position):
+        """
+        Накладывает подпись на кадр BGR на месте.
+        :param position: (x, y) - левый нижний угол текста.
+        """
+        label = self._get_label(text)
+        height, width = label.alpha.shape[:2]
+        x = position[0] + label.offset_x
+        y = position[1] + label.offset_y
+
+        # Обрезка по границам кадра
+        left, top = max(x, 0), max(y, 0)
+        right, bottom = min(x + width, frame.shape[1]), min(y + height, frame.shape[0])
+        if right <= left or bottom <= top:
+            return
+
+        roi = frame[top:bottom, left:right]
+        mask = (slice(top - y, bottom - y), slice(left - x, right - x))
+        roi[:] = (roi * label.inverse[mask] + self.color * label.alpha[mask] + 127) // 255
+
+    def get_stats(self):
+        return {"cached_labels": len(self._cache)}
+
+def create_label_renderer():
+    """Создаёт отрисовщик подписей по Config.LABELS."""
+    cfg = Config().LABELS
+    return LabelRenderer(
+        font_path = cfg["font_path"],
+        font_size = cfg["font_size"],
+        cache_size = cfg["cache_size"]
+    )
@@ -0,0 +1,211 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (секунды), как в Prometheus."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)     # Последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Оценка квантиля линейной интерполяцией внутри корзины."""
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+        if not count:
+            return 0.0
+
+        rank = q * count
+        cumulative = 0
+        for i, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+class Metrics:
+    """
+    Метрики процесса: гистограммы задержек, счётчики и значения, снимаемые по запросу.
+    Горячий путь проверяет enabled перед любым замером, поэтому выключенные метрики
+    стоят одну проверку атрибута. Счётчики, которые уже ведут компоненты (буферы кадров,
+    источники, кодировщик), не дублируются: их собирают коллекторы в момент выгрузки.
+    Метки - кортеж пар ((имя, значение), ...).
+    """
+
+    PREFIX = "face_recognition"
+
+    def __init__(self, enabled = False, buckets = None):
+        self.enabled = enabled
+        self.buckets = sorted(buckets or (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+        self.lock = threading.Lock()
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._counters = {}     # (name, labels) -> float
+        self._gauges = {}       # (name, labels) -> float
+        self._collectors = []
+
+    def _histogram(self, name, labels):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, name, seconds, labels = ()):
+        self._histogram(name, labels).observe(seconds)
+
+    def observe_stage(self, stage, camera_index, seconds):
+        """Время этапа обработки кадра камеры."""
+        self.observe("stage_seconds", seconds, (("camera", str(camera_index)), ("stage", stage)))
+
+    def observe_stages(self, camera_index, timings):
+        """:param timings: Словарь {этап: секунды} из ImageProcessor.analyze_frame()."""
+        for stage, seconds in timings.items():
+            self.observe_stage(stage, camera_index, seconds)
+
+    def inc(self, name, value = 1, labels = ()):
+        key = (name, labels)
+        with self.lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, labels = ()):
+        self._gauges[(name, labels)] = value
+
+    def add_collector(self, collector):
+        """
+        :param collector: Функция без аргументов, возвращающая [(name, type, labels, value), ...];
+                          type - "counter" или "gauge". Вызывается при каждой выгрузке.
+        """
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def _collect(self):
+        """Все счётчики и значения: [(name, type, labels, value), ...]."""
+        with self.lock:
+            values = [(name, "counter", labels, value) for (name, labels), value in self._counters.items()]
+        values.extend((name, "gauge", labels, value) for (name, labels), value in list(self._gauges.items()))
+        for collector in list(self._collectors):
+            try:
+                values.extend(collector())
+            except Exception as e:
+                print(f"[WARNING] Metrics collector failed: {e}")
+        return values
+
+    def get_histograms(self):
+        """:return: Словарь {(name, labels): Histogram}."""
+        with self.lock:
+            return dict(self._histograms)
+
+    def get_values(self):
+        return self._collect()
+
+    def render_prometheus(self):
+        """Выгрузка в текстовом формате Prometheus."""
+        lines = []
+        families = {}
+        for (name, labels), histogram in sorted(self.get_histograms().items()):
+            families.setdefault(name, []).append((labels, histogram))
+        for name, series in families.items():
+            metric = f"{self.PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, histogram in series:
+                with histogram.lock:
+                    counts = list(histogram.counts)
+                    total, count = histogram.sum, histogram.count
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + [None], counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound is None else repr(bound)
+                    lines.append(f"{metric}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+        typed = {}
+        for name, metric_type, labels, value in self._collect():
+            typed.setdefault((name, metric_type), []).append((labels, value))
+        for (name, metric_type), series in sorted(typed.items()):
+            metric = f"{self.PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for labels, value in series:
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics():
+    """Общие метрики процесса по Config.METRICS; создаются при первом вызове."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                cfg = Config().METRICS
+                _metrics = Metrics(enabled=cfg["enabled"], buckets=cfg["buckets"])
+    return _metrics
+
+class MetricsServer:
+    """HTTP-эндпоинт /metrics для Prometheus в фоновом потоке."""
+
+    def __init__(self, metrics, port, host = ""):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        print(f"[INFO] Metrics endpoint started on port {self.server.server_address[1]}.")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def create_metrics_server():
+    """Создаёт HTTP-эндпоинт метрик по Config.METRICS или None, если метрики или эндпоинт выключены."""
+    cfg = Config().METRICS
+    if not cfg["enabled"] or not cfg["http_port"]:
+        return None
+    return MetricsServer(get_metrics(), cfg["http_port"])
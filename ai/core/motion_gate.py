@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+from config import Config
+from core.frame_formats import GRAY
+
+class RegionOfInterest:
+    """
+    Область интереса камеры: один или несколько многоугольников в долях кадра
+    ((x, y), x и y от 0 до 1), поэтому не зависит от разрешения.
+    Маски и описывающий прямоугольник считаются один раз на размер кадра.
+    """
+
+    def __init__(self, polygons):
+        self.polygons = [np.array(polygon, dtype=np.float32).reshape(-1, 2) for polygon in polygons]
+        self._masks = {}
+        self._boxes = {}
+
+    def _scaled(self, size):
+        width, height = size
+        return [np.round(polygon * (width, height)).astype(np.int32) for polygon in self.polygons]
+
+    def get_mask(self, size):
+        """:return: Булева маска (height, width) для размера кадра size = (ширина, высота)."""
+        mask = self._masks.get(size)
+        if mask is None:
+            canvas = np.zeros((size[1], size[0]), np.uint8)
+            cv2.fillPoly(canvas, self._scaled(size), 1)
+            mask = self._masks[size] = canvas.astype(bool)
+        return mask
+
+    def get_box(self, size):
+        """:return: (left, top, right, bottom) - прямоугольник, описывающий область на кадре size."""
+        box = self._boxes.get(size)
+        if box is None:
+            points = np.concatenate(self._scaled(size))
+            left, top = np.clip(points.min(axis=0), 0, None)
+            right, bottom = np.minimum(points.max(axis=0) + 1, size)
+            box = self._boxes[size] = (int(left), int(top), int(right), int(bottom))
+        return box
+
+    def contains(self, box, size):
+        """Центр бокса лица внутри области."""
+        mask = self.get_mask(size)
+        x = min(max(int((box[0] + box[2]) / 2), 0), size[0] - 1)
+        y = min(max(int((box[1] + box[3]) / 2), 0), size[1] - 1)
+        return bool(mask[y, x])
+
+class MotionGate:
+    """
+    Дешёвый датчик движения перед детекцией: разность соседних кадров ("diff") или
+    вычитание фона MOG2 ("mog2") на уменьшенном сером кадре, только внутри области
+    интереса. Пока движения нет, детекция не запускается; после движения ворота
+    остаются открытыми ещё hold_frames кадров, чтобы не терять лица, которые замерли.
+    """
+
+    def __init__(self, method = "diff", size = (160, 120), pixel_threshold = 25, threshold = 0.002,
+                 hold_frames = 15, roi = None):
+        if method not in ("diff", "mog2"):
+            raise ValueError(f"Unsupported motion gate method: {method}")
+        self.method = method
+        self.size = tuple(size)
+        self.pixel_threshold = pixel_threshold
+        self.threshold = threshold
+        self.hold_frames = hold_frames
+        self.roi = roi
+        self.subtractor = (
+            cv2.createBackgroundSubtractorMOG2(detectShadows=False) if method == "mog2" else None
+        )
+
+        # Маска изменившихся пикселей последнего кадра (None - сравнивать пока не с чем)
+        self.changed = None
+        self.prev_small = None
+        self.hold = 0
+
+        self.frames = 0
+        self.open_frames = 0
+
+    def update(self, frames):
+        """
+        :param frames: FramePreprocessor текущего кадра.
+        :return: True - на кадре нужно запускать детекцию.
+        """
+        small = frames.get(GRAY, self.size)
+        self.frames += 1
+
+        if self.subtractor is not None:
+            self.changed = self.subtractor.apply(small) > 0
+        elif self.prev_small is not None:
+            self.changed = cv2.absdiff(small, self.prev_small) > self.pixel_threshold
+        # Представление предыдущего кадра действительно до следующего reset() препроцессора
+        self.prev_small = small
+
+        if self.changed is None:
+            # Первый кадр: детекция нужна, чтобы найти уже стоящих в кадре людей
+            motion = True
+        else:
+            if self.roi is not None:
+                mask = self.roi.get_mask(self.size)
+                self.changed &= mask
+                motion = self.changed.sum() > self.threshold * mask.sum()
+            else:
+                motion = self.changed.mean() > self.threshold
+
+        if motion:
+            self.hold = self.hold_frames
+        elif self.hold > 0:
+            self.hold -= 1
+        else:
+            return False
+
+        self.open_frames += 1
+        return True
+
+def create_region_of_interest(camera_index):
+    """Создаёт область интереса камеры по Config.CAMERA_ROI или None - весь кадр."""
+    polygons = Config().CAMERA_ROI.get(camera_index)
+    return RegionOfInterest(polygons) if polygons else None
+
+def create_motion_gate(camera_index, roi = None):
+    """Создаёт датчик движения камеры по Config.MOTION_GATE или None, если он выключен."""
+    cfg = dict(Config().MOTION_GATE)
+    cfg.update(cfg.pop("cameras").get(camera_index, {}))
+    if not cfg["enabled"]:
+        return None
+    return MotionGate(
+        method = cfg["method"],
+        size = cfg["size"],
+        pixel_threshold = cfg["pixel_threshold"],
+        threshold = cfg["threshold"],
+        hold_frames = cfg["hold_frames"],
+        roi = roi
+    )
@@ -0,0 +1,184 @@
+import time
+import threading
+
+class ResultEvent:
+    """
+    Обработанный кадр камеры и найденные на нём лица (список Detection).
+    ring_id и sequence - id буфера кадров камеры и номер кадра в нём (см. RingFrame).
+    """
+
+    __slots__ = ("camera_index", "sequence", "timestamp", "frame", "detections", "ring_id")
+
+    def __init__(self, camera_index, sequence, timestamp, frame, detections, ring_id = 0):
+        self.camera_index = camera_index
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.frame = frame
+        self.detections = detections
+        self.ring_id = ring_id
+
+    @property
+    def labels(self):
+        return list(dict.fromkeys(d.label for d in self.detections if d.label))
+
+class Subscription:
+    """
+    Почтовый ящик одного подписчика: по одному последнему событию на камеру.
+    Если подписчик не успевает забирать события или они приходят чаще max_fps,
+    новое событие замещает непрочитанное, а замещённые считаются пропущенными.
+    Публикующий поток никогда не ждёт подписчика.
+    notify() (если задан) вызывается из публикующего потока после каждого нового
+    события - так асинхронный подписчик ждёт событий без отдельного потока.
+    """
+
+    def __init__(self, cameras = None, max_fps = 0, notify = None):
+        self.cameras = set(cameras) if cameras else None
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.notify = notify
+        self.closed = False
+
+        self._condition = threading.Condition()
+        self._latest = {}       # camera_index -> ResultEvent
+        self._skipped = {}      # camera_index -> пропущено с последней отправки
+        self._last_sent = {}    # camera_index -> время последней отправки
+        self.sent = 0
+        self.skipped = 0
+
+    def offer(self, event):
+        if self.cameras is not None and event.camera_index not in self.cameras:
+            return
+        with self._condition:
+            if event.camera_index in self._latest:
+                self._skipped[event.camera_index] = self._skipped.get(event.camera_index, 0) + 1
+                self.skipped += 1
+            self._latest[event.camera_index] = event
+            self._condition.notify()
+        if self.notify is not None:
+            self.notify()
+
+    def _take_ready(self, now):
+        """Самое старое из событий, чей интервал max_fps истёк; иначе (None, время до готовности)."""
+        ready = None
+        wait = None
+        for camera_index, event in self._latest.items():
+            remaining = self._last_sent.get(camera_index, 0.0) + self.min_interval - now
+            if remaining <= 0:
+                if ready is None or event.timestamp < ready.timestamp:
+                    ready = event
+            elif wait is None or remaining < wait:
+                wait = remaining
+        return ready, wait
+
+    def _pop_ready(self):
+        """(event, skipped, wait) - готовое событие или время до готовности следующего."""
+        now = time.monotonic()
+        event, wait = self._take_ready(now)
+        if event is None:
+            return None, 0, wait
+
+        camera_index = event.camera_index
+        del self._latest[camera_index]
+        self._last_sent[camera_index] = now
+        self.sent += 1
+        return event, self._skipped.pop(camera_index, 0), None
+
+    def poll(self):
+        """
+        Забирает готовое событие без ожидания.
+        :return: (event, skipped, wait) - wait: секунд до готовности отложенного по max_fps
+        события или None, если ждать нечего.
+        """
+        with self._condition:
+            if self.closed:
+                return None, 0, None
+            return self._pop_ready()
+
+    def get(self, timeout = None):
+        """
+        Ждёт следующее событие.
+        :return: (event, skipped) - событие и число замещённых до него событий этой камеры;
+        (None, 0) по таймауту или после close().
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while not self.closed:
+                event, skipped, wait = self._pop_ready()
+                if event is not None:
+                    return event, skipped
+
+                now = time.monotonic()
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        break
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._condition.wait(wait)
+        return None, 0
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._latest.clear()
+            self._condition.notify_all()
+        if self.notify is not None:
+            self.notify()
+
+class ResultBroker:
+    """Раздаёт результаты обработки кадров подписчикам (StreamResults)."""
+
+    def __init__(self, max_subscribers = 0):
+        self.max_subscribers = max_subscribers
+        self.lock = threading.Lock()
+        self._subscriptions = []
+        self.closed = False
+        # Счётчики уже закрытых подписок
+        self._sent = 0
+        self._skipped = 0
+
+    def subscribe(self, cameras = None, max_fps = 0, notify = None):
+        """
+        :param cameras: Индексы камер (None или пусто - все камеры).
+        :param max_fps: Максимальная частота событий на камеру (0 - без ограничения).
+        :param notify: Вызывается из публикующего потока при новом событии.
+        :return: Subscription или None, если достигнут лимит подписчиков или брокер закрыт.
+        """
+        with self.lock:
+            if self.closed or (self.max_subscribers and len(self._subscriptions) >= self.max_subscribers):
+                return None
+            subscription = Subscription(cameras, max_fps, notify)
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self.lock:
+            if subscription in self._subscriptions:
+                self._sent += subscription.sent
+                self._skipped += subscription.skipped
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, event):
+        # Список подписчиков подменяется целиком, поэтому читается без блокировки
+        for subscription in self._subscriptions:
+            subscription.offer(event)
+
+    def get_stats(self):
+        """Число подписчиков и события, отправленные и пропущенные за всё время: {"subscribers", "sent", "skipped"}."""
+        with self.lock:
+            subscriptions = self._subscriptions
+            return {
+                "subscribers": len(subscriptions),
+                "sent": self._sent + sum(s.sent for s in subscriptions),
+                "skipped": self._skipped + sum(s.skipped for s in subscriptions)
+            }
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.close()
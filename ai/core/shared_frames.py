@@ -0,0 +1,231 @@
+import os
+import time
+import itertools
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+
+class SharedArray:
+    """
+    Массив NumPy в multiprocessing.shared_memory.
+    Процесс-владелец создаёт блок и передаёт другим процессам descriptor - имя, форму
+    и тип; те подключаются через attach() и видят те же байты без копирования и pickle.
+    """
+
+    def __init__(self, shape, dtype = np.uint8, name = None):
+        self.shape = tuple(int(v) for v in shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def descriptor(self):
+        """Всё, что нужно другому процессу для attach(): (name, shape, dtype)."""
+        return self.shm.name, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, descriptor):
+        name, shape, dtype = descriptor
+        return cls(shape, dtype, name=name)
+
+    def close(self):
+        """Отключается от блока; владелец также удаляет его из системы."""
+        self.array = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Снаружи ещё живут представления блока - память освободится вместе с ними
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+class RingFrame:
+    """
+    Кадр из FrameRing: порядковый номер, время записи (time.time()) и изображение.
+    ring_id - id буфера: номера кадров нового буфера камеры снова начинаются с 1,
+    поэтому кадр однозначно определяет только пара (ring_id, sequence).
+    """
+
+    __slots__ = ("sequence", "timestamp", "frame", "ring_id")
+
+    def __init__(self, sequence, timestamp, frame, ring_id = 0):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.frame = frame
+        self.ring_id = ring_id
+
+class FrameRing:
+    """
+    Кольцевой буфер кадров одной камеры в разделяемой памяти.
+
+    Слоты размера shape (кадры камеры) выделяются один раз; запись копирует кадр в слот
+    без аллокаций, а при переполнении затирается самый старый кадр (побеждает новейший).
+    Номера кадров, время записи и счётчики лежат в том же блоке, поэтому буфер читается
+    из других процессов через attach(descriptor).
+
+    Писатель у буфера один. Слот защищён seqlock: на время записи его номер равен -1,
+    и читатель, заставший слот перезаписанным во время копирования, отбрасывает кадр.
+    Счётчики: overwritten - непрочитанные кадры, затёртые новыми (потребитель не успевает),
+    dropped - кадры, отброшенные читателем из-за перезаписи во время чтения.
+    """
+
+    _WRITE_SEQ = 0
+    _READ_SEQ = 1
+    _OVERWRITTEN = 2
+    _DROPPED = 3
+    _RING_ID = 4
+    _HEADER_SIZE = 5
+    _ring_ids = itertools.count(1)
+    # Попыток прочитать последний кадр, пока писатель его перезаписывает (при capacity = 1 - всегда)
+    LATEST_READ_ATTEMPTS = 3
+
+    def __init__(self, shape, capacity = 2, descriptor = None):
+        if descriptor is None:
+            self.capacity = max(1, capacity)
+            self._frames = SharedArray((self.capacity,) + tuple(shape), np.uint8)
+            self._meta = SharedArray((self._HEADER_SIZE + 2 * self.capacity,), np.int64)
+            self._meta.array[:] = 0
+            self._meta.array[self._RING_ID] = (os.getpid() << 32) | next(self._ring_ids)
+        else:
+            frames_descriptor, meta_descriptor = descriptor
+            self._frames = SharedArray.attach(frames_descriptor)
+            self._meta = SharedArray.attach(meta_descriptor)
+            self.capacity = self._frames.shape[0]
+
+        self.shape = self._frames.shape[1:]
+        meta = self._meta.array
+        self._header = meta[:self._HEADER_SIZE]
+        self._sequences = meta[self._HEADER_SIZE:self._HEADER_SIZE + self.capacity]
+        self._timestamps = meta[self._HEADER_SIZE + self.capacity:]
+
+    @property
+    def descriptor(self):
+        return self._frames.descriptor, self._meta.descriptor
+
+    @classmethod
+    def attach(cls, descriptor):
+        return cls(None, descriptor=descriptor)
+
+    def _fit(self, frame):
+        """Приводит кадр к размеру и числу каналов слота."""
+        if frame.ndim == 2 and len(self.shape) == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        if frame.shape != self.shape:
+            frame = cv2.resize(frame, (self.shape[1], self.shape[0]))
+        return frame
+
+    def put(self, frame, timestamp = None):
+        """
+        Записывает кадр, затирая самый старый.
+        :return: Порядковый номер записанного кадра (начиная с 1).
+        """
+        frame = self._fit(frame)
+        sequence = int(self._header[self._WRITE_SEQ]) + 1
+        slot = sequence % self.capacity
+
+        previous = self._sequences[slot]
+        if previous > self._header[self._READ_SEQ]:
+            self._header[self._OVERWRITTEN] += 1
+
+        self._sequences[slot] = -1
+        np.copyto(self._frames.array[slot], frame)
+        self._timestamps[slot] = time.time_ns() if timestamp is None else int(timestamp * 1e9)
+        self._sequences[slot] = sequence
+        self._header[self._WRITE_SEQ] = sequence
+        return sequence
+
+    def _read(self, sequence, out = None):
+        slot = sequence % self.capacity
+        if self._sequences[slot] != sequence:
+            return None
+
+        timestamp = self._timestamps[slot] / 1e9
+        if out is None:
+            frame = self._frames.array[slot].copy()
+        else:
+            frame = out
+            np.copyto(frame, self._frames.array[slot])
+
+        if self._sequences[slot] != sequence:
+            self._header[self._DROPPED] += 1
+            return None
+        return RingFrame(sequence, timestamp, frame, self.ring_id)
+
+    @property
+    def ring_id(self):
+        """Id буфера, уникальный среди буферов хоста; общий для подключённых через attach()."""
+        return int(self._header[self._RING_ID])
+
+    @property
+    def last_sequence(self):
+        return int(self._header[self._WRITE_SEQ])
+
+    def get_latest(self, out = None):
+        """
+        Возвращает последний кадр, не сдвигая позицию чтения.
+        :param out: Массив формы shape, в который копируется кадр (без аллокации).
+        :return: RingFrame или None, если кадров ещё не было или писатель затирал
+                 последний слот во время каждой из попыток чтения.
+        """
+        for _ in range(self.LATEST_READ_ATTEMPTS):
+            sequence = self.last_sequence
+            if sequence == 0:
+                return None
+            record = self._read(sequence, out)
+            if record is not None:
+                return record
+            # Отдаём GIL писателю, чтобы он дописал слот, вместо холостого цикла
+            time.sleep(0)
+        return None
+
+    def read_new(self):
+        """
+        Возвращает непрочитанные кадры от старых к новым и сдвигает позицию чтения.
+        Позиция чтения общая, поэтому потребитель у read_new/get_all должен быть один.
+        :return: Список RingFrame.
+        """
+        last = self.last_sequence
+        first = max(int(self._header[self._READ_SEQ]) + 1, last - self.capacity + 1, 1)
+        records = []
+        for sequence in range(first, last + 1):
+            record = self._read(sequence)
+            if record is not None:
+                records.append(record)
+        self._header[self._READ_SEQ] = last
+        return records
+
+    def get_all(self):
+        """Непрочитанные кадры от старых к новым, без номеров и времени."""
+        return [record.frame for record in self.read_new()]
+
+    def is_empty(self):
+        return self.last_sequence == int(self._header[self._READ_SEQ])
+
+    def clear(self):
+        self._header[self._READ_SEQ] = self.last_sequence
+
+    def get_stats(self):
+        return {
+            "capacity": self.capacity,
+            "written": self.last_sequence,
+            "overwritten": int(self._header[self._OVERWRITTEN]),
+            "dropped": int(self._header[self._DROPPED])
+        }
+
+    def close(self):
+        self._header = self._sequences = self._timestamps = None
+        self._frames.close()
+        self._meta.close()
@@ -0,0 +1,279 @@
+import cv2
+import time
+import threading
+from config import Config
+
+class VideoSource:
+    """
+    Источник кадров со своим потоком захвата.
+
+    Поток захвата непрерывно вызывает grab() - буфер устройства или сетевого потока не
+    копит старые кадры, - а декодирует (retrieve()) только тот кадр, которого ждёт
+    потребитель. Так медленный инференс не задерживает захват, а лишние кадры не
+    декодируются. При обрыве источник переподключается с экспоненциальной паузой,
+    max_fps ограничивает частоту выдачи кадров потребителю.
+    """
+
+    # Повторять ли подключение, если источник не открылся при старте
+    retry_initial_open = False
+
+    def __init__(self, name, max_fps = 0, reconnect = True, reconnect_delay = 1.0, reconnect_max_delay = 30.0):
+        self.name = name
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.reconnect = reconnect
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._wanted = False
+        self._frame = None
+        self._opened = False
+        self._finished = False
+        self._last_delivered = 0.0
+
+        self.frames_grabbed = 0
+        self.frames_decoded = 0
+        self.reconnects = 0
+
+    def _open(self):
+        """:return: Открытый cv2.VideoCapture (или не открытый, если источник недоступен)."""
+        raise NotImplementedError()
+
+    def _grab_interval(self):
+        """Пауза между grab(), если источник сам не задаёт темп (видеофайлы)."""
+        return 0.0
+
+    def _decode_every_frame(self):
+        """True - кадры не пропускаются: grab() только по запросу потребителя."""
+        return False
+
+    def _on_end_of_stream(self, cap):
+        """
+        Вызывается, когда grab() не вернул кадр.
+        :return: True - продолжить с тем же cap, False - считать это обрывом.
+        """
+        return False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"video-source-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _connect(self, initial):
+        """Открывает источник, повторяя попытки с растущей паузой. None - источник недоступен или остановлен."""
+        delay = self.reconnect_delay
+        while not self._stop_event.is_set():
+            cap = self._open()
+            if cap.isOpened():
+                return cap
+            cap.release()
+
+            if initial and not self.retry_initial_open:
+                print(f"Не удалось открыть источник видео {self.name}")
+                return None
+            if not self.reconnect:
+                return None
+
+            print(f"[WARNING] Video source {self.name} is unavailable, retrying in {delay:.1f} s")
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, self.reconnect_max_delay)
+        return None
+
+    def wait_started(self):
+        """
+        Ждёт первой попытки открыть источник.
+        :return: True - источник открыт (или сам повторяет подключение), False - не открылся.
+        """
+        if self.retry_initial_open:
+            return True
+        with self._condition:
+            self._condition.wait_for(lambda: self._opened or self._finished)
+            return self._opened
+
+    def _run(self):
+        cap = self._connect(initial=True)
+        if cap is not None:
+            with self._condition:
+                self._opened = True
+                self._condition.notify_all()
+        next_grab = time.monotonic()
+        while cap is not None and not self._stop_event.is_set():
+            if self._decode_every_frame():
+                with self._condition:
+                    while not (self._wanted and self._frame is None) and not self._stop_event.is_set():
+                        self._condition.wait(0.1)
+
+            interval = self._grab_interval()
+            if interval:
+                next_grab += interval
+                delay = next_grab - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    next_grab = time.monotonic()
+
+            if not cap.grab():
+                if self._on_end_of_stream(cap):
+                    continue
+                cap.release()
+                cap = None
+                if self.reconnect and not self._stop_event.is_set():
+                    print(f"[WARNING] Video source {self.name} disconnected, reconnecting")
+                    self.reconnects += 1
+                    cap = self._connect(initial=False)
+                continue
+            self.frames_grabbed += 1
+
+            with self._condition:
+                wanted = self._wanted and self._frame is None
+            if wanted:
+                ok, frame = cap.retrieve()
+                if ok:
+                    self.frames_decoded += 1
+                    with self._condition:
+                        self._frame = frame
+                        self._condition.notify_all()
+
+        if cap is not None:
+            cap.release()
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def read(self):
+        """
+        Ждёт следующий кадр с учётом max_fps.
+        :return: Кадр BGR или None, если источник закончился или остановлен.
+        """
+        if self.min_interval:
+            delay = self._last_delivered + self.min_interval - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+
+        with self._condition:
+            self._wanted = True
+            self._condition.notify_all()
+            while self._frame is None and not self._finished:
+                self._condition.wait()
+            frame, self._frame = self._frame, None
+            self._wanted = False
+
+        self._last_delivered = time.monotonic()
+        return frame
+
+    def stop(self):
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_stats(self):
+        return {
+            "grabbed": self.frames_grabbed,
+            "decoded": self.frames_decoded,
+            "reconnects": self.reconnects
+        }
+
+class DeviceSource(VideoSource):
+    """Локальная камера по индексу устройства."""
+
+    def __init__(self, device, resolution = None, fps = None, **kwargs):
+        super().__init__(f"device:{device}", **kwargs)
+        self.device = device
+        self.resolution = resolution
+        self.fps = fps
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.device)
+        if self.resolution is not None:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        if self.fps is not None:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        return cap
+
+class UrlSource(VideoSource):
+    """Сетевой поток (RTSP, HTTP/MJPEG)."""
+
+    # Сеть может подняться позже сервера
+    retry_initial_open = True
+
+    def __init__(self, url, **kwargs):
+        super().__init__(f"url:{url}", **kwargs)
+        self.url = url
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG)
+        # Не копить кадры в буфере декодера: нужен самый свежий
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+class FileSource(VideoSource):
+    """
+    Видеофайл. realtime = True - воспроизведение с частотой файла (как живая камера,
+    с пропуском кадров при медленной обработке); False - каждый кадр, как можно быстрее.
+    start_frame - номер кадра, с которого начинается чтение (и повтор при loop).
+    """
+
+    DEFAULT_FPS = 25.0
+
+    def __init__(self, path, loop = False, realtime = True, start_frame = 0, **kwargs):
+        kwargs["reconnect"] = False
+        super().__init__(f"file:{path}", **kwargs)
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self.start_frame = start_frame
+        self.file_fps = self.DEFAULT_FPS
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.path)
+        fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+        self.file_fps = fps if fps and fps > 0 else self.DEFAULT_FPS
+        if self.start_frame and cap.isOpened():
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        return cap
+
+    def _grab_interval(self):
+        return 1.0 / self.file_fps if self.realtime else 0.0
+
+    def _decode_every_frame(self):
+        return not self.realtime
+
+    def _on_end_of_stream(self, cap):
+        if self.loop:
+            return cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        return False
+
+def create_video_source(spec):
+    """
+    Создаёт источник по описанию из Config.VIDEO_SOURCES.
+    :param spec: Словарь с ключом "type": "device" (+ "device"), "url" (+ "url") или "file" (+ "path").
+    """
+    options = dict(Config().VIDEO_SOURCE_DEFAULTS, **spec)
+    common = {
+        "max_fps": options["max_fps"],
+        "reconnect": options["reconnect"],
+        "reconnect_delay": options["reconnect_delay"],
+        "reconnect_max_delay": options["reconnect_max_delay"]
+    }
+
+    source_type = options["type"]
+    if source_type == "device":
+        return DeviceSource(options["device"], Config().CAMERA_RESOLUTION, Config().CAMERA_FPS, **common)
+    elif source_type == "url":
+        return UrlSource(options["url"], **common)
+    elif source_type == "file":
+        return FileSource(options["path"], loop=options["loop"], realtime=options["realtime"], **common)
+    else:
+        raise ValueError(f"Unsupported video source type: {source_type}")
+
+def create_video_sources():
+    """
+    Источники из Config.VIDEO_SOURCES; индекс камеры - позиция в списке.
+    Пустой список - локальные камеры 0..NUM_CAMERAS-1.
+    """
+    specs = Config().VIDEO_SOURCES or [{"type": "device", "device": i} for i in range(Config().NUM_CAMERAS)]
+    return [create_video_source(spec) for spec in specs]
@@ -1,22 +1,41 @@
 import cv2
 import time
-import numpy as np
 import threading
 from config import Config
 from core.face_database import FaceDatabase
+from core.embedding_cache import create_embedding_cache
+from core.embedding_store import create_embedding_store
+from core.enrollment import EnrollmentPipeline
 from core.face_detector import FaceDetector
 from core.face_recognizer import FaceRecognizer
-from core.image_processor import ImageProcessor
+from core.frame_encoder import FULL, PREVIEW, create_frame_encoder
+from core.identification import IdentificationService
+from core.inference_pool import create_frame_processor
+from core.metrics import create_metrics_server, get_metrics
+from core.result_broker import ResultBroker
 from core.camera import CameraManager
 
 class FaceRecognitionAI:
     def __init__(self):
         # Инициализация компонентов
-        self.face_database = FaceDatabase()
+        self.face_database = FaceDatabase(store=create_embedding_store())
         self.face_detector = FaceDetector()
         self.face_recognizer = FaceRecognizer()
-        self.image_processor = ImageProcessor(self.face_database)
-        self.camera_manager = CameraManager(self.image_processor)
+        self.image_processor = create_frame_processor(self.face_database)
+        self.result_broker = ResultBroker(max_subscribers=Config().STREAMING["max_subscribers"])
+        self.camera_manager = CameraManager(self.image_processor, self.result_broker)
+        self.frame_encoder = create_frame_encoder()
+        self.embedding_cache = create_embedding_cache()
+        self.enrollment_pipeline = EnrollmentPipeline(face_recognizer=self.face_recognizer, cache=self.embedding_cache)
+        self.identification_service = IdentificationService(self.face_database, self.face_recognizer)
+
+        # Метрики: гистограммы пишут компоненты, счётчики брокера и галереи снимаются при выгрузке
+        self.metrics = get_metrics()
+        self.metrics_server = create_metrics_server()
+        if self.metrics.enabled:
+            self.metrics.add_collector(self._collect_metrics)
+        if self.metrics_server is not None:
+            self.metrics_server.start()
 
         # Переменная для хранения текущего кадра
         self.frames = {}
@@ -32,42 +51,74 @@ class FaceRecognitionAI:
         """Поток для отображения изображений."""
         while not self.stop_event.is_set():
             with self.lock:
-                for camera_index, all_frames in self.frames.items():
-                    for frame in all_frames:
-                        cv2.imshow(f"Camera {camera_index}", frame)
+                for camera_index, records in self.frames.items():
+                    for record in records:
+                        cv2.imshow(f"Camera {camera_index}", record.frame)
 
                         if cv2.waitKey(1) & 0xFF == ord('q'):
                             self.stop_event.set()
                             break
 
-    def add_images(self, images, labels):
+    def enroll_images(self, images, labels, replace = False, progress_callback = None):
         """
-        Добавляет изображения и лейблы в базу данных.
+        Кодирует изображения в пуле процессов и публикует результат в базу одним снимком.
+        Распознавание при этом не приостанавливается.
         :param images: Список изображений в формате bytes.
         :param labels: Список лейблов для изображений.
+        :param replace: True - заменить всю галерею, False - добавить/обновить только эти лейблы.
+        :param progress_callback: callback(report, chunk_results) после каждой закодированной пачки.
+        :return: EnrollmentReport с эмбеддингами и ошибками по отдельным изображениям.
         """
+        report = self.enrollment_pipeline.run(images, labels, progress_callback)
+        faces = report.faces
 
-        # Приостанавливаем распознавание лиц
-        self.image_processor.pause_recognition()
+        if replace:
+            self.face_database.replace(faces)
+            report.added = len(faces)
+        else:
+            report.added, report.updated, _ = self.face_database.update(upserts=faces)
+        return report
 
-        # Очищаем базу данных перед добавлением новых данных
-        self.face_database.clear()
+    def add_images(self, images, labels):
+        """
+        Заменяет содержимое базы данных переданными изображениями и лейблами.
+        :return: EnrollmentReport.
+        """
+        return self.enroll_images(images, labels, replace=True)
+
+    def upsert_images(self, images, labels):
+        """
+        Добавляет новые лица и заменяет существующие, не трогая остальную галерею.
+        :return: EnrollmentReport.
+        """
+        return self.enroll_images(images, labels)
 
-        for image_bytes, label in zip(images, labels):
-            # Преобразуем bytes в изображение
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    def delete_labels(self, labels):
+        """
+        Удаляет лица с указанными лейблами из галереи.
+        :return: Количество удалённых лиц.
+        """
+        _, _, removed = self.face_database.update(deletes=labels)
+        return removed
 
-            face_encodings = self.face_recognizer.get_face_encodings(image_rgb)
-            if face_encodings:
-                self.face_database.add_face(label, face_encodings[0])
-                print(f"[INFO] Added face with label: {label}")
-            else:
-                print(f"[WARNING] No faces found in image for label: {label}")
+    def identify_images(self, images, top_k = 0, threshold = 0):
+        """
+        Распознаёт лица на изображениях клиента.
+        :param images: Итерируемое изображений в формате bytes (может быть потоком).
+        :param top_k: Ближайших лиц галереи на лицо (0 - Config.IDENTIFICATION["top_k"]).
+        :param threshold: Максимальное расстояние совпадения (0 - порог сравнителя).
+        :return: Список IdentifyResult в порядке изображений.
+        """
+        return self.identification_service.identify_stream(images, top_k or None, threshold or None)
 
-        # Возобновляем распознавание лиц
-        self.image_processor.resume_recognition()
+    def get_cache_stats(self):
+        """
+        Возвращает счётчики кэша эмбеддингов.
+        :return: Словарь entries/hits/disk_hits/misses или None, если кэш выключен.
+        """
+        if self.embedding_cache is None:
+            return None
+        return self.embedding_cache.get_stats()
 
     def start_camera_processing(self):
         """
@@ -76,7 +127,7 @@ class FaceRecognitionAI:
         self.camera_manager.start_capture()
 
         while not self.stop_event.is_set():
-            frames = self.camera_manager.get_frames()
+            frames = self.camera_manager.get_frame_records()
             with self.lock:
                 self.frames = frames
             time.sleep(Config().FPS_RETURNING / 100)
@@ -86,16 +137,71 @@ class FaceRecognitionAI:
         if Config().SHOW_CAMERA_WINDOW:
             cv2.destroyAllWindows()
 
+    def subscribe_results(self, cameras = None, max_fps = 0, notify = None):
+        """
+        Подписывается на обработанные кадры и результаты распознавания по мере их появления.
+        :param cameras: Индексы камер (пусто - все камеры).
+        :param max_fps: Максимальная частота кадров на камеру (0 - Config.STREAMING["max_fps"]).
+        :param notify: Вызывается из потока камеры при новом событии (для asyncio).
+        :return: Subscription или None, если достигнут лимит подписчиков или обработка остановлена.
+        """
+        return self.result_broker.subscribe(cameras, max_fps or Config().STREAMING["max_fps"], notify)
+
+    def unsubscribe_results(self, subscription):
+        self.result_broker.unsubscribe(subscription)
+
+    def get_latest_results(self):
+        """
+        Возвращает найденные лица на последнем обработанном кадре каждой камеры.
+        :return: Словарь {camera_index: ResultEvent}.
+        """
+        return self.camera_manager.get_latest_results()
+
     def get_current_frames(self):
         """
         Возвращает текущие кадры с камер.
         :return: Словарь, где ключи - индексы камер, значения - списки кадров (numpy arrays).
         """
+        with self.lock:
+            return {camera_index: [record.frame for record in records] for camera_index, records in self.frames.items()}
+
+    def get_current_frame_records(self):
+        """
+        Возвращает текущие кадры с камер вместе с их номерами и временем захвата.
+        :return: Словарь {camera_index: [RingFrame, ...]}.
+        """
         with self.lock:
             return self.frames.copy()
 
+    def encode_frame(self, camera_index, frame_id, frame, preview = False, quality = 0):
+        """
+        Кодирует кадр в JPEG через общий кэш: кадр кодируется один раз для всех клиентов.
+        :param frame_id: (ring_id, sequence) кадра из RingFrame или ResultEvent.
+        :param preview: True - уменьшенная копия кадра.
+        :param quality: Качество JPEG 1-100; 0 - по Config.FRAME_ENCODER.
+        :return: Future с байтами JPEG.
+        """
+        rendition = PREVIEW if preview else FULL
+        return self.frame_encoder.submit(camera_index, frame_id, frame, rendition, quality)
+
+    def _collect_metrics(self):
+        stats = self.result_broker.get_stats()
+        return [
+            ("gallery_faces", "gauge", (), len(self.face_database)),
+            ("stream_subscribers", "gauge", (), stats["subscribers"]),
+            ("stream_events_sent_total", "counter", (), stats["sent"]),
+            ("stream_events_skipped_total", "counter", (), stats["skipped"])
+        ]
+
     def stop(self):
-        """Останавливает поток отображения."""
+        """Останавливает поток отображения, пулы кодирования и пул инференса."""
         self.stop_event.set()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.result_broker.close()
+        self.enrollment_pipeline.shutdown()
+        self.identification_service.shutdown()
+        self.image_processor.shutdown()
+        self.frame_encoder.shutdown()
         if Config().SHOW_CAMERA_WINDOW:
             self.display_thread.join()
\ No newline at end of file
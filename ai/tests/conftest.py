@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Модули ИИ импортируются от папки ai (from config import Config, from core... import ...)
+ai_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+if ai_path not in sys.path:
+    sys.path.insert(0, ai_path)
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("face_recognition")
+
+from concurrent.futures import ThreadPoolExecutor
+import core.batch_processor as batch_processor
+from core.batch_processor import BatchProcessor, SegmentResult
+from core.face_database import FaceDatabase
+
+class InlineExecutor(ThreadPoolExecutor):
+    """Пул потоков вместо процессов: параметры запуска процессов не нужны."""
+
+    def __init__(self, max_workers, mp_context = None, initializer = None, initargs = ()):
+        super().__init__(max_workers=max_workers)
+
+def process_segment(segment, annotate_path = None, video_codec = "mp4v"):
+    if segment.path == "corrupt.mp4":
+        raise ValueError("cannot decode frame")
+    result = SegmentResult(segment)
+    result.frames = 10
+    result.rows = [{"file": segment.path}]
+    return result
+
+def test_failed_segment_does_not_abort_batch(monkeypatch, capsys):
+    monkeypatch.setattr(batch_processor, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(batch_processor, "_process_segment", process_segment)
+    processor = BatchProcessor(FaceDatabase(), workers=2, segment_frames=0)
+
+    report = processor.run(["a.mp4", "corrupt.mp4", "b.mp4"])
+
+    assert report.frames == 20
+    assert report.detections == 2
+    assert report.errors == [("corrupt.mp4", 0, "ValueError: cannot decode frame")]
+    assert "[ERROR] corrupt.mp4 [0]: ValueError: cannot decode frame" in capsys.readouterr().out
@@ -0,0 +1,84 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+import numpy as np
+from core.camera import CameraManager
+
+class StubSource:
+    """Источник из заранее заданных кадров; после них read() возвращает None."""
+
+    def __init__(self, frames, opened = True):
+        self.frames = list(frames)
+        self.opened = opened
+        self.stopped = False
+
+    def start(self):
+        pass
+
+    def wait_started(self):
+        return self.opened
+
+    def read(self):
+        return self.frames.pop(0) if self.frames else None
+
+    def stop(self):
+        self.stopped = True
+
+class StubProcessor:
+    """Обработчик кадров: кадр со значением fail_value завершается ошибкой."""
+    pipeline_depth = 1
+
+    def __init__(self, fail_value = None, raise_on_submit = False):
+        self.fail_value = fail_value
+        self.raise_on_submit = raise_on_submit
+        self.published = []
+
+    def submit(self, frame, camera_index = 0):
+        if self.raise_on_submit:
+            raise RuntimeError("All inference workers have exited")
+        future = Future()
+        if frame[0, 0, 0] == self.fail_value:
+            future.set_exception(RuntimeError("analyze_frame failed"))
+        else:
+            future.set_result(SimpleNamespace(frame=frame, detections=[]))
+        return future
+
+def frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+def run(manager, sources):
+    manager.start_capture(sources)
+    manager.thread_pool.shutdown(wait=True)
+
+def test_failed_frame_is_skipped_and_capture_continues(capsys):
+    manager = CameraManager(StubProcessor(fail_value=2))
+    published = []
+    manager._get_frame_ring = lambda camera_index, result_frame: SimpleNamespace(
+        put=lambda f, timestamp: published.append(int(f[0, 0, 0])) or len(published), ring_id=1
+    )
+    source = StubSource([frame(1), frame(2), frame(3)])
+
+    run(manager, [source])
+
+    assert published == [1, 3]
+    assert "[ERROR] Camera 0: frame skipped" in capsys.readouterr().out
+    assert source.stopped
+
+def test_capture_error_releases_camera(capsys):
+    manager = CameraManager(StubProcessor(raise_on_submit=True))
+    source = StubSource([frame(1)])
+
+    run(manager, [source])
+
+    assert "[ERROR] Camera 0: capture stopped" in capsys.readouterr().out
+    assert source.stopped
+    assert manager.camera_threads == {}
+    assert manager.frame_rings == {}
+
+def test_only_opened_sources_are_listed():
+    manager = CameraManager(StubProcessor())
+    closed = StubSource([], opened=False)
+
+    run(manager, [StubSource([]), closed, StubSource([])])
+
+    assert manager.cameras == [0, 2]
+    assert closed.stopped
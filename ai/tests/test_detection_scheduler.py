@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from core.detection_scheduler import (
+    DetectionScheduler, OpenCVTrackerPropagator, OpticalFlowPropagator, create_box_propagator
+)
+from core.frame_formats import BGR, FramePreprocessor
+
+WIDTH, HEIGHT = 320, 240
+FACE_SIZE = 80
+_TEXTURE = np.random.default_rng(0).integers(0, 256, (FACE_SIZE, FACE_SIZE, 3), dtype=np.uint8)
+
+def scene(*positions):
+    """Чёрный кадр с текстурными квадратами FACE_SIZE в точках (left, top)."""
+    frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    for left, top in positions:
+        frame[top:top + FACE_SIZE, left:left + FACE_SIZE] = _TEXTURE
+    return frame
+
+def face_box(left, top):
+    return (left, top, left + FACE_SIZE, top + FACE_SIZE)
+
+class SceneDetector:
+    """Детектор, который находит квадраты сцены: они заданы тестом для каждого кадра."""
+
+    def __init__(self):
+        self.positions = []
+        self.calls = 0
+
+    def detect(self, frames):
+        self.calls += 1
+        return [face_box(*position) for position in self.positions]
+
+class LosingPropagator:
+    """Трекер, который теряет все боксы на каждом кадре."""
+    input_color = BGR
+
+    def reset(self, frame, boxes):
+        self.boxes = list(boxes)
+
+    def propagate(self, frame):
+        return [], len(self.boxes)
+
+@pytest.fixture
+def detector():
+    return SceneDetector()
+
+def run(scheduler, detector, *positions):
+    detector.positions = list(positions)
+    return scheduler.detect_faces(FramePreprocessor.of(scene(*positions)))
+
+def test_full_detection_every_n_frames(detector):
+    scheduler = DetectionScheduler(detector, detect_every=3, motion_trigger=False, report_interval=0)
+
+    calls = []
+    for _ in range(7):
+        run(scheduler, detector, (100, 80))
+        calls.append(detector.calls)
+
+    assert calls == [1, 1, 1, 2, 2, 2, 3]
+    assert scheduler.get_stats()["detections"] == 3
+
+def test_boxes_are_propagated_between_detections(detector):
+    scheduler = DetectionScheduler(detector, detect_every=10, motion_trigger=False, report_interval=0)
+    run(scheduler, detector, (100, 80))
+
+    for step in range(1, 4):
+        boxes = run(scheduler, detector, (100 + 4 * step, 80 + 2 * step))
+        left, top, right, bottom = boxes[0]
+        assert abs(left - (100 + 4 * step)) <= 2
+        assert abs(top - (80 + 2 * step)) <= 2
+        assert right - left == pytest.approx(FACE_SIZE, abs=4)
+
+    assert detector.calls == 1
+
+def test_motion_outside_boxes_triggers_early_detection(detector):
+    scheduler = DetectionScheduler(detector, detect_every=10, report_interval=0)
+    run(scheduler, detector, (40, 80))
+    run(scheduler, detector, (40, 80))
+    assert detector.calls == 1
+
+    # Новый человек в кадре вне известных боксов
+    boxes = run(scheduler, detector, (40, 80), (200, 80))
+
+    assert detector.calls == 2
+    assert boxes == [face_box(40, 80), face_box(200, 80)]
+
+def test_motion_inside_boxes_does_not_trigger_detection(detector):
+    scheduler = DetectionScheduler(detector, detect_every=10, report_interval=0)
+    run(scheduler, detector, (100, 80))
+    for step in range(1, 4):
+        run(scheduler, detector, (100 + 2 * step, 80))
+
+    assert detector.calls == 1
+
+def test_lost_box_falls_back_to_detection(detector):
+    scheduler = DetectionScheduler(detector, detect_every=10, motion_trigger=False, report_interval=0)
+    scheduler.propagator = LosingPropagator()
+
+    run(scheduler, detector, (100, 80))
+    boxes = run(scheduler, detector, (100, 80))
+
+    assert boxes == [face_box(100, 80)]
+    assert detector.calls == 2
+    assert scheduler.get_stats()["dropped"] == 1
+
+def test_optical_flow_drops_box_without_texture():
+    propagator = OpticalFlowPropagator()
+    frame = scene((100, 80))
+    # Второй бокс на ровном чёрном фоне: точек для отслеживания нет
+    propagator.reset(frame, [face_box(100, 80), face_box(220, 150)])
+
+    boxes, dropped = propagator.propagate(frame)
+
+    assert dropped == 1
+    assert boxes == [face_box(100, 80)]
+
+def test_missing_opencv_tracker_falls_back_to_optical_flow():
+    if OpenCVTrackerPropagator._find_factory("kcf") is not None:
+        assert isinstance(create_box_propagator("kcf"), OpenCVTrackerPropagator)
+    else:
+        assert isinstance(create_box_propagator("kcf"), OpticalFlowPropagator)
+
+@pytest.mark.skipif(OpenCVTrackerPropagator._find_factory("kcf") is None,
+                    reason="KCF is not available in this cv2 build")
+def test_kcf_tracker_follows_moving_box():
+    propagator = OpenCVTrackerPropagator("kcf")
+    propagator.reset(scene((100, 80)), [face_box(100, 80)])
+
+    boxes, dropped = propagator.propagate(scene((104, 82)))
+
+    assert dropped == 0
+    left, top, _, _ = boxes[0]
+    assert abs(left - 104) <= 3 and abs(top - 82) <= 3
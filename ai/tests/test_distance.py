@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from core.distance import pairwise_distances, rank_matches, select_top_k
+
+def naive_distance(a, b, metric):
+    """Расстояние по тем же формулам, что у DeepFace.verify."""
+    if metric == "euclidean":
+        return np.linalg.norm(a - b)
+    if metric == "cosine":
+        return 1.0 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    return np.linalg.norm(a / np.linalg.norm(a) - b / np.linalg.norm(b))
+
+@pytest.mark.parametrize("metric", ["euclidean", "cosine", "euclidean_l2"])
+def test_pairwise_distances_match_naive(metric):
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(4, 16)).astype(np.float32)
+    gallery = rng.normal(size=(7, 16)).astype(np.float32)
+
+    distances = pairwise_distances(queries, gallery, metric)
+
+    expected = [[naive_distance(q, g, metric) for g in gallery] for q in queries]
+    np.testing.assert_allclose(distances, expected, rtol=1e-4, atol=1e-4)
+
+def test_unknown_metric_is_rejected():
+    with pytest.raises(ValueError):
+        pairwise_distances(np.ones((1, 2), np.float32), np.ones((1, 2), np.float32), "manhattan")
+
+def test_select_top_k_sorted():
+    distances = np.array([[0.5, 0.1, 0.9, 0.3]], dtype=np.float32)
+    ids = np.array(["a", "b", "c", "d"], dtype=object)
+
+    top_ids, top_distances = select_top_k(distances, ids, 3)
+
+    assert top_ids.tolist() == [["b", "d", "a"]]
+    np.testing.assert_allclose(top_distances, [[0.1, 0.3, 0.5]])
+
+def test_select_top_k_larger_than_gallery():
+    top_ids, _ = select_top_k(np.array([[0.2, 0.1]]), np.array(["a", "b"], dtype=object), 5)
+
+    assert top_ids.tolist() == [["b", "a"]]
+
+def test_rank_matches_applies_threshold_and_skips_padding():
+    ids = np.array([["a", "b", None], ["c", None, None]], dtype=object)
+    distances = np.array([[0.1, 0.7, np.inf], [0.9, np.inf, np.inf]], dtype=np.float32)
+
+    assert rank_matches(ids, distances, threshold=0.6) == [[("a", pytest.approx(0.1))], []]
+    assert [len(matches) for matches in rank_matches(ids, distances)] == [2, 1]
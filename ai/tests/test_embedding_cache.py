@@ -0,0 +1,57 @@
+import numpy as np
+from config import Config
+from core.embedding_cache import EmbeddingCache, get_encoder_signature
+
+IMAGE = b"image bytes"
+
+def vector(value):
+    return np.full(4, value, dtype=np.float32)
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache("model", max_entries=2)
+    keys = [cache.key(bytes([i])) for i in range(3)]
+    cache.put(keys[0], vector(0))
+    cache.put(keys[1], vector(1))
+
+    # Обращение к первой записи делает самой старой вторую
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], vector(2))
+
+    assert cache.get(keys[1]) is None
+    np.testing.assert_array_equal(cache.get(keys[0]), vector(0))
+    np.testing.assert_array_equal(cache.get(keys[2]), vector(2))
+    assert cache.get_stats() == {"entries": 2, "hits": 3, "disk_hits": 0, "misses": 1}
+
+def test_disk_round_trip(tmp_path):
+    cache = EmbeddingCache("model", disk_path=str(tmp_path))
+    face_key, no_face_key = cache.key(IMAGE), cache.key(b"no face")
+    cache.put(face_key, vector(0.5))
+    cache.put(no_face_key, None)
+
+    # Новый кэш (перезапуск сервера) читает записи с диска
+    restarted = EmbeddingCache("model", disk_path=str(tmp_path))
+    np.testing.assert_array_equal(restarted.get(face_key), vector(0.5))
+    assert restarted.get(no_face_key).size == 0
+    assert restarted.get_stats()["disk_hits"] == 2
+    assert not list(tmp_path.rglob("*.tmp"))
+
+def test_key_depends_on_model_signature(tmp_path):
+    old = EmbeddingCache("face_recognition:small", disk_path=str(tmp_path))
+    old.put(old.key(IMAGE), vector(1))
+
+    new = EmbeddingCache("face_recognition:large", disk_path=str(tmp_path))
+
+    assert new.key(IMAGE) != old.key(IMAGE)
+    assert new.get(new.key(IMAGE)) is None
+
+def test_signature_follows_comparer_settings(monkeypatch):
+    cfg = {key: dict(value) if isinstance(value, dict) else value
+           for key, value in Config.FACE_COMPARISON.items()}
+    monkeypatch.setattr(Config, "FACE_COMPARISON", cfg)
+    signature = get_encoder_signature()
+
+    cfg[cfg["method"]]["model"] = "another"
+    assert get_encoder_signature() != signature
+
+    cfg["method"] = "deepface"
+    assert get_encoder_signature().startswith("deepface:")
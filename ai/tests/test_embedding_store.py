@@ -0,0 +1,77 @@
+import os
+import numpy as np
+from core.embedding_store import EmbeddingStore
+from core.face_database import FaceDatabase
+from core.face_index import BruteForceIndex
+
+def vectors(count, dim = 4, seed = 0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+def test_empty_store_loads_nothing(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model")
+
+    assert store.load() == ([], None)
+
+def test_log_is_replayed_and_compacted_on_load(tmp_path):
+    data = vectors(3)
+    store = EmbeddingStore(str(tmp_path), "model")
+    store.compact(["a", "b"], data[:2])
+    store.append(upserts={"c": data[2], "a": data[1]}, deletes=["b"])
+
+    ids, loaded = EmbeddingStore(str(tmp_path), "model").load()
+
+    faces = dict(zip(ids, loaded))
+    assert sorted(faces) == ["a", "c"]
+    np.testing.assert_array_equal(faces["a"], data[1])
+    np.testing.assert_array_equal(faces["c"], data[2])
+    assert isinstance(loaded, np.memmap)
+    assert not os.path.exists(store.log_path)
+
+def test_truncated_log_record_is_dropped(tmp_path):
+    data = vectors(2)
+    store = EmbeddingStore(str(tmp_path), "model")
+    store.append(upserts={"a": data[0]})
+    store.append(upserts={"b": data[1]})
+    with open(store.log_path, "r+b") as f:
+        f.truncate(os.path.getsize(store.log_path) - 3)
+
+    ids, _ = EmbeddingStore(str(tmp_path), "model").load()
+
+    assert ids == ["a"]
+
+def test_store_of_another_model_is_ignored(tmp_path):
+    EmbeddingStore(str(tmp_path), "model-a").compact(["a"], vectors(1))
+
+    assert EmbeddingStore(str(tmp_path), "model-b").load() == ([], None)
+
+def test_append_reports_compaction_threshold(tmp_path):
+    data = vectors(3)
+    store = EmbeddingStore(str(tmp_path), "model", compact_after=2)
+
+    assert not store.append(upserts={"a": data[0]})
+    assert store.append(upserts={"b": data[1]})
+
+def test_compaction_keeps_mapped_snapshot_intact(tmp_path):
+    data = vectors(4)
+    store = EmbeddingStore(str(tmp_path), "model")
+    store.compact(["a", "b"], data[:2])
+    ids, mapped = EmbeddingStore(str(tmp_path), "model").load()
+
+    # Новое поколение пишется в отдельный файл, отображённый снимок не заменяется
+    store.compact(["c", "d"], data[2:])
+
+    np.testing.assert_array_equal(mapped, data[:2])
+    assert EmbeddingStore(str(tmp_path), "model").load()[0] == ["c", "d"]
+    snapshots = [name for name in os.listdir(tmp_path) if name.endswith(".bin")]
+    assert snapshots == [os.path.basename(store.snapshot_path)]
+
+def test_database_persists_updates(tmp_path):
+    data = vectors(3)
+    database = FaceDatabase(index=BruteForceIndex(), store=EmbeddingStore(str(tmp_path), "model", compact_after=2))
+    database.update(upserts={"a": data[0], "b": data[1]})
+    database.update(upserts={"c": data[2]}, deletes=["a"])
+
+    reloaded = FaceDatabase(index=BruteForceIndex(), store=EmbeddingStore(str(tmp_path), "model"))
+
+    assert sorted(reloaded.get_face_ids()) == ["b", "c"]
+    assert reloaded.search(data[2])[0][0][0] == "c"
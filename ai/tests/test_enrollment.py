@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from core.enrollment import NO_FACE_ERROR, EnrollmentPipeline
+from core.frame_formats import BGR
+
+class StubRecognizer:
+    """Сравнитель, который «находит лицо» на светлом изображении: эмбеддинг - средний цвет."""
+    input_color = BGR
+
+    def encode(self, image):
+        if image.mean() < 128:
+            return []
+        return [np.full(128, image.mean() / 255, dtype=np.float32)]
+
+class BrokenExecutor:
+    """Пул, процессы которого падают на каждой пачке."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, chunk):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker killed"))
+        return future
+
+    def shutdown(self, wait = True):
+        self.shut_down = True
+
+def png(value):
+    return cv2.imencode(".png", np.full((16, 16, 3), value, np.uint8))[1].tobytes()
+
+def test_good_unreadable_and_no_face_images():
+    pipeline = EnrollmentPipeline(workers=0, chunk_size=2, face_recognizer=StubRecognizer())
+
+    report = pipeline.run([png(255), b"not an image", png(0)], ["alice", "broken", "dark"])
+
+    assert report.total == report.processed == 3
+    assert report.succeeded == 1
+    assert list(report.faces) == ["alice"]
+    assert [(r.label, r.error) for r in report.failures] == [
+        ("broken", "Cannot decode image"),
+        ("dark", NO_FACE_ERROR)
+    ]
+
+def test_broken_pool_fails_images_instead_of_aborting():
+    pipeline = EnrollmentPipeline(workers=2, chunk_size=2)
+    executors = []
+    def get_executor():
+        if pipeline._executor is None:
+            pipeline._executor = BrokenExecutor()
+            executors.append(pipeline._executor)
+        return pipeline._executor
+    pipeline._get_executor = get_executor
+
+    report = pipeline.run([png(255)] * 3, ["a", "b", "c"])
+
+    assert report.processed == 3
+    assert report.succeeded == 0
+    assert all("Enrollment worker failed" in r.error for r in report.failures)
+    assert executors[0].shut_down
+    assert pipeline._executor is None
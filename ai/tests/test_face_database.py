@@ -0,0 +1,100 @@
+import numpy as np
+from core.face_database import FaceDatabase
+from core.face_index import BruteForceIndex, IVFIndex, _VectorBlock
+
+def random_vectors(count, dim = 8, seed = 0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+def test_update_publishes_new_snapshot_and_keeps_old_one():
+    vectors = random_vectors(3)
+    database = FaceDatabase(index=BruteForceIndex())
+    database.update(upserts={"a": vectors[0], "b": vectors[1]})
+    snapshot = database.index
+
+    added, updated, removed = database.update(upserts={"b": vectors[2], "c": vectors[2]}, deletes=["a"])
+
+    assert (added, updated, removed) == (1, 1, 1)
+    assert sorted(snapshot.get_face_ids()) == ["a", "b"]
+    assert sorted(database.get_face_ids()) == ["b", "c"]
+    np.testing.assert_allclose(snapshot.search(vectors[1:2], 1, "euclidean")[1], [[0.0]], atol=1e-4)
+    assert sorted(face_id for face_id, _ in database.search(vectors[2], k=2)[0]) == ["b", "c"]
+
+def test_copy_shares_vector_memory():
+    vectors = random_vectors(100)
+    index = BruteForceIndex()
+    index.load(list(range(100)), vectors)
+
+    copy = index.copy()
+    copy.add(100, vectors[0])
+    copy.remove(5)
+
+    # Основа не копируется ни при копии индекса, ни при изменениях копии
+    assert copy._block._base is index._block._base and copy._block._base.vectors is vectors
+    assert 5 in index and 100 not in index
+    assert len(index) == 100 and len(copy) == 100
+
+def test_diverging_copies_do_not_overwrite_each_other():
+    vectors = random_vectors(4)
+    block = _VectorBlock(initial_capacity=8)
+    block.add("a", vectors[0])
+
+    first, second = block.copy(), block.copy()
+    first.add("b", vectors[1])
+    second.add("c", vectors[2])
+
+    assert first.ids.tolist() == ["a", "b"]
+    assert second.ids.tolist() == ["a", "c"]
+    np.testing.assert_array_equal(first.vectors[1], vectors[1])
+
+def test_removed_rows_are_not_returned():
+    vectors = random_vectors(10)
+    block = _VectorBlock()
+    for face_id, vector in enumerate(vectors):
+        block.add(face_id, vector)
+
+    block.remove(4)
+    block.add(6, vectors[4])
+    ids, distances = block.search(vectors[4:5], np.einsum("ij,ij->i", vectors[4:5], vectors[4:5]), 10, "euclidean")
+
+    assert ids[0, 0] == 6 and distances[0, 0] < 1e-3
+    assert 4 not in ids[0].tolist()
+    # Надгробие уходит в конец выдачи как недостающая позиция
+    assert ids[0, -1] is None and np.isinf(distances[0, -1])
+    assert len(block) == 9 and sorted(block.ids.tolist()) == [0, 1, 2, 3, 5, 6, 7, 8, 9]
+
+def test_tombstones_are_compacted():
+    vectors = random_vectors(400)
+    block = _VectorBlock()
+    block.adopt(list(range(400)), vectors)
+
+    for face_id in range(200):
+        block.remove(face_id)
+
+    assert len(block._dead) <= max(block.COMPACT_MIN_DEAD, len(block) // 4)
+    assert sorted(block.ids.tolist()) == list(range(200, 400))
+    np.testing.assert_array_equal(block.vectors[block.ids.tolist().index(250)], vectors[250])
+
+def test_ivf_copy_is_independent():
+    vectors = random_vectors(300)
+    index = IVFIndex(nlist=8, nprobe=8, min_train_size=200)
+    for face_id, vector in enumerate(vectors):
+        index.add(face_id, vector)
+
+    copy = index.copy()
+    copy.remove(0)
+    copy.add(300, vectors[0])
+
+    assert 0 in index and 300 not in index
+    assert index.search(vectors[:1], 1, "euclidean")[0][0, 0] == 0
+    assert copy.search(vectors[:1], 1, "euclidean")[0][0, 0] == 300
+
+def test_adopted_matrix_norms_are_computed_on_first_search():
+    vectors = random_vectors(10)
+    index = BruteForceIndex()
+    index.load(list(range(10)), vectors)
+    copy = index.copy()
+
+    assert index._block._base._sq_norms is None
+    copy.search(vectors[:1], 1, "euclidean")
+    # Нормы основы считаются один раз на все снимки
+    assert index._block._base._sq_norms is not None
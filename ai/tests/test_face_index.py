@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from core.face_index import BruteForceIndex, IVFIndex
+
+def make_gallery(size, dim, seed = 0):
+    """Эмбеддинги, сгруппированные вокруг случайных центров, и их зашумлённые копии-запросы."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(size // 20, 1), dim)).astype(np.float32)
+    gallery = centers[rng.integers(0, len(centers), size=size)] + 0.5 * rng.normal(size=(size, dim))
+    rows = rng.choice(size, min(size, 50), replace=False)
+    queries = gallery[rows] + 0.1 * rng.normal(size=(len(rows), dim))
+    return gallery.astype(np.float32), queries.astype(np.float32), rows
+
+def fill(index, gallery):
+    for face_id, embedding in enumerate(gallery):
+        index.add(face_id, embedding)
+    return index
+
+def test_brute_force_finds_exact_nearest():
+    gallery, queries, rows = make_gallery(500, 16)
+    index = fill(BruteForceIndex(), gallery)
+
+    ids, distances = index.search(queries, 3, "euclidean")
+
+    assert ids.shape == (len(queries), 3)
+    assert ids[:, 0].tolist() == rows.tolist()
+    assert np.all(np.diff(distances, axis=1) >= 0)
+
+def test_brute_force_remove_and_replace():
+    gallery, _, _ = make_gallery(10, 8)
+    index = fill(BruteForceIndex(), gallery)
+
+    index.remove(3)
+    index.add(5, gallery[3])
+
+    assert len(index) == 9
+    assert 3 not in index
+    ids, distances = index.search(gallery[3:4], 1, "euclidean")
+    assert ids[0, 0] == 5 and distances[0, 0] == pytest.approx(0.0, abs=1e-4)
+    assert sorted(index.get_face_ids()) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+
+def test_search_pads_missing_positions():
+    gallery, _, _ = make_gallery(2, 8)
+    index = fill(BruteForceIndex(), gallery)
+
+    ids, distances = index.search(gallery[:1], 5, "cosine")
+
+    assert ids.shape == (1, 2)
+    assert ids[0, 0] == 0
+
+def test_ivf_before_training_is_exact():
+    gallery, queries, rows = make_gallery(200, 16)
+    index = fill(IVFIndex(nlist=16, min_train_size=1000), gallery)
+
+    assert not index.is_trained
+    ids, _ = index.search(queries, 1, "euclidean")
+    assert ids[:, 0].tolist() == rows.tolist()
+
+@pytest.mark.parametrize("metric", ["euclidean", "cosine", "euclidean_l2"])
+def test_ivf_recall_against_brute_force(metric):
+    gallery, queries, _ = make_gallery(4000, 32)
+    brute_force = fill(BruteForceIndex(), gallery)
+    ivf = fill(IVFIndex(metric=metric, nlist=32, nprobe=8, min_train_size=2000), gallery)
+
+    assert ivf.is_trained
+    assert len(ivf) == len(gallery)
+    true_ids, _ = brute_force.search(queries, 5, metric)
+    found_ids, _ = ivf.search(queries, 5, metric)
+    hits = sum(len(set(found) & set(true)) for found, true in zip(found_ids.tolist(), true_ids.tolist()))
+    assert hits / true_ids.size >= 0.9
+
+def test_ivf_remove_after_training():
+    gallery, _, _ = make_gallery(300, 8)
+    index = fill(IVFIndex(nlist=8, nprobe=8, min_train_size=200), gallery)
+
+    index.remove(7)
+
+    assert 7 not in index
+    ids, _ = index.search(gallery[7:8], 3, "euclidean")
+    assert 7 not in ids[0].tolist()
+
+def test_ivf_export_is_adopted_without_retraining(monkeypatch):
+    gallery, queries, _ = make_gallery(600, 16)
+    source = fill(IVFIndex(nlist=16, nprobe=4, min_train_size=400), gallery)
+    ids, vectors, layout = source.export()
+
+    target = IVFIndex(nlist=16, nprobe=4, min_train_size=400)
+    monkeypatch.setattr(target, "train", lambda: pytest.fail("adopted index must not retrain"))
+    target.load(ids, vectors, layout)
+
+    assert target.is_trained and len(target) == len(gallery)
+    # Списки - срезы переданной матрицы, а не её копии
+    assert all(np.shares_memory(block._base.vectors, vectors) for block in target._lists if len(block))
+    np.testing.assert_array_equal(target.search(queries, 3, "euclidean")[0], source.search(queries, 3, "euclidean")[0])
+
+def test_brute_force_export_round_trip():
+    gallery, queries, _ = make_gallery(50, 8)
+    source = fill(BruteForceIndex(), gallery)
+    source.remove(10)
+
+    target = BruteForceIndex()
+    target.load(*source.export())
+
+    assert sorted(target.get_face_ids()) == sorted(source.get_face_ids())
+    np.testing.assert_array_equal(target.search(queries, 2, "cosine")[0], source.search(queries, 2, "cosine")[0])
@@ -0,0 +1,122 @@
+import pytest
+from core.face_tracker import FaceTracker, _BoxKalman, box_iou
+
+def shifted(box, dx, dy = 0):
+    left, top, right, bottom = box
+    return (left + dx, top + dy, right + dx, bottom + dy)
+
+FACE = (100, 100, 200, 200)
+OTHER = (400, 100, 500, 200)
+
+@pytest.fixture(params=[False, True], ids=["plain", "kalman"])
+def tracker(request):
+    return FaceTracker(max_missed_frames=2, recognize_every=5, low_confidence_every=2,
+                       use_kalman=request.param)
+
+def test_box_iou():
+    iou = box_iou([FACE], [FACE, shifted(FACE, 50), OTHER])
+
+    assert iou.shape == (1, 3)
+    assert iou[0, 0] == pytest.approx(1.0)
+    assert iou[0, 1] == pytest.approx(50 * 100 / (2 * 100 * 100 - 50 * 100))
+    assert iou[0, 2] == 0
+
+def test_moving_face_keeps_its_track(tracker):
+    first, = tracker.update([FACE])
+    for step in range(1, 5):
+        track, = tracker.update([shifted(FACE, 10 * step)])
+        assert track is first
+
+    assert len(tracker.tracks) == 1
+
+def test_fast_face_is_associated_by_centroid(tracker):
+    # Сдвиг на 80% ширины: IoU ниже порога, но центр остаётся рядом
+    first, = tracker.update([FACE])
+    track, = tracker.update([shifted(FACE, 40, 30)])
+
+    assert track is first
+
+def test_disjoint_box_starts_new_track(tracker):
+    first, = tracker.update([FACE])
+    same, other = tracker.update([FACE, OTHER])
+
+    assert same is first
+    assert other is not first
+    assert other.track_id != first.track_id
+    assert len(tracker.tracks) == 2
+
+def test_two_faces_are_not_swapped(tracker):
+    left, right = tracker.update([FACE, OTHER])
+    tracked_right, tracked_left = tracker.update([shifted(OTHER, 5), shifted(FACE, 5)])
+
+    assert tracked_left is left
+    assert tracked_right is right
+
+def test_track_expires_after_max_missed(tracker):
+    first, = tracker.update([FACE])
+    tracker.update([])
+    tracker.update([])
+    assert tracker.tracks == [first]
+
+    tracker.update([])
+    assert tracker.tracks == []
+    track, = tracker.update([FACE])
+    assert track is not first
+
+def test_missed_track_is_recovered_before_expiry(tracker):
+    first, = tracker.update([FACE])
+    tracker.update([])
+    track, = tracker.update([FACE])
+
+    assert track is first
+    assert track.missed_frames == 0
+
+def test_new_track_needs_recognition_then_waits_for_interval(tracker):
+    track, = tracker.update([FACE])
+    assert tracker.needs_recognition(track, threshold=0.6)
+    track.set_identity((7, 0.2))
+
+    needed = []
+    for _ in range(6):
+        track, = tracker.update([FACE])
+        needed.append(tracker.needs_recognition(track, threshold=0.6))
+
+    assert needed == [False, False, False, False, True, True]
+    assert tracker.recognitions == 3
+
+def test_low_confidence_match_is_rechecked_sooner(tracker):
+    track, = tracker.update([FACE])
+    # 0.55 > 0.6 * 0.8: совпадение близко к порогу
+    track.set_identity((7, 0.55))
+
+    track, = tracker.update([FACE])
+    assert not tracker.needs_recognition(track, threshold=0.6)
+    track, = tracker.update([FACE])
+    assert tracker.needs_recognition(track, threshold=0.6)
+
+def test_unknown_face_is_rechecked_on_interval(tracker):
+    track, = tracker.update([FACE])
+    track.set_identity(None)
+    assert track.label is None and track.recognized
+
+    needed = []
+    for _ in range(5):
+        track, = tracker.update([FACE])
+        needed.append(tracker.needs_recognition(track, threshold=0.6))
+
+    assert needed == [False, False, False, False, True]
+
+def test_kalman_smooths_jitter_and_follows_motion():
+    kalman = _BoxKalman(FACE)
+    for step in range(1, 20):
+        kalman.predict()
+        kalman.update(shifted(FACE, 10 * step))
+
+    # Постоянная скорость: прогноз уходит вперёд на один шаг
+    predicted = kalman.predict()
+    assert predicted[0] == pytest.approx(FACE[0] + 200, abs=3)
+    assert predicted[2] - predicted[0] == pytest.approx(100, abs=3)
+
+    # Одиночный выброс сдвигает бокс меньше, чем сам выброс
+    smoothed = kalman.update(shifted(FACE, 200, 40))
+    assert 0 < smoothed[1] - FACE[1] < 40
@@ -0,0 +1,59 @@
+import time
+import cv2
+import numpy as np
+import pytest
+from core.frame_encoder import PREVIEW, FrameEncoder
+from core.shared_frames import FrameRing
+
+@pytest.fixture
+def encoder():
+    encoder = FrameEncoder(workers=1, use_turbojpeg=False)
+    yield encoder
+    encoder.shutdown()
+
+def test_same_frame_is_encoded_once(encoder):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    first = encoder.submit(0, (1, 1), frame)
+    second = encoder.submit(0, (1, 1), frame)
+
+    assert first is second
+    assert first.result()[:2] == b"\xff\xd8"
+    assert encoder.get_stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+def test_restarted_camera_ring_does_not_hit_stale_frames(encoder):
+    frames = []
+    for value in (0, 255):
+        ring = FrameRing((8, 8, 3), capacity=1)
+        ring.put(np.full((8, 8, 3), value, dtype=np.uint8))
+        frames.append(ring.get_latest())
+        ring.close()
+
+    # Номера кадров нового буфера снова начинаются с 1, но id буфера другой
+    assert frames[0].sequence == frames[1].sequence
+    first = encoder.submit(0, (frames[0].ring_id, frames[0].sequence), frames[0].frame)
+    second = encoder.submit(0, (frames[1].ring_id, frames[1].sequence), frames[1].frame)
+    assert first is not second
+
+def test_encoder_errors_are_value_errors(encoder, monkeypatch):
+    def fail(*args):
+        raise OSError("libturbojpeg failed")
+    monkeypatch.setattr(encoder, "_encode_frame", fail)
+
+    future = encoder.submit(0, (1, 1), np.zeros((8, 8, 3), dtype=np.uint8))
+
+    with pytest.raises(ValueError, match="libturbojpeg failed"):
+        future.result()
+    # Неудачное кодирование убирается из кэша колбэком Future
+    deadline = time.monotonic() + 5
+    while encoder.get_stats()["entries"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert encoder.get_stats()["entries"] == 0
+
+def test_preview_is_downscaled(encoder):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    data = encoder.encode(0, (1, 1), frame, PREVIEW)
+
+    decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape[1] == encoder.preview_width
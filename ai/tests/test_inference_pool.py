@@ -0,0 +1,86 @@
+import queue
+import threading
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+
+from concurrent.futures import Future
+from core.inference_pool import InferencePool, _CameraSlots
+from core.metrics import get_metrics
+
+class FakeProcess:
+    def __init__(self):
+        self.exitcode = None
+
+    def is_alive(self):
+        return self.exitcode is None
+
+def make_pool(workers):
+    """Пул без процессов: результаты в очередь кладёт тест, процессы - заглушки с is_alive()."""
+    pool = InferencePool.__new__(InferencePool)
+    pool.WORKER_CHECK_INTERVAL = 0.05
+    pool.workers = workers
+    pool._processes = [FakeProcess() for _ in range(workers)]
+    pool._results = queue.Queue()
+    pool._pending = {}
+    pool.lock = threading.Lock()
+    pool.metrics = get_metrics()
+    pool._running = True
+    return pool
+
+def add_task(pool, task_id, worker, camera_slots):
+    future = Future()
+    slot = camera_slots.free.get()
+    with pool.lock:
+        pool._pending[task_id] = (future, camera_slots, slot, worker, worker)
+    return future
+
+def test_dead_worker_futures_fail_while_other_worker_keeps_producing():
+    pool = make_pool(2)
+    slots = [_CameraSlots((2, 2, 3), np.uint8, depth=4) for _ in range(2)]
+    reader = threading.Thread(target=pool._read_results, daemon=True)
+    reader.start()
+
+    stuck = add_task(pool, -1, 1, slots[1])
+    pool._processes[1].exitcode = -9
+
+    # Процесс 0 присылает результаты чаще, чем истекает таймаут чтения очереди
+    stop = threading.Event()
+    def produce():
+        task_id = 0
+        while not stop.is_set():
+            future = add_task(pool, task_id, 0, slots[0])
+            pool._results.put((task_id, None, [], None))
+            future.result(timeout=5)
+            task_id += 1
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        with pytest.raises(RuntimeError, match="exited with code -9"):
+            stuck.result(timeout=5)
+        assert slots[1].free.qsize() == 4
+    finally:
+        stop.set()
+        producer.join()
+        pool._results.put(None)
+        reader.join()
+        for camera_slots in slots:
+            camera_slots.frames.close()
+
+def test_late_result_of_failed_task_is_ignored():
+    pool = make_pool(1)
+    camera_slots = _CameraSlots((2, 2, 3), np.uint8, depth=2)
+    future = add_task(pool, 0, 0, camera_slots)
+    pool._processes[0].exitcode = 1
+    pool._check_workers()
+
+    # Результат, отправленный процессом перед выходом, приходит после ошибки
+    pool._results.put((0, None, [], None))
+    pool._results.put(None)
+    pool._read_results()
+
+    assert isinstance(future.exception(), RuntimeError)
+    assert camera_slots.free.qsize() == 2
+    camera_slots.frames.close()
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from config import Config
+from core.label_renderer import LabelRenderer
+
+WIDTH, HEIGHT = 160, 60
+TEXT = "Иван 0.42"
+
+@pytest.fixture
+def renderer():
+    return LabelRenderer(Config().LABELS["font_path"], font_size=20)
+
+def blank():
+    return np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+
+def draw_with_pil(renderer, text, position):
+    """Прежняя отрисовка: PIL поверх всего кадра, текст поднят на свою высоту."""
+    image = Image.fromarray(blank())
+    left, top, right, bottom = renderer.font.getbbox(text)
+    x, y = position
+    ImageDraw.Draw(image).text((x, y - (bottom - top)), text, font=renderer.font, fill=(255, 255, 255))
+    return np.asarray(image)
+
+@pytest.mark.parametrize("position", [(20, 40), (0, 30), (-8, 30), (120, 40), (20, HEIGHT), (20, 5)],
+                         ids=["inside", "left_edge", "past_left", "past_right", "bottom_row", "past_top"])
+def test_matches_pil_placement_and_clips_at_edges(renderer, position):
+    frame = blank()
+
+    renderer.draw(frame, TEXT, position)
+
+    expected = draw_with_pil(renderer, TEXT, position)
+    assert frame.shape == (HEIGHT, WIDTH, 3)
+    assert frame.any()
+    assert np.abs(frame.astype(int) - expected.astype(int)).max() <= 1
+
+def test_label_outside_frame_draws_nothing(renderer):
+    frame = blank()
+
+    renderer.draw(frame, TEXT, (WIDTH + 10, 30))
+    renderer.draw(frame, TEXT, (20, -40))
+
+    assert not frame.any()
+
+def test_cache_hit_gives_same_pixels(renderer):
+    first = blank()
+    renderer.draw(first, TEXT, (10, 40))
+    assert renderer.get_stats() == {"cached_labels": 1}
+
+    again = blank()
+    renderer.draw(again, TEXT, (10, 40))
+    fresh = blank()
+    LabelRenderer(Config().LABELS["font_path"], font_size=20).draw(fresh, TEXT, (10, 40))
+
+    assert renderer.get_stats() == {"cached_labels": 1}
+    np.testing.assert_array_equal(again, first)
+    np.testing.assert_array_equal(fresh, first)
+
+def test_cache_evicts_oldest_label():
+    renderer = LabelRenderer(Config().LABELS["font_path"], cache_size=2)
+    for text in ("a", "b", "a", "c"):
+        renderer.draw(blank(), text, (10, 40))
+
+    assert list(renderer._cache) == ["a", "c"]
+
+def test_blends_color_over_background(renderer):
+    frame = np.full((HEIGHT, WIDTH, 3), 100, np.uint8)
+
+    renderer.draw(frame, TEXT, (10, 40))
+
+    # Полностью покрытые пиксели - цвет подписи, фон без подписи не меняется
+    assert frame.max() == 255
+    assert frame.min() == 100
@@ -0,0 +1,60 @@
+import pytest
+from core.metrics import Histogram, Metrics
+
+BOUNDS = [0.01, 0.1, 1.0]
+
+def test_histogram_buckets_include_upper_bound():
+    histogram = Histogram(BOUNDS)
+    for value in (0.005, 0.01, 0.05, 0.5, 2.0):
+        histogram.observe(value)
+
+    # Значение на границе попадает в корзину с этой границей (le), последняя корзина - +Inf
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(2.565)
+
+def test_histogram_quantile_interpolates_within_bucket():
+    histogram = Histogram(BOUNDS)
+    assert histogram.quantile(0.5) == 0.0
+    for _ in range(4):
+        histogram.observe(0.05)
+
+    assert histogram.quantile(0.5) == pytest.approx(0.055)
+    assert histogram.quantile(1.0) == pytest.approx(0.1)
+
+def test_render_prometheus():
+    metrics = Metrics(enabled=True, buckets=BOUNDS)
+    metrics.observe_stage("detect", 0, 0.05)
+    metrics.observe_stage("detect", 0, 2.0)
+    metrics.inc("frames_total", 3, (("camera", "0"),))
+    metrics.set("subscribers", 2)
+    metrics.add_collector(lambda: [("ring_lost", "counter", (("camera", 'a"b'),), 7)])
+
+    lines = metrics.render_prometheus().splitlines()
+
+    labels = 'camera="0",stage="detect"'
+    assert lines[:7] == [
+        "# TYPE face_recognition_stage_seconds histogram",
+        f'face_recognition_stage_seconds_bucket{{{labels},le="0.01"}} 0',
+        f'face_recognition_stage_seconds_bucket{{{labels},le="0.1"}} 1',
+        f'face_recognition_stage_seconds_bucket{{{labels},le="1.0"}} 1',
+        f'face_recognition_stage_seconds_bucket{{{labels},le="+Inf"}} 2',
+        f"face_recognition_stage_seconds_sum{{{labels}}} 2.05",
+        f"face_recognition_stage_seconds_count{{{labels}}} 2",
+    ]
+    assert lines[7:] == [
+        "# TYPE face_recognition_frames_total counter",
+        'face_recognition_frames_total{camera="0"} 3',
+        "# TYPE face_recognition_ring_lost counter",
+        'face_recognition_ring_lost{camera="a\\"b"} 7',
+        "# TYPE face_recognition_subscribers gauge",
+        "face_recognition_subscribers 2",
+    ]
+
+def test_failing_collector_is_skipped(capsys):
+    metrics = Metrics(enabled=True)
+    metrics.add_collector(lambda: 1 / 0)
+    metrics.set("subscribers", 1)
+
+    assert metrics.render_prometheus().splitlines()[-1] == "face_recognition_subscribers 1"
+    assert "[WARNING] Metrics collector failed" in capsys.readouterr().out
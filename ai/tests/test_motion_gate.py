@@ -0,0 +1,90 @@
+import numpy as np
+from core.detection_scheduler import DetectionScheduler
+from core.frame_formats import FramePreprocessor
+from core.motion_gate import MotionGate, RegionOfInterest
+
+SIZE = (160, 120)
+# Нижняя половина кадра
+BOTTOM_HALF = [[(0.0, 0.5), (1.0, 0.5), (1.0, 1.0), (0.0, 1.0)]]
+
+def frames(image):
+    return FramePreprocessor.of(image)
+
+def image(bright_box = None):
+    """Чёрный кадр SIZE, при bright_box = (left, top, right, bottom) - с белым прямоугольником."""
+    canvas = np.zeros((SIZE[1], SIZE[0], 3), np.uint8)
+    if bright_box is not None:
+        left, top, right, bottom = bright_box
+        canvas[top:bottom, left:right] = 255
+    return canvas
+
+class StubDetector:
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = 0
+
+    def detect(self, frames):
+        self.calls += 1
+        return list(self.boxes)
+
+def test_roi_mask_box_and_contains_scale_with_frame_size():
+    roi = RegionOfInterest(BOTTOM_HALF)
+
+    mask = roi.get_mask(SIZE)
+
+    assert mask.shape == (SIZE[1], SIZE[0])
+    assert not mask[:59].any()
+    assert mask[61:].all()
+    assert roi.get_box(SIZE) == (0, 60, 160, 120)
+    assert roi.get_box((320, 240)) == (0, 120, 320, 240)
+    assert roi.contains((10, 80, 30, 100), SIZE)
+    assert not roi.contains((10, 10, 30, 30), SIZE)
+
+def test_roi_results_are_cached_per_size():
+    roi = RegionOfInterest(BOTTOM_HALF)
+
+    assert roi.get_mask(SIZE) is roi.get_mask(SIZE)
+    assert roi.get_box(SIZE) is roi.get_box(SIZE)
+
+def test_gate_ignores_motion_outside_roi():
+    gate = MotionGate(size=SIZE, hold_frames=0, roi=RegionOfInterest(BOTTOM_HALF))
+
+    # Первый кадр всегда открывает ворота
+    assert gate.update(frames(image()))
+    # Движение в верхней половине - вне области
+    assert not gate.update(frames(image((20, 10, 60, 40))))
+    # Движение в нижней половине
+    assert gate.update(frames(image((20, 80, 60, 110))))
+
+def test_gate_holds_open_after_motion():
+    gate = MotionGate(size=SIZE, hold_frames=2)
+    still = image()
+
+    assert gate.update(frames(still))
+    assert gate.update(frames(image((20, 10, 60, 40))))
+    moved = image((20, 10, 60, 40))
+    assert gate.update(frames(moved))
+    assert gate.update(frames(moved))
+    assert not gate.update(frames(moved))
+    assert gate.open_frames == 4
+
+def test_scheduler_keeps_still_faces_while_gate_is_closed():
+    box = (40, 30, 80, 70)
+    detector = StubDetector([box])
+    scheduler = DetectionScheduler(
+        detector, detect_every=5, report_interval=0,
+        motion_gate=MotionGate(size=SIZE, hold_frames=0)
+    )
+    still = image(box)
+
+    assert scheduler.detect_faces(frames(still)) == [box]
+    for _ in range(3):
+        # Сцена не меняется: детекция не запускается, лицо остаётся на месте
+        assert scheduler.detect_faces(frames(still)) == [box]
+
+    assert detector.calls == 1
+    assert scheduler.get_stats()["gated"] == 3
+
+    # После паузы - полная детекция, а не перенос боксов со старого кадра
+    scheduler.detect_faces(frames(image((90, 60, 130, 100))))
+    assert detector.calls == 2
@@ -0,0 +1,78 @@
+import threading
+from core.result_broker import ResultBroker, ResultEvent
+
+def event(camera_index, sequence, timestamp = None):
+    return ResultEvent(camera_index, sequence, timestamp if timestamp is not None else float(sequence), None, [])
+
+def test_unread_event_is_replaced_by_newest():
+    broker = ResultBroker()
+    subscription = broker.subscribe()
+    for sequence in range(1, 4):
+        broker.publish(event(0, sequence))
+
+    received, skipped = subscription.get(timeout=0)
+
+    assert received.sequence == 3 and skipped == 2
+    assert subscription.get(timeout=0) == (None, 0)
+    assert broker.get_stats() == {"subscribers": 1, "sent": 1, "skipped": 2}
+
+def test_cameras_are_delivered_oldest_first():
+    subscription = ResultBroker().subscribe()
+    subscription.offer(event(1, 1, timestamp=2.0))
+    subscription.offer(event(0, 1, timestamp=1.0))
+
+    assert subscription.get(timeout=0)[0].camera_index == 0
+    assert subscription.get(timeout=0)[0].camera_index == 1
+
+def test_camera_filter():
+    broker = ResultBroker()
+    subscription = broker.subscribe(cameras=[1])
+    broker.publish(event(0, 1))
+    broker.publish(event(1, 1))
+
+    assert subscription.get(timeout=0)[0].camera_index == 1
+    assert subscription.poll() == (None, 0, None)
+
+def test_max_fps_delays_next_event():
+    subscription = ResultBroker().subscribe(max_fps=1)
+    subscription.offer(event(0, 1))
+    assert subscription.poll()[0].sequence == 1
+
+    subscription.offer(event(0, 2))
+    received, _, wait = subscription.poll()
+
+    assert received is None and 0 < wait <= 1.0
+
+def test_subscriber_limit_and_counters_of_closed_subscriptions():
+    broker = ResultBroker(max_subscribers=1)
+    subscription = broker.subscribe()
+    assert broker.subscribe() is None
+
+    broker.publish(event(0, 1))
+    broker.publish(event(0, 2))
+    broker.unsubscribe(subscription)
+
+    assert broker.get_stats() == {"subscribers": 0, "sent": 0, "skipped": 1}
+    assert broker.subscribe() is not None
+
+def test_close_wakes_waiting_subscriber():
+    broker = ResultBroker()
+    subscription = broker.subscribe()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(subscription.get(timeout=5)))
+    waiter.start()
+
+    broker.close()
+    waiter.join(timeout=5)
+
+    assert results == [(None, 0)]
+    assert broker.subscribe() is None
+
+def test_notify_is_called_on_publish():
+    calls = []
+    broker = ResultBroker()
+    broker.subscribe(notify=lambda: calls.append(1))
+
+    broker.publish(event(0, 1))
+
+    assert calls == [1]
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from core.shared_frames import FrameRing
+
+SHAPE = (4, 6, 3)
+
+@pytest.fixture
+def ring():
+    ring = FrameRing(SHAPE, capacity=3)
+    yield ring
+    ring.close()
+
+def frame(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+def test_read_new_returns_unread_frames_in_order(ring):
+    for value in (1, 2):
+        ring.put(frame(value))
+
+    records = ring.read_new()
+
+    assert [record.sequence for record in records] == [1, 2]
+    assert [int(record.frame[0, 0, 0]) for record in records] == [1, 2]
+    assert ring.is_empty()
+    assert ring.read_new() == []
+
+def test_overwrite_keeps_newest_and_counts_lost_frames(ring):
+    for value in range(1, 6):
+        ring.put(frame(value))
+
+    records = ring.read_new()
+
+    assert [record.sequence for record in records] == [3, 4, 5]
+    assert ring.get_stats() == {"capacity": 3, "written": 5, "overwritten": 2, "dropped": 0}
+
+def test_read_frames_are_not_counted_as_overwritten(ring):
+    for value in range(1, 4):
+        ring.put(frame(value))
+    ring.read_new()
+    for value in range(4, 7):
+        ring.put(frame(value))
+
+    assert ring.get_stats()["overwritten"] == 0
+
+def test_get_latest_does_not_move_read_position(ring):
+    assert ring.get_latest() is None
+    ring.put(frame(7), timestamp=12.5)
+
+    out = np.empty(SHAPE, dtype=np.uint8)
+    record = ring.get_latest(out)
+
+    assert record.frame is out and int(out[0, 0, 0]) == 7
+    assert record.timestamp == pytest.approx(12.5)
+    assert not ring.is_empty()
+
+def test_slot_being_written_is_dropped_and_latest_gives_up(ring):
+    ring.put(frame(1))
+    # Слот в середине записи: seqlock помечает его номером -1
+    ring._sequences[1] = -1
+
+    assert ring.get_latest() is None
+    assert ring.read_new() == []
+
+def test_reader_detects_overwrite_during_copy(ring, monkeypatch):
+    ring.put(frame(1))
+    original_copyto = np.copyto
+
+    def overwrite_while_copying(dst, src):
+        original_copyto(dst, src)
+        ring._sequences[1] = 4
+
+    monkeypatch.setattr(np, "copyto", overwrite_while_copying)
+    assert ring._read(1, np.empty(SHAPE, dtype=np.uint8)) is None
+    assert ring.get_stats()["dropped"] == 1
+
+def test_attached_ring_sees_writer_frames(ring):
+    reader = FrameRing.attach(ring.descriptor)
+    try:
+        ring.put(frame(9))
+
+        assert int(reader.get_latest().frame[0, 0, 0]) == 9
+    finally:
+        reader.close()
+
+def test_frames_are_fitted_to_slot(ring):
+    ring.put(np.full(SHAPE[:2], 5, dtype=np.uint8))
+
+    assert ring.get_latest().frame.shape == SHAPE
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16\x66\x61\x63\x65_recognition.proto\x12\x10\x66\x61\x63\x65_recognition\".\n\x0cImageRequest\x12\x0e\n\x06images\x18\x01 \x03(\x0c\x12\x0e\n\x06labels\x18\x02 \x03(\t\"1\n\rImageResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x0f\n\rResultRequest\"4\n\x0c\x43\x61meraFrames\x12\x14\n\x0c\x63\x61mera_index\x18\x01 \x01(\x05\x12\x0e\n\x06\x66rames\x18\x02 \x03(\x0c\"b\n\x0eResultResponse\x12\x35\n\rcamera_frames\x18\x01 \x03(\x0b\x32\x1e.face_recognition.CameraFrames\x12\x19\n\x11recognized_labels\x18\x02 \x03(\t2\xb1\x01\n\x0f\x46\x61\x63\x65Recognition\x12M\n\nSendImages\x12\x1e.face_recognition.ImageRequest\x1a\x1f.face_recognition.ImageResponse\x12O\n\nGetResults\x12\x1f.face_recognition.ResultRequest\x1a .face_recognition.ResultResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16\x66\x61\x63\x65_recognition.proto\x12\x10\x66\x61\x63\x65_recognition\".\n\x0cImageRequest\x12\x0e\n\x06images\x18\x01 \x03(\x0c\x12\x0e\n\x06labels\x18\x02 \x03(\t\";\n\x0cImageFailure\x12\r\n\x05index\x18\x01 \x01(\x05\x12\r\n\x05label\x18\x02 \x01(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"c\n\rImageResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x30\n\x08\x66\x61ilures\x18\x03 \x03(\x0b\x32\x1e.face_recognition.ImageFailure\"@\n\rEnrollRequest\x12\x0e\n\x06images\x18\x01 \x03(\x0c\x12\x0e\n\x06labels\x18\x02 \x03(\t\x12\x0f\n\x07replace\x18\x03 \x01(\x08\"\xaa\x01\n\x0e\x45nrollProgress\x12\x11\n\tprocessed\x18\x01 \x01(\x05\x12\r\n\x05total\x18\x02 \x01(\x05\x12\x11\n\tsucceeded\x18\x03 \x01(\x05\x12\x30\n\x08\x66\x61ilures\x18\x04 \x03(\x0b\x32\x1e.face_recognition.ImageFailure\x12\x0c\n\x04\x64one\x18\x05 \x01(\x08\x12\x0f\n\x07message\x18\x06 \x01(\t\x12\x12\n\ncache_hits\x18\x07 \x01(\x05\"\x1f\n\rDeleteRequest\x12\x0e\n\x06labels\x18\x01 \x03(\t\"J\n\rResultRequest\x12\x17\n\x0f\x64\x65tections_only\x18\x01 \x01(\x08\x12\x0f\n\x07preview\x18\x02 \x01(\x08\x12\x0f\n\x07quality\x18\x03 \x01(\x05\"4\n\x0c\x43\x61meraFrames\x12\x14\n\x0c\x63\x61mera_index\x18\x01 \x01(\x05\x12\x0e\n\x06\x66rames\x18\x02 \x03(\x0c\"\x93\x01\n\x0eResultResponse\x12\x35\n\rcamera_frames\x18\x01 \x03(\x0b\x32\x1e.face_recognition.CameraFrames\x12\x19\n\x11recognized_labels\x18\x02 \x03(\t\x12/\n\ndetections\x18\x03 \x03(\x0b\x32\x1b.face_recognition.Detection\"G\n\x0b\x42oundingBox\x12\x0c\n\x04left\x18\x01 \x01(\x05\x12\x0b\n\x03top\x18\x02 \x01(\x05\x12\r\n\x05right\x18\x03 \x01(\x05\x12\x0e\n\x06\x62ottom\x18\x04 \x01(\x05\"\xac\x01\n\tDetection\x12\x14\n\x0c\x63\x61mera_index\x18\x01 \x01(\x05\x12\x16\n\x0e\x66rame_sequence\x18\x02 \x01(\x03\x12\x11\n\ttimestamp\x18\x03 \x01(\x01\x12+\n\x04\x62\x62ox\x18\x04 \x01(\x0b\x32\x1d.face_recognition.BoundingBox\x12\r\n\x05label\x18\x05 \x01(\t\x12\x10\n\x08\x64istance\x18\x06 \x01(\x02\x12\x10\n\x08track_id\x18\x07 \x01(\x03\"B\n\x0fIdentifyRequest\x12\r\n\x05image\x18\x01 \x01(\x0c\x12\r\n\x05top_k\x18\x02 \x01(\x05\x12\x11\n\tthreshold\x18\x03 \x01(\x02\"H\n\x14IdentifyBatchRequest\x12\x0e\n\x06images\x18\x01 \x03(\x0c\x12\r\n\x05top_k\x18\x02 \x01(\x05\x12\x11\n\tthreshold\x18\x03 \x01(\x02\"(\n\x05Match\x12\r\n\x05label\x18\x01 \x01(\t\x12\x10\n\x08\x64istance\x18\x02 \x01(\x02\"g\n\x0eIdentifiedFace\x12+\n\x04\x62\x62ox\x18\x01 \x01(\x0b\x32\x1d.face_recognition.BoundingBox\x12(\n\x07matches\x18\x02 \x03(\x0b\x32\x17.face_recognition.Match\"a\n\x10IdentifyResponse\x12\r\n\x05index\x18\x01 \x01(\x05\x12/\n\x05\x66\x61\x63\x65s\x18\x02 \x03(\x0b\x32 .face_recognition.IdentifiedFace\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"L\n\x15IdentifyBatchResponse\x12\x33\n\x07results\x18\x01 \x03(\x0b\x32\".face_recognition.IdentifyResponse\"\x88\x01\n\rStreamRequest\x12\x16\n\x0e\x63\x61mera_indices\x18\x01 \x03(\x05\x12\x0f\n\x07max_fps\x18\x02 \x01(\x02\x12\x0f\n\x07quality\x18\x03 \x01(\x05\x12\x17\n\x0f\x64\x65tections_only\x18\x04 \x01(\x08\x12\x13\n\x0b\x66rame_every\x18\x05 \x01(\x05\x12\x0f\n\x07preview\x18\x06 \x01(\x08\"\xc2\x01\n\x0c\x43\x61meraResult\x12\x14\n\x0c\x63\x61mera_index\x18\x01 \x01(\x05\x12\x16\n\x0e\x66rame_sequence\x18\x02 \x01(\x03\x12\x11\n\ttimestamp\x18\x03 \x01(\x01\x12\r\n\x05\x66rame\x18\x04 \x01(\x0c\x12\x19\n\x11recognized_labels\x18\x05 \x03(\t\x12\x16\n\x0eskipped_frames\x18\x06 \x01(\x05\x12/\n\ndetections\x18\x07 \x03(\x0b\x32\x1b.face_recognition.Detection\"\'\n\x0cStatsRequest\x12\x17\n\x0fprometheus_text\x18\x01 \x01(\x08\"*\n\x0bMetricLabel\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"\xae\x01\n\x0cLatencyStats\x12\x0c\n\x04name\x18\x01 \x01(\t\x12-\n\x06labels\x18\x02 \x03(\x0b\x32\x1d.face_recognition.MetricLabel\x12\r\n\x05\x63ount\x18\x03 \x01(\x03\x12\x13\n\x0bsum_seconds\x18\x04 \x01(\x01\x12\x13\n\x0bp50_seconds\x18\x05 \x01(\x01\x12\x13\n\x0bp95_seconds\x18\x06 \x01(\x01\x12\x13\n\x0bp99_seconds\x18\x07 \x01(\x01\"Y\n\x0bMetricValue\x12\x0c\n\x04name\x18\x01 \x01(\t\x12-\n\x06labels\x18\x02 \x03(\x0b\x32\x1d.face_recognition.MetricLabel\x12\r\n\x05value\x18\x03 \x01(\x01\"\x9b\x01\n\rStatsResponse\x12\x0f\n\x07\x65nabled\x18\x01 \x01(\x08\x12\x31\n\tlatencies\x18\x02 \x03(\x0b\x32\x1e.face_recognition.LatencyStats\x12-\n\x06values\x18\x03 \x03(\x0b\x32\x1d.face_recognition.MetricValue\x12\x17\n\x0fprometheus_text\x18\x04 \x01(\t2\xb1\x07\n\x0f\x46\x61\x63\x65Recognition\x12M\n\nSendImages\x12\x1e.face_recognition.ImageRequest\x1a\x1f.face_recognition.ImageResponse\x12O\n\x0cUpsertImages\x12\x1e.face_recognition.ImageRequest\x1a\x1f.face_recognition.ImageResponse\x12P\n\x0c\x44\x65leteLabels\x12\x1f.face_recognition.DeleteRequest\x1a\x1f.face_recognition.ImageResponse\x12P\n\rReplaceImages\x12\x1e.face_recognition.ImageRequest\x1a\x1f.face_recognition.ImageResponse\x12S\n\x0c\x45nrollImages\x12\x1f.face_recognition.EnrollRequest\x1a .face_recognition.EnrollProgress0\x01\x12O\n\nGetResults\x12\x1f.face_recognition.ResultRequest\x1a .face_recognition.ResultResponse\x12R\n\rStreamResults\x12\x1f.face_recognition.StreamRequest\x1a\x1e.face_recognition.CameraResult0\x01\x12Q\n\x08Identify\x12!.face_recognition.IdentifyRequest\x1a\".face_recognition.IdentifyResponse\x12`\n\rIdentifyBatch\x12&.face_recognition.IdentifyBatchRequest\x1a\'.face_recognition.IdentifyBatchResponse\x12^\n\x0eIdentifyStream\x12!.face_recognition.IdentifyRequest\x1a\'.face_recognition.IdentifyBatchResponse(\x01\x12K\n\x08GetStats\x12\x1e.face_recognition.StatsRequest\x1a\x1f.face_recognition.StatsResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,14 +33,52 @@ if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_IMAGEREQUEST']._serialized_start=44
   _globals['_IMAGEREQUEST']._serialized_end=90
-  _globals['_IMAGERESPONSE']._serialized_start=92
-  _globals['_IMAGERESPONSE']._serialized_end=141
-  _globals['_RESULTREQUEST']._serialized_start=143
-  _globals['_RESULTREQUEST']._serialized_end=158
-  _globals['_CAMERAFRAMES']._serialized_start=160
-  _globals['_CAMERAFRAMES']._serialized_end=212
-  _globals['_RESULTRESPONSE']._serialized_start=214
-  _globals['_RESULTRESPONSE']._serialized_end=312
-  _globals['_FACERECOGNITION']._serialized_start=315
-  _globals['_FACERECOGNITION']._serialized_end=492
+  _globals['_IMAGEFAILURE']._serialized_start=92
+  _globals['_IMAGEFAILURE']._serialized_end=151
+  _globals['_IMAGERESPONSE']._serialized_start=153
+  _globals['_IMAGERESPONSE']._serialized_end=252
+  _globals['_ENROLLREQUEST']._serialized_start=254
+  _globals['_ENROLLREQUEST']._serialized_end=318
+  _globals['_ENROLLPROGRESS']._serialized_start=321
+  _globals['_ENROLLPROGRESS']._serialized_end=491
+  _globals['_DELETEREQUEST']._serialized_start=493
+  _globals['_DELETEREQUEST']._serialized_end=524
+  _globals['_RESULTREQUEST']._serialized_start=526
+  _globals['_RESULTREQUEST']._serialized_end=600
+  _globals['_CAMERAFRAMES']._serialized_start=602
+  _globals['_CAMERAFRAMES']._serialized_end=654
+  _globals['_RESULTRESPONSE']._serialized_start=657
+  _globals['_RESULTRESPONSE']._serialized_end=804
+  _globals['_BOUNDINGBOX']._serialized_start=806
+  _globals['_BOUNDINGBOX']._serialized_end=877
+  _globals['_DETECTION']._serialized_start=880
+  _globals['_DETECTION']._serialized_end=1052
+  _globals['_IDENTIFYREQUEST']._serialized_start=1054
+  _globals['_IDENTIFYREQUEST']._serialized_end=1120
+  _globals['_IDENTIFYBATCHREQUEST']._serialized_start=1122
+  _globals['_IDENTIFYBATCHREQUEST']._serialized_end=1194
+  _globals['_MATCH']._serialized_start=1196
+  _globals['_MATCH']._serialized_end=1236
+  _globals['_IDENTIFIEDFACE']._serialized_start=1238
+  _globals['_IDENTIFIEDFACE']._serialized_end=1341
+  _globals['_IDENTIFYRESPONSE']._serialized_start=1343
+  _globals['_IDENTIFYRESPONSE']._serialized_end=1440
+  _globals['_IDENTIFYBATCHRESPONSE']._serialized_start=1442
+  _globals['_IDENTIFYBATCHRESPONSE']._serialized_end=1518
+  _globals['_STREAMREQUEST']._serialized_start=1521
+  _globals['_STREAMREQUEST']._serialized_end=1657
+  _globals['_CAMERARESULT']._serialized_start=1660
+  _globals['_CAMERARESULT']._serialized_end=1854
+  _globals['_STATSREQUEST']._serialized_start=1856
+  _globals['_STATSREQUEST']._serialized_end=1895
+  _globals['_METRICLABEL']._serialized_start=1897
+  _globals['_METRICLABEL']._serialized_end=1939
+  _globals['_LATENCYSTATS']._serialized_start=1942
+  _globals['_LATENCYSTATS']._serialized_end=2116
+  _globals['_METRICVALUE']._serialized_start=2118
+  _globals['_METRICVALUE']._serialized_end=2207
+  _globals['_STATSRESPONSE']._serialized_start=2210
+  _globals['_STATSRESPONSE']._serialized_end=2365
+  _globals['_FACERECOGNITION']._serialized_start=2368
+  _globals['_FACERECOGNITION']._serialized_end=3313
 # @@protoc_insertion_point(module_scope)
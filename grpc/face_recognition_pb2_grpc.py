@@ -39,11 +39,56 @@ class FaceRecognitionStub(object):
                 request_serializer=face__recognition__pb2.ImageRequest.SerializeToString,
                 response_deserializer=face__recognition__pb2.ImageResponse.FromString,
                 _registered_method=True)
+        self.UpsertImages = channel.unary_unary(
+                '/face_recognition.FaceRecognition/UpsertImages',
+                request_serializer=face__recognition__pb2.ImageRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.ImageResponse.FromString,
+                _registered_method=True)
+        self.DeleteLabels = channel.unary_unary(
+                '/face_recognition.FaceRecognition/DeleteLabels',
+                request_serializer=face__recognition__pb2.DeleteRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.ImageResponse.FromString,
+                _registered_method=True)
+        self.ReplaceImages = channel.unary_unary(
+                '/face_recognition.FaceRecognition/ReplaceImages',
+                request_serializer=face__recognition__pb2.ImageRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.ImageResponse.FromString,
+                _registered_method=True)
+        self.EnrollImages = channel.unary_stream(
+                '/face_recognition.FaceRecognition/EnrollImages',
+                request_serializer=face__recognition__pb2.EnrollRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.EnrollProgress.FromString,
+                _registered_method=True)
         self.GetResults = channel.unary_unary(
                 '/face_recognition.FaceRecognition/GetResults',
                 request_serializer=face__recognition__pb2.ResultRequest.SerializeToString,
                 response_deserializer=face__recognition__pb2.ResultResponse.FromString,
                 _registered_method=True)
+        self.StreamResults = channel.unary_stream(
+                '/face_recognition.FaceRecognition/StreamResults',
+                request_serializer=face__recognition__pb2.StreamRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.CameraResult.FromString,
+                _registered_method=True)
+        self.Identify = channel.unary_unary(
+                '/face_recognition.FaceRecognition/Identify',
+                request_serializer=face__recognition__pb2.IdentifyRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.IdentifyResponse.FromString,
+                _registered_method=True)
+        self.IdentifyBatch = channel.unary_unary(
+                '/face_recognition.FaceRecognition/IdentifyBatch',
+                request_serializer=face__recognition__pb2.IdentifyBatchRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.IdentifyBatchResponse.FromString,
+                _registered_method=True)
+        self.IdentifyStream = channel.stream_unary(
+                '/face_recognition.FaceRecognition/IdentifyStream',
+                request_serializer=face__recognition__pb2.IdentifyRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.IdentifyBatchResponse.FromString,
+                _registered_method=True)
+        self.GetStats = channel.unary_unary(
+                '/face_recognition.FaceRecognition/GetStats',
+                request_serializer=face__recognition__pb2.StatsRequest.SerializeToString,
+                response_deserializer=face__recognition__pb2.StatsResponse.FromString,
+                _registered_method=True)
 
 
 class FaceRecognitionServicer(object):
@@ -55,12 +100,66 @@ class FaceRecognitionServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def UpsertImages(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DeleteLabels(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReplaceImages(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def EnrollImages(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def GetResults(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamResults(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Identify(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def IdentifyBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def IdentifyStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_FaceRecognitionServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -69,11 +168,56 @@ def add_FaceRecognitionServicer_to_server(servicer, server):
                     request_deserializer=face__recognition__pb2.ImageRequest.FromString,
                     response_serializer=face__recognition__pb2.ImageResponse.SerializeToString,
             ),
+            'UpsertImages': grpc.unary_unary_rpc_method_handler(
+                    servicer.UpsertImages,
+                    request_deserializer=face__recognition__pb2.ImageRequest.FromString,
+                    response_serializer=face__recognition__pb2.ImageResponse.SerializeToString,
+            ),
+            'DeleteLabels': grpc.unary_unary_rpc_method_handler(
+                    servicer.DeleteLabels,
+                    request_deserializer=face__recognition__pb2.DeleteRequest.FromString,
+                    response_serializer=face__recognition__pb2.ImageResponse.SerializeToString,
+            ),
+            'ReplaceImages': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReplaceImages,
+                    request_deserializer=face__recognition__pb2.ImageRequest.FromString,
+                    response_serializer=face__recognition__pb2.ImageResponse.SerializeToString,
+            ),
+            'EnrollImages': grpc.unary_stream_rpc_method_handler(
+                    servicer.EnrollImages,
+                    request_deserializer=face__recognition__pb2.EnrollRequest.FromString,
+                    response_serializer=face__recognition__pb2.EnrollProgress.SerializeToString,
+            ),
             'GetResults': grpc.unary_unary_rpc_method_handler(
                     servicer.GetResults,
                     request_deserializer=face__recognition__pb2.ResultRequest.FromString,
                     response_serializer=face__recognition__pb2.ResultResponse.SerializeToString,
             ),
+            'StreamResults': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamResults,
+                    request_deserializer=face__recognition__pb2.StreamRequest.FromString,
+                    response_serializer=face__recognition__pb2.CameraResult.SerializeToString,
+            ),
+            'Identify': grpc.unary_unary_rpc_method_handler(
+                    servicer.Identify,
+                    request_deserializer=face__recognition__pb2.IdentifyRequest.FromString,
+                    response_serializer=face__recognition__pb2.IdentifyResponse.SerializeToString,
+            ),
+            'IdentifyBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.IdentifyBatch,
+                    request_deserializer=face__recognition__pb2.IdentifyBatchRequest.FromString,
+                    response_serializer=face__recognition__pb2.IdentifyBatchResponse.SerializeToString,
+            ),
+            'IdentifyStream': grpc.stream_unary_rpc_method_handler(
+                    servicer.IdentifyStream,
+                    request_deserializer=face__recognition__pb2.IdentifyRequest.FromString,
+                    response_serializer=face__recognition__pb2.IdentifyBatchResponse.SerializeToString,
+            ),
+            'GetStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetStats,
+                    request_deserializer=face__recognition__pb2.StatsRequest.FromString,
+                    response_serializer=face__recognition__pb2.StatsResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'face_recognition.FaceRecognition', rpc_method_handlers)
@@ -112,6 +256,114 @@ class FaceRecognition(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def UpsertImages(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/UpsertImages',
+            face__recognition__pb2.ImageRequest.SerializeToString,
+            face__recognition__pb2.ImageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DeleteLabels(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/DeleteLabels',
+            face__recognition__pb2.DeleteRequest.SerializeToString,
+            face__recognition__pb2.ImageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReplaceImages(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/ReplaceImages',
+            face__recognition__pb2.ImageRequest.SerializeToString,
+            face__recognition__pb2.ImageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def EnrollImages(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/EnrollImages',
+            face__recognition__pb2.EnrollRequest.SerializeToString,
+            face__recognition__pb2.EnrollProgress.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def GetResults(request,
             target,
@@ -138,3 +390,138 @@ class FaceRecognition(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamResults(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/StreamResults',
+            face__recognition__pb2.StreamRequest.SerializeToString,
+            face__recognition__pb2.CameraResult.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Identify(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/Identify',
+            face__recognition__pb2.IdentifyRequest.SerializeToString,
+            face__recognition__pb2.IdentifyResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def IdentifyBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/IdentifyBatch',
+            face__recognition__pb2.IdentifyBatchRequest.SerializeToString,
+            face__recognition__pb2.IdentifyBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def IdentifyStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/face_recognition.FaceRecognition/IdentifyStream',
+            face__recognition__pb2.IdentifyRequest.SerializeToString,
+            face__recognition__pb2.IdentifyBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/face_recognition.FaceRecognition/GetStats',
+            face__recognition__pb2.StatsRequest.SerializeToString,
+            face__recognition__pb2.StatsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
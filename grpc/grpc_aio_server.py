@@ -0,0 +1,208 @@
+import grpc
+import queue
+import asyncio
+import signal
+from concurrent import futures
+import face_recognition_pb2
+import face_recognition_pb2_grpc
+
+from grpc_server import FaceRecognitionServicer
+from config import Config
+
+def _call_soon_threadsafe(loop, callback, *args):
+    """
+    Передаёт вызов в цикл событий из потока камеры или пула.
+    После остановки сервера цикл уже закрыт - такое уведомление просто теряется,
+    а не роняет публикующий поток (цикл захвата камеры).
+    """
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        pass
+
+class AsyncFaceRecognitionServicer(FaceRecognitionServicer):
+    """
+    Сервисер для grpc.aio. Блокирующие вызовы ИИ (кодирование галереи, сбор кадров)
+    выполняются в ограниченном пуле потоков, а потоки результатов ждут событий через
+    уведомления брокера - цикл событий не блокируется, и один процесс держит сотни
+    подписчиков без потока на каждого.
+    """
+
+    def __init__(self):
+        super().__init__()
+        cfg = Config().GRPC
+        self.request_timeout = cfg["request_timeout"]
+        self.executor = futures.ThreadPoolExecutor(max_workers=cfg["max_blocking_calls"], thread_name_prefix="grpc-blocking")
+
+    async def _call(self, method, request, context, mutating = False):
+        """
+        Выполняет блокирующий обработчик в пуле потоков с дедлайном:
+        меньшим из дедлайна клиента и Config.GRPC["request_timeout"].
+        Прерывается только ожидание - начатая операция в потоке завершится сама.
+        :param mutating: Обработчик изменяет галерею. Такой вызов не прерывается серверным
+                         таймаутом: клиент получил бы ошибку, а изменение всё равно применилось бы.
+                         Действует только дедлайн, заданный самим клиентом.
+        """
+        timeout = None if mutating else self.request_timeout
+        remaining = context.time_remaining()
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self.executor, method, request, context), timeout)
+        except asyncio.TimeoutError:
+            await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, f"Request did not finish in {timeout:.1f} s")
+
+    async def SendImages(self, request, context):
+        print("[INFO] Received images and labels from C# gRPC server.")
+        return await self.ReplaceImages(request, context)
+
+    async def ReplaceImages(self, request, context):
+        return await self._call(super().ReplaceImages, request, context, mutating=True)
+
+    async def UpsertImages(self, request, context):
+        return await self._call(super().UpsertImages, request, context, mutating=True)
+
+    async def DeleteLabels(self, request, context):
+        return await self._call(super().DeleteLabels, request, context, mutating=True)
+
+    async def GetResults(self, request, context):
+        return await self._call(super().GetResults, request, context)
+
+    async def Identify(self, request, context):
+        return await self._call(super().Identify, request, context)
+
+    async def IdentifyBatch(self, request, context):
+        return await self._call(super().IdentifyBatch, request, context)
+
+    async def GetStats(self, request, context):
+        # Только чтение счётчиков в памяти - без пула потоков
+        return super().GetStats(request, context)
+
+    async def IdentifyStream(self, request_iterator, context):
+        # Изображения передаются в пул потоков через очередь, пока клиент ещё шлёт следующие
+        loop = asyncio.get_running_loop()
+        images = queue.Queue()
+
+        def iter_images():
+            while True:
+                image = images.get()
+                if image is None:
+                    return
+                yield image
+
+        task = None
+        try:
+            async for request in request_iterator:
+                if task is None:
+                    task = loop.run_in_executor(
+                        self.executor, self.face_recognition_ai.identify_images, iter_images(), request.top_k, request.threshold
+                    )
+                images.put(request.image)
+        finally:
+            images.put(None)
+
+        if task is None:
+            return face_recognition_pb2.IdentifyBatchResponse()
+        results = await task
+        print(f"[INFO] Identified {len(results)} streamed images.")
+        return self._to_identify_batch_response(results)
+
+    async def EnrollImages(self, request, context):
+        print(f"[INFO] Received {len(request.images)} images and {len(request.labels)} labels to enroll.")
+
+        loop = asyncio.get_running_loop()
+        progress = asyncio.Queue()
+
+        def put(item):
+            _call_soon_threadsafe(loop, progress.put_nowait, item)
+
+        loop.run_in_executor(self.executor, self._run_enrollment, request, put)
+
+        while True:
+            item = await progress.get()
+            if isinstance(item, Exception):
+                await context.abort(grpc.StatusCode.INTERNAL, f"Enrollment failed: {item}")
+            yield item
+            if item.done:
+                print(f"[INFO] Enrollment finished: {item.message}.")
+                return
+
+    async def StreamResults(self, request, context):
+        loop = asyncio.get_running_loop()
+        notified = asyncio.Event()
+
+        def notify():
+            _call_soon_threadsafe(loop, notified.set)
+
+        subscription = self.face_recognition_ai.subscribe_results(list(request.camera_indices), request.max_fps, notify)
+        if subscription is None:
+            await context.abort(*self._subscription_error())
+
+        print(f"[INFO] Result stream opened for cameras {list(request.camera_indices) or 'all'}.")
+        messages = {}   # camera_index -> отправлено сообщений
+
+        try:
+            while True:
+                notified.clear()
+                event, skipped, wait = subscription.poll()
+                if event is None:
+                    if subscription.closed:
+                        break
+                    try:
+                        await asyncio.wait_for(notified.wait(), wait if wait is not None else 1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # Кадр кодируется один раз для всех подписчиков и GetResults
+                encoding = self._encode_stream_frame(request, event, messages)
+                frame = b""
+                if encoding is not None:
+                    try:
+                        frame = await asyncio.wrap_future(encoding)
+                    except ValueError as e:
+                        print(f"[WARNING] Camera {event.camera_index}: {e}")
+                yield self._to_camera_result(event, skipped, frame)
+        finally:
+            self.face_recognition_ai.unsubscribe_results(subscription)
+            print(f"[INFO] Result stream closed: {subscription.sent} frames sent, {subscription.skipped} skipped.")
+
+async def serve():
+    cfg = Config().GRPC
+    server = grpc.aio.server(maximum_concurrent_rpcs=cfg["max_concurrent_rpcs"])
+    servicer = AsyncFaceRecognitionServicer()
+    face_recognition_pb2_grpc.add_FaceRecognitionServicer_to_server(servicer, server)
+    server.add_insecure_port(f"[::]:{cfg['port']}")
+    await server.start()
+    print(f"[INFO] Python gRPC aio server started on port {cfg['port']}.")
+
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C отменяет эту задачу, остановка выполняется в finally
+            pass
+
+    try:
+        await stop_event.wait()
+    finally:
+        print(f"[INFO] Shutting down, draining active RPCs for up to {cfg['drain_timeout']} s...")
+        # Новые подписки отклоняются, открытые потоки результатов завершаются сами
+        servicer.face_recognition_ai.result_broker.close()
+        try:
+            await server.stop(cfg["drain_timeout"])
+        finally:
+            # Потоки камер не daemon: без servicer.stop() процесс не завершится
+            servicer.stop()
+            servicer.executor.shutdown(wait=False)
+            print("[INFO] Server stopped.")
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
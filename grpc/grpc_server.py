@@ -4,20 +4,43 @@ import face_recognition_pb2
 import face_recognition_pb2_grpc
 import sys
 import os
-import cv2
 import time
+import queue
+import functools
+import itertools
 import threading
 
 # Получаем абсолютный путь к папке ai
 ai_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '../ai'))
 sys.path.append(ai_path)
 
+from config import Config
 from face_recognition_ai import FaceRecognitionAI
 
+def _timed_rpc(method):
+    """Пишет в метрики время и ошибки RPC с одним ответом; при выключенных метриках - только проверка флага."""
+    labels = (("method", method.__name__),)
+
+    @functools.wraps(method)
+    def wrapper(self, request, context):
+        metrics = self.metrics
+        if not metrics.enabled:
+            return method(self, request, context)
+        start = time.perf_counter()
+        try:
+            return method(self, request, context)
+        except Exception:
+            metrics.inc("rpc_errors_total", labels=labels)
+            raise
+        finally:
+            metrics.observe("rpc_seconds", time.perf_counter() - start, labels)
+    return wrapper
+
 class FaceRecognitionServicer(face_recognition_pb2_grpc.FaceRecognitionServicer):
     def __init__(self):
         # Инициализация ИИ
         self.face_recognition_ai = FaceRecognitionAI()
+        self.metrics = self.face_recognition_ai.metrics
 
         # Запускаем обработку изображений с камеры в отдельном потоке
         self.camera_thread = threading.Thread(target = self.face_recognition_ai.start_camera_processing)
@@ -25,32 +48,149 @@ class FaceRecognitionServicer(face_recognition_pb2_grpc.FaceRecognitionServicer)
 
     def SendImages(self, request, context):
         print("[INFO] Received images and labels from C# gRPC server.")
-        print(f"[INFO] Received {len(request.images)} images and {len(request.labels)} labels.")
+        return self.ReplaceImages(request, context)
+
+    def _to_failures(self, results):
+        return [
+            face_recognition_pb2.ImageFailure(index=r.index, label=r.label, error=r.error)
+            for r in results if not r.success
+        ]
+
+    @_timed_rpc
+    def ReplaceImages(self, request, context):
+        print(f"[INFO] Received {len(request.images)} images and {len(request.labels)} labels to replace the gallery.")
+
+        # Собираем новую галерею и публикуем её целиком
+        report = self.face_recognition_ai.add_images(request.images, request.labels)
+
+        print(f"[INFO] Gallery replaced: {report.added} faces, {len(report.failures)} images failed, {report.cache_hits} cache hits.")
+        return face_recognition_pb2.ImageResponse(
+            success=True,
+            message=f"Gallery replaced: {report.added} faces",
+            failures=self._to_failures(report.failures)
+        )
+
+    @_timed_rpc
+    def UpsertImages(self, request, context):
+        print(f"[INFO] Received {len(request.images)} images and {len(request.labels)} labels to upsert.")
+
+        report = self.face_recognition_ai.upsert_images(request.images, request.labels)
+
+        print(f"[INFO] Upsert finished: {report.added} added, {report.updated} updated, {len(report.failures)} images failed, {report.cache_hits} cache hits.")
+        return face_recognition_pb2.ImageResponse(
+            success=True,
+            message=f"{report.added} faces added, {report.updated} faces updated",
+            failures=self._to_failures(report.failures)
+        )
 
-        # Добавляем изображения и лейблы в базу данных
-        self.face_recognition_ai.add_images(request.images, request.labels)
+    def EnrollImages(self, request, context):
+        print(f"[INFO] Received {len(request.images)} images and {len(request.labels)} labels to enroll.")
 
-        print("[INFO] Images and labels processed successfully.")
-        return face_recognition_pb2.ImageResponse(success=True, message="Images and labels added to database")
+        # Кодирование идёт в отдельном потоке, прогресс по пачкам передаётся через очередь
+        progress = queue.Queue()
+        threading.Thread(target=self._run_enrollment, args=(request, progress.put), daemon=True).start()
 
+        while True:
+            item = progress.get()
+            if isinstance(item, Exception):
+                context.abort(grpc.StatusCode.INTERNAL, f"Enrollment failed: {item}")
+            yield item
+            if item.done:
+                print(f"[INFO] Enrollment finished: {item.message}.")
+                return
+
+    def _run_enrollment(self, request, put):
+        """
+        Выполняет добавление лиц, передавая в put() сообщения EnrollProgress по пачкам,
+        итоговое сообщение с done=True или исключение.
+        """
+        def on_progress(report, results):
+            put(face_recognition_pb2.EnrollProgress(
+                processed=report.processed,
+                total=report.total,
+                succeeded=report.succeeded,
+                failures=self._to_failures(results),
+                cache_hits=report.cache_hits
+            ))
+
+        try:
+            report = self.face_recognition_ai.enroll_images(
+                request.images, request.labels, replace=request.replace, progress_callback=on_progress
+            )
+            put(face_recognition_pb2.EnrollProgress(
+                processed=report.processed,
+                total=report.total,
+                succeeded=report.succeeded,
+                done=True,
+                cache_hits=report.cache_hits,
+                message=f"{report.added} faces added, {report.updated} faces updated"
+            ))
+        except Exception as e:
+            put(e)
+
+    @_timed_rpc
+    def DeleteLabels(self, request, context):
+        print(f"[INFO] Received {len(request.labels)} labels to delete.")
+
+        removed = self.face_recognition_ai.delete_labels(request.labels)
+
+        print(f"[INFO] Deleted {removed} faces.")
+        return face_recognition_pb2.ImageResponse(success=True, message=f"{removed} faces removed")
+
+    def _to_detections(self, event):
+        detections = []
+        for detection in event.detections:
+            left, top, right, bottom = detection.box
+            detections.append(face_recognition_pb2.Detection(
+                camera_index=event.camera_index,
+                frame_sequence=event.sequence,
+                timestamp=event.timestamp,
+                bbox=face_recognition_pb2.BoundingBox(left=left, top=top, right=right, bottom=bottom),
+                label=detection.label or "",
+                distance=detection.distance if detection.distance is not None else -1.0,
+                track_id=detection.track_id or 0
+            ))
+        return detections
+
+    @_timed_rpc
     def GetResults(self, request, context):
         print("[INFO] Received request to get results.")
 
+        # Лица на последнем обработанном кадре каждой камеры
+        latest_results = self.face_recognition_ai.get_latest_results()
+        detections = []
+        recognized_labels = []
+        for camera_index in sorted(latest_results):
+            event = latest_results[camera_index]
+            detections.extend(self._to_detections(event))
+            recognized_labels.extend(event.labels)
+
         # Получаем текущие кадры с камер
-        frames = self.face_recognition_ai.get_current_frames()
+        frames = self.face_recognition_ai.get_current_frame_records() if not request.detections_only else {}
+
+        # Кадры кодируются параллельно в пуле кодировщика; уже закодированные для
+        # других клиентов берутся из кэша
+        pending_frames = {
+            camera_index: [
+                self.face_recognition_ai.encode_frame(
+                    camera_index, (record.ring_id, record.sequence), record.frame, request.preview, request.quality
+                )
+                for record in records
+            ]
+            for camera_index, records in frames.items()
+        }
 
         # Преобразуем кадры в формат для gRPC с группировкой по камерам
         processed_camera_frames = []
         total_frames = 0
 
-        for camera_index, all_frames in frames.items():
+        for camera_index, encodings in pending_frames.items():
             encoded_frames = []
-            for frame in all_frames:
-                if frame is not None:
-                    # Кодируем кадр в JPEG
-                    success, buffer = cv2.imencode(".jpg", frame)
-                    if success:
-                        encoded_frames.append(buffer.tobytes())
+            for encoding in encodings:
+                try:
+                    encoded_frames.append(encoding.result())
+                except ValueError as e:
+                    print(f"[WARNING] Camera {camera_index}: {e}")
 
             # Добавляем данные камеры в результат
             processed_camera_frames.append(
@@ -80,7 +220,131 @@ class FaceRecognitionServicer(face_recognition_pb2_grpc.FaceRecognitionServicer)
         print(f"[INFO] Returning {total_frames} frames from {len(processed_camera_frames)} cameras.")
         return face_recognition_pb2.ResultResponse(
             camera_frames=processed_camera_frames,
-            recognized_labels=[]  # Заглушка, можно реализовать логику
+            recognized_labels=list(dict.fromkeys(recognized_labels)),
+            detections=detections
+        )
+
+    def StreamResults(self, request, context):
+        subscription = self.face_recognition_ai.subscribe_results(list(request.camera_indices), request.max_fps)
+        if subscription is None:
+            context.abort(*self._subscription_error())
+
+        print(f"[INFO] Result stream opened for cameras {list(request.camera_indices) or 'all'}.")
+        context.add_callback(lambda: self.face_recognition_ai.unsubscribe_results(subscription))
+        messages = {}   # camera_index -> отправлено сообщений
+
+        try:
+            while context.is_active() and not subscription.closed:
+                event, skipped = subscription.get(timeout=1.0)
+                if event is None:
+                    continue
+
+                # Кадр кодируется один раз для всех подписчиков и GetResults
+                encoding = self._encode_stream_frame(request, event, messages)
+                frame = self._encoded_bytes(event.camera_index, encoding) if encoding is not None else b""
+                yield self._to_camera_result(event, skipped, frame)
+        finally:
+            self.face_recognition_ai.unsubscribe_results(subscription)
+            print(f"[INFO] Result stream closed: {subscription.sent} frames sent, {subscription.skipped} skipped.")
+
+    def _to_identify_response(self, result):
+        faces = []
+        for face in result.faces:
+            left, top, right, bottom = face.box
+            faces.append(face_recognition_pb2.IdentifiedFace(
+                bbox=face_recognition_pb2.BoundingBox(left=left, top=top, right=right, bottom=bottom),
+                matches=[face_recognition_pb2.Match(label=label, distance=distance) for label, distance in face.matches]
+            ))
+        return face_recognition_pb2.IdentifyResponse(index=result.index, faces=faces, error=result.error or "")
+
+    def _to_identify_batch_response(self, results):
+        return face_recognition_pb2.IdentifyBatchResponse(results=[self._to_identify_response(r) for r in results])
+
+    @_timed_rpc
+    def Identify(self, request, context):
+        results = self.face_recognition_ai.identify_images([request.image], request.top_k, request.threshold)
+        return self._to_identify_response(results[0])
+
+    @_timed_rpc
+    def IdentifyBatch(self, request, context):
+        print(f"[INFO] Received {len(request.images)} images to identify.")
+        results = self.face_recognition_ai.identify_images(request.images, request.top_k, request.threshold)
+        return self._to_identify_batch_response(results)
+
+    @_timed_rpc
+    def IdentifyStream(self, request_iterator, context):
+        # Параметры поиска берутся из первого сообщения; изображения кодируются по мере поступления
+        first = next(request_iterator, None)
+        if first is None:
+            return face_recognition_pb2.IdentifyBatchResponse()
+
+        images = itertools.chain([first.image], (request.image for request in request_iterator))
+        results = self.face_recognition_ai.identify_images(images, first.top_k, first.threshold)
+        print(f"[INFO] Identified {len(results)} streamed images.")
+        return self._to_identify_batch_response(results)
+
+    def _to_metric_labels(self, labels):
+        return [face_recognition_pb2.MetricLabel(name=name, value=value) for name, value in labels]
+
+    def GetStats(self, request, context):
+        metrics = self.metrics
+        latencies = []
+        for (name, labels), histogram in sorted(metrics.get_histograms().items()):
+            latencies.append(face_recognition_pb2.LatencyStats(
+                name=name,
+                labels=self._to_metric_labels(labels),
+                count=histogram.count,
+                sum_seconds=histogram.sum,
+                p50_seconds=histogram.quantile(0.5),
+                p95_seconds=histogram.quantile(0.95),
+                p99_seconds=histogram.quantile(0.99)
+            ))
+        values = [
+            face_recognition_pb2.MetricValue(name=name, labels=self._to_metric_labels(labels), value=value)
+            for name, _, labels, value in metrics.get_values()
+        ]
+        return face_recognition_pb2.StatsResponse(
+            enabled=metrics.enabled,
+            latencies=latencies,
+            values=values,
+            prometheus_text=metrics.render_prometheus() if request.prometheus_text else ""
+        )
+
+    def _subscription_error(self):
+        if self.face_recognition_ai.result_broker.closed:
+            return grpc.StatusCode.UNAVAILABLE, "Server is shutting down"
+        return grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many result subscribers"
+
+    def _encode_stream_frame(self, request, event, messages):
+        """
+        Запускает кодирование кадра события, если он нужен подписчику.
+        :param messages: Счётчики сообщений подписчика по камерам (для frame_every).
+        :return: Future с байтами JPEG или None, если сообщение идёт без кадра.
+        """
+        count = messages.get(event.camera_index, 0)
+        messages[event.camera_index] = count + 1
+        if request.detections_only or count % max(request.frame_every, 1) != 0:
+            return None
+        return self.face_recognition_ai.encode_frame(
+            event.camera_index, (event.ring_id, event.sequence), event.frame, request.preview, request.quality
+        )
+
+    def _encoded_bytes(self, camera_index, encoding):
+        try:
+            return encoding.result()
+        except ValueError as e:
+            print(f"[WARNING] Camera {camera_index}: {e}")
+            return b""
+
+    def _to_camera_result(self, event, skipped, frame):
+        return face_recognition_pb2.CameraResult(
+            camera_index=event.camera_index,
+            frame_sequence=event.sequence,
+            timestamp=event.timestamp,
+            frame=frame,
+            recognized_labels=event.labels,
+            skipped_frames=skipped,
+            detections=self._to_detections(event)
         )
 
     def stop(self):
@@ -89,11 +353,13 @@ class FaceRecognitionServicer(face_recognition_pb2_grpc.FaceRecognitionServicer)
         self.camera_thread.join()
 
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    cfg = Config().GRPC
+    # Каждый StreamResults занимает поток, поэтому для потоков выдачи резервируются отдельные
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=cfg["max_workers"] + Config().STREAMING["max_subscribers"]))
     servicer = FaceRecognitionServicer()
     face_recognition_pb2_grpc.add_FaceRecognitionServicer_to_server(servicer, server)
-    server.add_insecure_port('[::]:50052')
-    print("[INFO] Python gRPC server started on port 50052.")
+    server.add_insecure_port(f"[::]:{cfg['port']}")
+    print(f"[INFO] Python gRPC server started on port {cfg['port']}.")
     server.start()
 
     try:
@@ -104,4 +370,12 @@ def serve():
         server.stop(0)
 
 if __name__ == '__main__':
-    serve()
\ No newline at end of file
+    if Config().GRPC["mode"] == "aio":
+        import asyncio
+        from grpc_aio_server import serve as serve_aio
+        try:
+            asyncio.run(serve_aio())
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve()
\ No newline at end of file